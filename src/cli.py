@@ -0,0 +1,297 @@
+"""无界面命令行入口
+
+用法:
+    python src/cli.py run program.xml --port /dev/ttyUSB0 [--capture run.cap]
+    python src/cli.py capture-stats run.cap
+    python src/cli.py detect [/dev/ttyUSB0 ...]
+    python src/cli.py run program.xml --replay run.cap [--realtime]
+    python src/cli.py plan program.xml [--capture run.cap]
+
+只加载 QtCore 和 QtSerialPort，不创建窗口、不加载 QtWebEngine。
+"""
+import argparse
+import logging
+import sys
+import threading
+import time
+
+from PyQt5.QtCore import QCoreApplication
+
+from devices import capture
+from devices.auto_detect import DEFAULT_TIMEOUT, detect_devices
+from devices.device_manager import DeviceManager
+from devices.replay import ReplaySerialController, load_sessions
+from devices.serial_controller import SerialController
+from log_pipeline import setup_logging, stop_logging
+from program.block_trace import BlockTracer
+from program.cache import ProgramCache
+from program.interpreter import Interpreter
+from program.planner import DeviceTiming, Planner
+from program.profiler import BlockProfiler
+
+logger = logging.getLogger(__name__)
+
+
+def run_program(args) -> int:
+    """执行 Blockly XML 程序"""
+    cache = ProgramCache(cache_dir=args.cache_dir)
+    try:
+        with open(args.program, 'r', encoding='utf-8') as f:
+            program, errors = cache.load_program(f.read(), firmware_loops=args.firmware_loops)
+    except Exception as e:
+        logger.error("加载程序失败: %s", e)
+        return 1
+    if errors:
+        for error in errors:
+            logger.error("程序校验失败: %s", error)
+        return 1
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+    stop_event = threading.Event()
+    if args.replay:
+        # 用录制的设备应答代替真实串口
+        try:
+            sessions = load_sessions(args.replay)
+        except (OSError, ValueError) as e:
+            logger.error("读取抓包文件失败: %s", e)
+            return 1
+        if not sessions:
+            logger.error("抓包文件中没有记录")
+            return 1
+        main_port = args.port or next(iter(sessions))
+
+        def replay_controller(port):
+            controller = ReplaySerialController(port, sessions.get(port, []), args.realtime)
+            # 在第一个与录制不一致的请求处停止
+            controller.mismatched.connect(lambda data: stop_event.set())
+            return controller
+        serial_controller = replay_controller(main_port)
+        devices = DeviceManager(controller_factory=replay_controller)
+        # 只录制了一个串口时，程序中的串口配置都指向它
+        port = args.port or (main_port if len(sessions) == 1 else None)
+    else:
+        serial_controller = SerialController()
+        devices = DeviceManager()
+        port = args.port
+    if args.capture:
+        devices.capture = serial_controller.start_capture(args.capture)
+    interpreter = Interpreter(serial_controller, port=port, baudrate=args.baudrate,
+                              stop_event=stop_event, devices=devices, drift_free=args.drift_free)
+    interpreter.pump.await_completion = args.await_completion
+    interpreter.pump.poll_interval = args.poll_interval
+    if args.replay and not args.realtime:
+        interpreter.delay_scale = 0
+    profiler = None
+    if args.profile:
+        interpreter.tracer = BlockTracer()
+        profiler = BlockProfiler(
+            lambda: [interpreter.serial] + [devices.controller(p) for p in devices.ports],
+            labels={op.block_id: type(op).__name__ for op in program.walk() if op.block_id})
+        profiler.attach(interpreter.tracer)
+    try:
+        started = time.monotonic()
+        interpreter.run(program)
+        logger.info("程序执行完成")
+        if args.replay:
+            return report_replay(serial_controller, devices, time.monotonic() - started)
+        return 0
+    except KeyboardInterrupt:
+        logger.info("程序已停止")
+        try:
+            interpreter.pump.stop()
+        except Exception as e:
+            logger.error("停止泵时出错: %s", e)
+        return 130
+    except Exception as e:
+        if args.replay and stop_event.is_set():
+            logger.error("回放与录制不一致，已停止")
+            return report_replay(serial_controller, devices, time.monotonic() - started) or 3
+        logger.error("代码执行失败: %s", e)
+        return 1
+    finally:
+        if profiler is not None:
+            profiler.detach(interpreter.tracer)
+            write_profile(profiler, args.profile)
+        serial_controller.disconnect()
+        devices.shutdown()
+        serial_controller.stop_capture()
+
+
+def write_profile(profiler: BlockProfiler, path: str):
+    """导出按块统计的耗时，并输出耗时最多的几个块"""
+    try:
+        profiler.write_csv(path)
+    except OSError as e:
+        logger.error("保存性能统计失败: %s", e)
+        return
+    for stats in profiler.ranked()[:5]:
+        logger.info("块 %s (%s): %.3f 秒，执行 %d 次，往返 %d 次，超时 %d 次，重发 %d 次",
+                    stats.block_id, stats.label, stats.wall, stats.count, stats.requests,
+                    stats.timeouts, stats.retries)
+    logger.info("按块统计的耗时已保存到 %s", path)
+
+
+def report_replay(serial_controller, devices, elapsed: float) -> int:
+    """输出回放统计，与录制不一致时返回 3"""
+    controllers = [serial_controller] + [devices.controller(port) for port in devices.ports]
+    consistent = True
+    summaries = {id(c): c.serial.summary() for c in controllers if c is not None}
+    for summary in summaries.values():
+        if not summary['port']:
+            continue  # 没有打开过的串口
+        print(f"{summary['port']}: 请求 {summary['writes']} 次，匹配 {summary['matched']}，"
+              f"多出 {summary['unexpected']}，跳过 {summary['skipped']}，未回放 {summary['remaining']}")
+        if summary['first_mismatch'] is not None:
+            print(f"  第一个不一致的请求: {summary['first_mismatch']!r}")
+        consistent = consistent and not (summary['unexpected'] or summary['skipped'] or summary['remaining'])
+    print(f"用时 {elapsed:.3f} 秒")
+    return 0 if consistent else 3
+
+
+def plan_program(args) -> int:
+    """不连接设备，估算程序的耗时、体积和设备占用"""
+    cache = ProgramCache(cache_dir=args.cache_dir)
+    try:
+        with open(args.program, 'r', encoding='utf-8') as f:
+            program, errors = cache.load_program(f.read(), firmware_loops=args.firmware_loops)
+    except Exception as e:
+        logger.error("加载程序失败: %s", e)
+        return 1
+    if errors:
+        for error in errors:
+            logger.error("程序校验失败: %s", error)
+        return 1
+
+    timing = DeviceTiming(poll_interval=args.poll_interval)
+    if args.round_trip is not None:
+        timing.round_trip = args.round_trip
+    elif args.capture:
+        # 用抓包文件中实测的应答延迟中位数作为命令往返时间
+        try:
+            with capture.CaptureReader(args.capture) as reader:
+                median = capture.percentiles(capture.latencies(reader), (50,)).get(50)
+        except (OSError, ValueError) as e:
+            logger.error("读取抓包文件失败: %s", e)
+            return 1
+        if median is not None:
+            timing.round_trip = median
+            logger.info("按抓包文件的应答延迟中位数 %.1f ms 估算", median * 1000)
+    plan = Planner(timing, await_completion=args.await_completion,
+                   drift_free=args.drift_free).plan(program)
+    print(plan.report(top=args.top))
+    return 0
+
+
+def capture_stats(args) -> int:
+    """统计抓包文件：帧数、应答延迟百分位数、重发次数"""
+    try:
+        reader = capture.CaptureReader(args.capture)
+    except (OSError, ValueError) as e:
+        logger.error("读取抓包文件失败: %s", e)
+        return 1
+    with reader:
+        counts = {}
+        for frame in reader:
+            key = (frame.port, capture.DIRECTION_NAMES.get(frame.direction, '?'))
+            counts[key] = counts.get(key, 0) + 1
+        latencies = capture.latencies(reader)
+        retries = capture.retries(reader)
+    for (port, direction), count in sorted(counts.items()):
+        print(f"{port} {direction}: {count} 帧")
+    for point, value in capture.percentiles(latencies).items():
+        print(f"延迟 p{point}: {value * 1000:.1f} ms")
+    print(f"重发: {retries} 次")
+    return 0
+
+
+def detect(args) -> int:
+    """同时探测所有串口上的注射泵和旋转阀"""
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+    started = time.monotonic()
+    found = detect_devices(args.ports or None, {'baudrate': args.baudrate}, timeout=args.timeout,
+                           scan_all=args.all_addresses)
+    for port, devices in found.items():
+        for device in devices:
+            kind = '注射泵' if device.kind == 'pump' else '旋转阀'
+            print(f"{port}\t{kind}\t地址 {device.address}")
+    if not found:
+        print("未检测到设备")
+    logger.info("检测用时 %.2f 秒", time.monotonic() - started)
+    return 0 if found else 1
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """创建命令行解析器"""
+    parser = argparse.ArgumentParser(prog='autoinjector', description='自动注射泵控制系统（命令行）')
+    parser.add_argument('--log-level', default='INFO', help='日志级别（默认 INFO）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='执行保存的 Blockly 程序')
+    run_parser.add_argument('program', help='Blockly XML 程序文件')
+    run_parser.add_argument('--port', help='串口名称，覆盖程序中的配置')
+    run_parser.add_argument('--baudrate', type=int, help='波特率，覆盖程序中的配置')
+    run_parser.add_argument('--firmware-loops', action='store_true',
+                            help='把只包含泵操作的重复块下发为泵固件循环')
+    run_parser.add_argument('--await-completion', action='store_true',
+                            help='每条泵命令后轮询状态，等待泵执行完成再进行下一步')
+    run_parser.add_argument('--poll-interval', type=float, default=0.05,
+                            help='状态轮询间隔（秒，默认 0.05）')
+    run_parser.add_argument('--drift-free', action='store_true',
+                            help='循环中的延时以计划时间为基准，命令耗时计入延时（默认从上一条命令结束开始计时）')
+    run_parser.add_argument('--cache-dir', metavar='DIR',
+                            help='把解析和编译后的程序缓存到目录，重复运行同一程序时跳过编译')
+    run_parser.add_argument('--profile', metavar='FILE',
+                            help='按块统计耗时、串口往返和超时次数，导出为 CSV')
+    run_parser.add_argument('--capture', metavar='FILE', help='把串口收发的帧记录到二进制抓包文件')
+    run_parser.add_argument('--replay', metavar='FILE',
+                            help='不连接设备，用抓包文件中录制的应答回放（与录制不一致时返回 3）')
+    run_parser.add_argument('--realtime', action='store_true',
+                            help='回放时按录制的应答延迟和程序中的延时执行（默认尽可能快）')
+    run_parser.set_defaults(func=run_program)
+
+    plan_parser = subparsers.add_parser('plan', help='不连接设备，估算程序的耗时、体积和设备占用')
+    plan_parser.add_argument('program', help='Blockly XML 程序文件')
+    plan_parser.add_argument('--firmware-loops', action='store_true',
+                             help='按泵固件循环估算只包含泵操作的重复块')
+    plan_parser.add_argument('--await-completion', action='store_true',
+                             help='按每条泵命令后等待泵执行完成估算')
+    plan_parser.add_argument('--poll-interval', type=float, default=0.05,
+                             help='状态轮询间隔（秒，默认 0.05）')
+    plan_parser.add_argument('--drift-free', action='store_true',
+                             help='按循环中的延时以计划时间为基准估算（同 run）')
+    plan_parser.add_argument('--round-trip', type=float, metavar='SECONDS',
+                             help='一次命令往返的时间（秒，默认 0.03）')
+    plan_parser.add_argument('--capture', metavar='FILE',
+                             help='用抓包文件中实测的应答延迟作为命令往返时间')
+    plan_parser.add_argument('--cache-dir', metavar='DIR', help='程序缓存目录（同 run）')
+    plan_parser.add_argument('--top', type=int, default=10, help='显示关键路径上耗时最多的块数（默认 10）')
+    plan_parser.set_defaults(func=plan_program)
+
+    detect_parser = subparsers.add_parser('detect', help='自动检测各串口上的注射泵和旋转阀')
+    detect_parser.add_argument('ports', nargs='*', help='要探测的串口，默认所有可用串口')
+    detect_parser.add_argument('--baudrate', type=int, default=9600, help='波特率（默认 9600）')
+    detect_parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                               help=f'每次探测的超时时间（秒，默认 {DEFAULT_TIMEOUT}）')
+    detect_parser.add_argument('--all-addresses', action='store_true',
+                               help='探测所有地址（默认每类设备在第一个无应答的地址处停止）')
+    detect_parser.set_defaults(func=detect)
+
+    stats_parser = subparsers.add_parser('capture-stats', help='统计抓包文件中的应答延迟和重发')
+    stats_parser.add_argument('capture', help='抓包文件')
+    stats_parser.set_defaults(func=capture_stats)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    setup_logging(console, level=getattr(logging, args.log_level.upper(), logging.INFO))
+    try:
+        return args.func(args)
+    finally:
+        stop_logging()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,9 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout
 from PyQt5.QtWebEngineWidgets import QWebEngineView, QWebEnginePage
 from PyQt5.QtWebChannel import QWebChannel
-from PyQt5.QtCore import QUrl, pyqtSignal
+from PyQt5.QtCore import QTimer, QUrl, pyqtSignal
+import json
 import os
 import logging
-import sys
 
 logger = logging.getLogger(__name__)
 
@@ -12,7 +11,7 @@ STATIC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../stat
 
 class BlocklyPage(QWebEnginePage):
     def javaScriptConsoleMessage(self, level, message, lineNumber, sourceID):
-        logger.debug(f"JS[{lineNumber}]: {message}")
+        logger.debug("JS[%d]: %s", lineNumber, message)
 
 class BlocklyWorkspace(QWebEngineView):
     """Blockly工作区"""
@@ -20,6 +19,8 @@ class BlocklyWorkspace(QWebEngineView):
     # 定义信号
     code_generated = pyqtSignal(str)
     
+    HIGHLIGHT_INTERVAL_MS = 50  # 执行进度高亮的刷新间隔，期间经过的块只高亮最后一个
+    
     def __init__(self, parent=None):
         """初始化工作区"""
         super().__init__(parent)
@@ -27,6 +28,13 @@ class BlocklyWorkspace(QWebEngineView):
         self.web_bridge = None
         self.code_editor = None
         self._page = None
+        self._last_code = None  # 上一次收到的生成代码，没有变化时不更新编辑器
+        self.generated_code = ''  # 带块 ID 注释的生成代码（用于执行）
+        self._tracer = None
+        self._highlighted = None
+        self._highlight_timer = QTimer(self)
+        self._highlight_timer.setInterval(self.HIGHLIGHT_INTERVAL_MS)
+        self._highlight_timer.timeout.connect(self._update_highlight)
         
         # 创建自定义页面
         self._page = BlocklyPage(self)
@@ -47,9 +55,6 @@ class BlocklyWorkspace(QWebEngineView):
             
             if self.web_bridge:
                 channel.registerObject('webBridge', self.web_bridge)
-                
-                # 连接代码生成信号
-                self.web_bridge.codeGeneratedSignal.connect(self.handle_code_generated)
         else:
             logger.error("Blockly页面加载失败")
 
@@ -71,13 +76,29 @@ class BlocklyWorkspace(QWebEngineView):
         if self._page:
             self._page.runJavaScript('Blockly.Python.workspaceToCode(workspace);', self.handle_code_generated)
     
+    def get_workspace_xml(self, callback):
+        """异步获取工作区 XML
+
+        Args:
+            callback: 回调函数，参数为 XML 文本
+        """
+        if self._page:
+            self._page.runJavaScript(
+                'Blockly.Xml.domToText(Blockly.Xml.workspaceToDom(workspace));',
+                callback
+            )
+    
     def handle_code_generated(self, code):
-        """处理生成的代码"""
-        logger.debug(f"收到生成的代码: {code}")
+        """处理生成的代码（内容没有变化时忽略）"""
+        if code == self._last_code:
+            return
+        self._last_code = code
+        self.generated_code = code or ''
+        logger.debug("收到生成的代码: %d 字符", len(code or ''))
         
-        # 移除多余的 blockId 注释
+        # 编辑器中不显示块 ID 注释（执行时使用 generated_code）
         code_lines = code.split('\n') if code else []
-        clean_lines = [line for line in code_lines if not line.strip().startswith('# blockId:')]
+        clean_lines = [line for line in code_lines if not line.strip().startswith('# block_id:')]
         clean_code = '\n'.join(clean_lines)
         
         # 发送代码到代码编辑器
@@ -88,49 +109,48 @@ class BlocklyWorkspace(QWebEngineView):
         self.code_generated.emit(clean_code)
     
     def highlight_block(self, block_id):
-        """高亮显示指定的块"""
+        """高亮显示指定的块，block_id 为 None 时取消高亮"""
         if self._page:
-            self._page.runJavaScript(f'highlightBlock("{block_id}");')
+            self._page.runJavaScript(f'highlightBlock({json.dumps(block_id)});')
     
-    def execute_code(self, code):
-        """执行生成的代码
-        
+    def show_profile(self, heatmap):
+        """按耗时占比给块着色，并在提示中显示统计
+
         Args:
-            code: 要执行的代码字符串
+            heatmap: 块 ID -> {'share': 耗时占比, 'text': 说明}（BlockProfiler.heatmap）
         """
-        try:
-            logger.info("开始执行代码...")
-            
-            # 准备执行环境
-            exec_globals = {
-                'pump': self.main_window.pump,
-                'serial_controller': self.main_window.serial_controller,
-                'logger': logger
-            }
-            
-            # 准备代码行列表
-            code_lines = code.split('\n')
-            
-            # 创建行追踪器
-            from line_tracer import LineTracer
-            tracer = LineTracer(code_lines, self)
-            
-            # 设置追踪器
-            sys.settrace(tracer.get_line_description)
-            
-            # 执行代码
-            exec(code, exec_globals)
-            
-            logger.info("代码执行完成")
-            
-        except Exception as e:
-            logger.error(f"代码执行失败: {e}")
-            raise
-            
-        finally:
-            # 清除追踪器
-            sys.settrace(None)
+        if self._page:
+            self._page.runJavaScript(f'showProfile({json.dumps(heatmap, ensure_ascii=False)});')
+    
+    def clear_profile(self):
+        """恢复块原来的颜色和提示"""
+        if self._page:
+            self._page.runJavaScript('clearProfile();')
+    
+    def follow(self, tracer):
+        """程序运行期间按固定频率高亮当前执行的块
 
+        Args:
+            tracer: BlockTracer，程序执行线程只更新其 current 属性，不跨线程发送信号
+        """
+        self._tracer = tracer
+        self._highlighted = None
+        self._highlight_timer.start()
+    
+    def unfollow(self):
+        """停止跟踪执行进度并取消高亮"""
+        self._highlight_timer.stop()
+        self._tracer = None
+        if self._highlighted is not None:
+            self._highlighted = None
+            self.highlight_block(None)
+    
+    def _update_highlight(self):
+        block_id = self._tracer.current if self._tracer else None
+        if block_id != self._highlighted:
+            self._highlighted = block_id
+            self.highlight_block(block_id)
+    
     @property
     def page(self):
         """获取页面对象"""
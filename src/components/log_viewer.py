@@ -1,25 +1,181 @@
-from PyQt5.QtWidgets import QWidget, QVBoxLayout, QPushButton, QSizePolicy, QTextEdit, QApplication
-from PyQt5.QtGui import QFont, QTextCharFormat, QColor, QTextCursor
-from PyQt5.QtCore import Qt, pyqtSignal, pyqtSlot
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QListView, QComboBox, QLabel,
+                             QAbstractItemView)
+from PyQt5.QtGui import QColor
+from PyQt5.QtCore import (Qt, pyqtSlot, QAbstractListModel, QModelIndex,
+                          QSortFilterProxyModel, QTimer)
+from collections import deque
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
-class LogViewer(QTextEdit):
-    """日志查看器"""
-    
+# 日志级别颜色
+LEVEL_COLORS = {
+    "ERROR": "#dc3545",    # 红色
+    "WARNING": "#ffc107",  # 黄色
+    "INFO": "#495057",     # 深灰
+    "DEBUG": "#6c757d"     # 浅灰
+}
+DEFAULT_COLOR = "#212529"  # 默认黑色
+
+# 过滤时使用的级别数值（收发数据与 INFO 同级）
+LEVEL_VALUES = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "RECV": logging.INFO,
+    "SEND": logging.INFO,
+    "SUCCESS": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+    "CRITICAL": logging.CRITICAL
+}
+
+LevelRole = Qt.UserRole + 1  # 日志级别数值
+
+
+class LogModel(QAbstractListModel):
+    """日志数据模型
+
+    日志保存在固定容量的环形缓冲区中，超出容量时丢弃最早的记录。
+    新记录先进入待提交队列，由定时器合并后一次性插入，界面刷新频率不超过 flush_interval。
+    """
+
+    def __init__(self, capacity: int = 10000, flush_interval: int = 33, parent=None):
+        super().__init__(parent)
+        self.capacity = capacity
+        self._records = deque(maxlen=capacity)  # (显示文本, 级别)
+        self._pending = []
+        self._colors = {}  # 级别 -> QColor 缓存
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(flush_interval)
+        self._flush_timer.timeout.connect(self.flush)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._records)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        text, level = self._records[index.row()]
+        if role == Qt.DisplayRole:
+            return text
+        if role == Qt.ForegroundRole:
+            color = self._colors.get(level)
+            if color is None:
+                color = self._colors[level] = QColor(LEVEL_COLORS.get(level, DEFAULT_COLOR))
+            return color
+        if role == LevelRole:
+            return LEVEL_VALUES.get(level, logging.INFO)
+        return None
+
+    def append(self, msg: str, level: str = "INFO"):
+        """添加一条日志（延迟到下一次刷新时插入）"""
+        timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+        self._pending.append((f"[{timestamp}] {msg}", level))
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+
+    def flush(self):
+        """把待提交的日志插入模型"""
+        self._flush_timer.stop()
+        pending = self._pending[-self.capacity:]
+        self._pending = []
+        if not pending:
+            return
+        # 先移除放不下的旧记录
+        overflow = len(self._records) + len(pending) - self.capacity
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            for _ in range(overflow):
+                self._records.popleft()
+            self.endRemoveRows()
+        first = len(self._records)
+        self.beginInsertRows(QModelIndex(), first, first + len(pending) - 1)
+        self._records.extend(pending)
+        self.endInsertRows()
+
+    def clear(self):
+        """清空日志"""
+        self._flush_timer.stop()
+        self._pending = []
+        self.beginResetModel()
+        self._records.clear()
+        self.endResetModel()
+
+
+class LogFilterModel(QSortFilterProxyModel):
+    """按最低级别过滤日志（只影响可见行，不重新生成历史记录）"""
+
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.setReadOnly(True)
-        self.setStyleSheet("""
-            QTextEdit {
+        self.min_level = logging.DEBUG
+
+    def set_min_level(self, level: int):
+        self.min_level = level
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if self.min_level <= logging.DEBUG:
+            return True
+        index = self.sourceModel().index(source_row, 0, source_parent)
+        return self.sourceModel().data(index, LevelRole) >= self.min_level
+
+
+class LogViewer(QWidget):
+    """日志查看器"""
+
+    FILTER_LEVELS = [
+        ("全部", logging.DEBUG),
+        ("信息", logging.INFO),
+        ("警告", logging.WARNING),
+        ("错误", logging.ERROR)
+    ]
+
+    def __init__(self, parent=None, capacity: int = 10000):
+        super().__init__(parent)
+        self.model = LogModel(capacity, parent=self)
+        self.filter_model = LogFilterModel(self)
+        self.filter_model.setSourceModel(self.model)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(0)
+
+        # 级别过滤
+        filter_layout = QHBoxLayout()
+        filter_layout.setContentsMargins(5, 2, 5, 2)
+        filter_layout.addWidget(QLabel("级别:"))
+        self.level_combo = QComboBox()
+        for text, level in self.FILTER_LEVELS:
+            self.level_combo.addItem(text, level)
+        self.level_combo.currentIndexChanged.connect(
+            lambda index: self.set_min_level(self.level_combo.itemData(index))
+        )
+        filter_layout.addWidget(self.level_combo)
+        filter_layout.addStretch()
+        layout.addLayout(filter_layout)
+
+        self.view = QListView()
+        self.view.setModel(self.filter_model)
+        self.view.setUniformItemSizes(True)  # 行高一致，滚动时不需要逐行测量
+        self.view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.view.setStyleSheet("""
+            QListView {
                 background-color: #f8f9fa;
                 border: none;
                 font-family: Consolas, Monaco, monospace;
                 font-size: 12pt;
             }
         """)
+        layout.addWidget(self.view)
+
+        # 在底部时，新日志插入后自动滚动到底部
+        self._follow = True
+        self.view.verticalScrollBar().valueChanged.connect(self._on_scrolled)
+        self.filter_model.rowsInserted.connect(self._on_rows_inserted)
+
         self.setMinimumHeight(150)
         self.setMaximumHeight(300)
 
@@ -31,100 +187,21 @@ class LogViewer(QTextEdit):
             msg: 日志消息
             level: 日志级别
         """
-        color = {
-            "ERROR": "#dc3545",    # 红色
-            "WARNING": "#ffc107",  # 黄色
-            "INFO": "#495057",     # 深灰
-            "DEBUG": "#6c757d"     # 浅灰
-        }.get(level, "#212529")    # 默认黑色
-        
-        timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-        formatted_message = f"[{timestamp}] {msg}"
-        
-        # 添加日志
-        cursor = self.textCursor()
-        cursor.movePosition(cursor.End)
-        self.setTextCursor(cursor)
-        self.insertHtml(f'<span style="color: {color};">{formatted_message}</span><br>')
-        
-        # 滚动到底部
-        self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
-        
-        # 立即刷新
-        QApplication.processEvents()
+        self.model.append(msg, level)
 
-    def clear(self):
-        """清空日志"""
-        super().clear()
+    def set_min_level(self, level: int):
+        """只显示不低于指定级别的日志"""
+        self.filter_model.set_min_level(level)
+        if self._follow:
+            self.view.scrollToBottom()
 
-class LogViewerEdit(QTextEdit):
-    """日志查看器编辑器"""
-    
-    def __init__(self, parent=None):
-        super().__init__(parent)
-        self.setReadOnly(True)  # 设置为只读
-        self.setMaximumHeight(200)  # 设置最大高度
-        self.setMinimumHeight(100)  # 设置最小高度
-        
-        # 设置字体
-        font = QFont("Consolas, 'Courier New', monospace")
-        font.setPixelSize(24)  # 增加到24像素
-        self.setFont(font)
-        
-        # 设置样式
-        self.setStyleSheet("""
-            QTextEdit {
-                background-color: white;
-                color: #424242;
-                border: none;
-                border-top: 1px solid #e0e0e0;
-                padding: 5px;
-            }
-            QScrollBar:vertical {
-                background-color: #f5f5f5;
-                width: 12px;
-                margin: 0px;
-            }
-            QScrollBar::handle:vertical {
-                background-color: #e0e0e0;
-                min-height: 20px;
-                border-radius: 6px;
-            }
-            QScrollBar::handle:vertical:hover {
-                background-color: #bdbdbd;
-            }
-            QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
-                height: 0px;
-            }
-            QScrollBar::add-page:vertical, QScrollBar::sub-page:vertical {
-                background-color: #f5f5f5;
-            }
-        """)
-        
-    def append_log(self, message, level="INFO"):
-        """添加日志"""
-        timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-        formatted_message = f"[{timestamp}] {message}"
-        
-        # 根据日志级别设置颜色
-        if level == "ERROR":
-            color = "#f44336"  # 红色
-        elif level == "WARNING":
-            color = "#ff9800"  # 橙色
-        elif level == "SUCCESS":
-            color = "#4caf50"  # 绿色
-        else:
-            color = "#424242"  # 深灰色
-            
-        # 使用HTML格式添加带颜色的文本
-        self.append(f'<span style="color: {color};">{formatted_message}</span>')
-        
-        # 滚动到底部
-        self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
-        
-        # 立即刷新显示
-        QApplication.processEvents()
+    def _on_scrolled(self, value):
+        self._follow = value >= self.view.verticalScrollBar().maximum()
+
+    def _on_rows_inserted(self, parent, first, last):
+        if self._follow:
+            self.view.scrollToBottom()
 
-    def clear_log(self):
+    def clear(self):
         """清空日志"""
-        self.clear()
+        self.model.clear()
@@ -0,0 +1,135 @@
+"""自动检测串口上的注射泵和旋转阀
+
+所有串口同时探测，每个串口由设备管理器的 I/O 线程收发。
+同一串口（RS-485 半双工总线）上逐个地址查询，收到应答或超时之后才查询下一个地址，
+多个设备不会同时应答而互相冲突。每次探测只等待一个较短的超时，不做重试。
+设备地址通常从 1 开始连续设置，默认每类设备遇到第一个无应答的地址就停止，
+没有设备的串口只需两次超时（注射泵和旋转阀各一次）；scan_all=True 时探测所有地址。
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from .device_manager import DeviceManager
+from .framing import FixedLengthFrameDecoder
+from .port_discovery import PortDiscovery
+from .pump_controller import PumpController
+from .valve_controller import ValveController
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PUMP_ADDRESSES = ('1', '2', '3', '4')
+DEFAULT_VALVE_ADDRESSES = tuple(range(1, 9))
+DEFAULT_TIMEOUT = 0.2  # 每次探测等待应答的时间（秒）
+
+DEFAULT_SETTINGS = {
+    'baudrate': 9600,
+    'databits': 8,
+    'parity': 'N',
+    'stopbits': 1,
+    'flowcontrol': 'N'
+}
+
+
+class DetectedDevice(NamedTuple):
+    """检测到的设备"""
+    port: str
+    kind: str  # 'pump' 或 'valve'
+    address: object  # 注射泵地址为字符，旋转阀地址为整数
+
+
+def unique_ports(ports: Iterable[str]) -> List[str]:
+    """去掉同一串口的重复名称（ttyUSB0 与 /dev/ttyUSB0 只保留完整路径）"""
+    ports = list(ports)
+    full = set(ports)
+    return [port for port in ports if f'/dev/{port}' not in full]
+
+
+def probe_port(controller, pump_addresses: Iterable[str] = DEFAULT_PUMP_ADDRESSES,
+               valve_addresses: Iterable[int] = DEFAULT_VALVE_ADDRESSES,
+               timeout: float = DEFAULT_TIMEOUT, scan_all: bool = False) -> List[DetectedDevice]:
+    """逐个地址探测一个已连接的串口（同一时刻总线上只有一个查询）
+
+    Args:
+        scan_all: 为 False 时每类设备在第一个无应答的地址处停止
+    """
+    port = controller.port
+    found = []
+    for address in pump_addresses:
+        response = _probe(controller, PumpController.command_frame(address, 'Q', execute=False).encode(),
+                          PumpController.FRAME_DECODER, None, timeout)
+        if response is None and not scan_all:
+            break
+        if response is not None and PumpController.parse_status(response) is not None:
+            found.append(DetectedDevice(port, 'pump', address))
+    valve_decoder = FixedLengthFrameDecoder(8, ValveController.START_BYTE, ValveController.ADDRESS_OFFSET)
+    for address in valve_addresses:
+        response = _probe(controller, ValveController.status_frame(address), valve_decoder, address, timeout)
+        if response is None and not scan_all:
+            break
+        if response is not None and ValveController.is_valid_response(
+                response, ValveController.STATUS_CMD, address):
+            found.append(DetectedDevice(port, 'valve', address))
+    return found
+
+
+def _probe(controller, frame: bytes, decoder, address, timeout: float) -> Optional[bytes]:
+    """发送一次查询并等待应答，无应答时返回 None"""
+    try:
+        return controller.request(frame, decoder=decoder, address=address,
+                                  timeout=timeout, notify=False)
+    except (TimeoutError, ConnectionError):
+        return None
+
+
+def detect_devices(ports: Optional[Iterable[str]] = None, settings: Optional[dict] = None,
+                   pump_addresses: Iterable[str] = DEFAULT_PUMP_ADDRESSES,
+                   valve_addresses: Iterable[int] = DEFAULT_VALVE_ADDRESSES,
+                   timeout: float = DEFAULT_TIMEOUT,
+                   devices: Optional[DeviceManager] = None,
+                   scan_all: bool = False) -> Dict[str, List[DetectedDevice]]:
+    """同时探测多个串口上的注射泵和旋转阀
+
+    Args:
+        ports: 要探测的串口，默认为所有可用串口
+        settings: 串口参数（不含 port），默认 9600 8N1
+        pump_addresses: 要探测的注射泵地址
+        valve_addresses: 要探测的旋转阀地址
+        timeout: 每次探测的超时时间（秒）
+        devices: 设备管理器，默认临时创建并在结束后关闭所有串口
+        scan_all: 探测所有地址，不在第一个无应答的地址处停止
+
+    Returns:
+        Dict[str, List[DetectedDevice]]: 串口 -> 检测到的设备（只包含有设备的串口）
+    """
+    discovery = PortDiscovery.instance()  # 在调用线程中创建，不在探测线程中创建 Qt 对象
+    ports = unique_ports(discovery.ports() if ports is None else ports)
+    if not ports:
+        return {}
+    settings = dict(DEFAULT_SETTINGS, **(settings or {}))
+    manager = devices or DeviceManager()
+    pump_addresses = tuple(pump_addresses)
+    valve_addresses = tuple(valve_addresses)
+
+    try:
+        # 打开串口很快，依次进行；I/O 线程在这里创建
+        controllers = {}
+        for port in ports:
+            try:
+                controllers[port] = manager.open_port(dict(settings, port=port))
+            except ConnectionError as e:
+                logger.debug("Skipping port %s: %s", port, e)
+        if not controllers:
+            return {}
+        with ThreadPoolExecutor(max_workers=len(controllers)) as executor:
+            futures = {port: executor.submit(probe_port, controller, pump_addresses,
+                                             valve_addresses, timeout, scan_all)
+                       for port, controller in controllers.items()}
+            results = {port: future.result() for port, future in futures.items()}
+    finally:
+        if devices is None:
+            manager.shutdown()
+    found = {port: result for port, result in results.items() if result}
+    for port, result in found.items():
+        logger.info("串口 %s: %s", port, ', '.join(f"{d.kind}@{d.address}" for d in result))
+    return found
@@ -0,0 +1,80 @@
+"""共享总线（RS-485）请求调度
+
+RS-485 是半双工总线，同一时刻只能有一个设备发送。为避免多个设备的应答互相冲突，
+每个串口同一时刻只有一个请求在途：上一个请求收到完整应答（或超时）之后才发送下一个。
+多个线程提交的请求在主机端排队，前一个应答一到即在串口线程中立即写出下一个请求，
+不再经过调用线程，因此多台设备的命令仍然可以背靠背地发送，各设备的动作在设备端并行执行。
+
+总线换向（turnaround）的假设：
+    - 设备在收到完整请求后才开始应答，应答帧结束后立即释放总线；
+    - 串口适配器自动控制收发方向，主机在应答结束后可以立即发送，不额外插入间隔；
+    - 请求超时后，迟到的应答可能仍在总线上：应答带地址的协议（旋转阀）按地址丢弃不属于
+      当前请求的帧；不带地址的协议（注射泵）在发送下一个请求前丢弃缓冲区中残留的数据。
+"""
+from collections import deque
+from typing import Optional
+
+
+class BusScheduler:
+    """按提交顺序逐个发送请求，同一时刻只有一个请求在途"""
+
+    def __init__(self):
+        self.pending = deque()  # 等待发送的请求（按提交顺序）
+        self.in_flight = None  # 已发送、等待应答的请求
+
+    def __bool__(self):
+        return bool(self.pending) or self.in_flight is not None
+
+    @staticmethod
+    def correlated(request) -> bool:
+        """请求的应答是否可以按设备地址确认"""
+        return request.address is not None and request.decoder.correlates
+
+    def push(self, request):
+        """加入等待队列"""
+        self.pending.append(request)
+
+    def next_ready(self):
+        """取出下一个可以立即发送的请求，总线被占用或没有请求时返回 None"""
+        if self.in_flight is not None:
+            return None
+        while self.pending:
+            request = self.pending.popleft()
+            if not request.future.done():  # 跳过已取消的请求
+                return request
+        return None
+
+    def start(self, request):
+        """标记请求已发送"""
+        self.in_flight = request
+
+    def finish(self, request):
+        """标记请求已结束"""
+        if self.in_flight is request:
+            self.in_flight = None
+
+    def decoder(self):
+        """当前在途请求使用的帧解码器"""
+        return self.in_flight.decoder if self.in_flight is not None else None
+
+    def match(self, frame: bytes):
+        """把应答帧匹配到在途请求，应答地址与请求不符时返回 None"""
+        request = self.in_flight
+        if request is None:
+            return None
+        if self.correlated(request) and request.decoder.address_of(frame) != request.address:
+            return None
+        return request
+
+    def deadline(self) -> Optional[float]:
+        """在途请求的截止时间，总线空闲时为 None"""
+        return self.in_flight.deadline if self.in_flight is not None else None
+
+    def drain(self) -> list:
+        """移除并返回所有未结束的请求"""
+        requests = list(self.pending)
+        if self.in_flight is not None:
+            requests.insert(0, self.in_flight)
+        self.in_flight = None
+        self.pending.clear()
+        return requests
@@ -0,0 +1,192 @@
+"""串口收发数据的二进制抓包
+
+抓包文件格式（小端）::
+
+    文件头   8 字节  b'AICAP\\x00\\x01\\x00'
+    记录头  16 字节  时间戳(int64, 单调时钟纳秒) 方向(uint8) 串口编号(uint8) 设备地址(int16, -1 表示无) 长度(uint32)
+    数据    长度字节
+
+方向为 PORT 的记录用于定义串口编号，数据为 UTF-8 编码的串口名。
+读取时使用 mmap，帧数据以 memoryview 切片返回，不复制。
+"""
+import math
+import mmap
+import struct
+import threading
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+MAGIC = b'AICAP\x00\x01\x00'
+RECORD = struct.Struct('<qBBhI')
+
+# 方向
+TX = 0  # 发送
+RX = 1  # 接收
+PORT = 2  # 串口编号定义
+
+DIRECTION_NAMES = {TX: 'TX', RX: 'RX'}
+
+
+class CaptureFrame(NamedTuple):
+    """一帧抓包数据"""
+    timestamp: float  # 单调时钟（秒）
+    direction: int
+    port: str
+    address: Optional[int]
+    data: memoryview
+
+
+class CaptureWriter:
+    """抓包写入器（线程安全，可由多个串口控制器共用）"""
+
+    def __init__(self, path: str, buffer_size: int = 1 << 16):
+        self.path = path
+        self._lock = threading.Lock()
+        self._ports: Dict[str, int] = {}
+        self._file = open(path, 'wb', buffering=buffer_size)
+        self._file.write(MAGIC)
+        self.frames = 0
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def record(self, direction: int, port: Optional[str], address: Optional[int], data: bytes):
+        """追加一帧"""
+        timestamp = time.monotonic_ns()
+        with self._lock:
+            if self._file.closed:
+                return
+            port_id = self._ports.get(port)
+            if port_id is None:
+                port_id = self._define_port(port, timestamp)
+            self._file.write(RECORD.pack(timestamp, direction, port_id,
+                                         -1 if address is None else address, len(data)))
+            self._file.write(data)
+            self.frames += 1
+
+    def _define_port(self, port: Optional[str], timestamp: int) -> int:
+        if len(self._ports) >= 255:
+            raise ValueError("抓包文件中的串口数量超过 255")
+        port_id = len(self._ports)
+        self._ports[port] = port_id
+        name = (port or '').encode()
+        self._file.write(RECORD.pack(timestamp, PORT, port_id, -1, len(name)))
+        self._file.write(name)
+        return port_id
+
+    def flush(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class CaptureReader:
+    """抓包读取器：内存映射文件，逐帧遍历
+
+    帧数据是映射区的 memoryview 切片，需要保留时用 bytes() 复制。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # 空文件不能映射
+            self._file.close()
+            raise ValueError(f"{path} 不是抓包文件")
+        self._view = memoryview(self._map)
+        if self._view[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} 不是抓包文件")
+
+    def __iter__(self) -> Iterator[CaptureFrame]:
+        view = self._view
+        size = len(view)
+        offset = len(MAGIC)
+        ports = {}
+        unpack = RECORD.unpack_from
+        header = RECORD.size
+        while offset + header <= size:
+            timestamp, direction, port_id, address, length = unpack(view, offset)
+            offset += header
+            if offset + length > size:
+                break  # 写入中断的最后一帧
+            data = view[offset:offset + length]
+            offset += length
+            if direction == PORT:
+                ports[port_id] = bytes(data).decode()
+                continue
+            yield CaptureFrame(timestamp / 1e9, direction, ports.get(port_id, ''),
+                               None if address < 0 else address, data)
+
+    def close(self):
+        """关闭文件（之后不能再访问已返回帧的数据）"""
+        try:
+            self._view.release()
+            self._map.close()
+        except BufferError:
+            # 仍有帧数据被引用，映射随最后一个引用一起释放
+            pass
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def latencies(frames) -> List[float]:
+    """请求到应答的延迟（秒）：同一串口、同一地址上发送后收到的第一帧"""
+    outstanding = {}
+    result = []
+    for frame in frames:
+        key = (frame.port, frame.address)
+        if frame.direction == TX:
+            outstanding[key] = frame.timestamp
+        elif frame.direction == RX:
+            sent = outstanding.pop(key, None)
+            if sent is None and frame.address is not None:
+                # 应答帧带地址而请求未标注地址时按串口匹配
+                sent = outstanding.pop((frame.port, None), None)
+            if sent is not None:
+                result.append(frame.timestamp - sent)
+    return result
+
+
+def retries(frames) -> int:
+    """重发次数：同一串口、同一地址上连续发送了相同的数据（中间没有应答）"""
+    last_tx = {}
+    count = 0
+    for frame in frames:
+        key = (frame.port, frame.address)
+        if frame.direction == TX:
+            if last_tx.get(key) == frame.data:
+                count += 1
+            last_tx[key] = frame.data
+        elif frame.direction == RX:
+            last_tx.pop(key, None)
+            last_tx.pop((frame.port, None), None)
+    return count
+
+
+def percentiles(values: Sequence[float], points=(50, 90, 99)) -> Dict[int, float]:
+    """计算百分位数（最近秩法）"""
+    if not values:
+        return {}
+    ordered = sorted(values)
+    n = len(ordered)
+    return {p: ordered[min(n - 1, max(0, math.ceil(p / 100 * n) - 1))] for p in points}
@@ -0,0 +1,182 @@
+"""多串口设备管理
+
+每个串口由一个独立的 I/O 线程（QThread + SerialController）负责收发，
+仪器按名称注册。不同串口上的设备互不阻塞，可以由多个程序线程同时驱动。
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from PyQt5.QtCore import QObject, QThread, pyqtSignal
+
+from .pump_controller import PumpController
+from .serial_controller import SerialController
+from .valve_controller import ValveController
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceManager(QObject):
+    """串口与仪器管理器"""
+
+    # 定义信号
+    port_opened = pyqtSignal(str)  # 串口已打开
+    port_closed = pyqtSignal(str)  # 串口已关闭
+    device_registered = pyqtSignal(str)  # 仪器已注册
+
+    def __init__(self, parent=None,
+                 controller_factory: Optional[Callable[[str], SerialController]] = None):
+        """初始化设备管理器
+
+        Args:
+            parent: 父对象
+            controller_factory: 按串口名创建串口控制器（例如回放），默认创建 SerialController
+        """
+        super().__init__(parent)
+        self.controller_factory = controller_factory or (lambda port: SerialController())
+        self._lock = threading.RLock()
+        self._workers: Dict[str, QThread] = {}  # 串口名 -> I/O 线程
+        self._controllers: Dict[str, SerialController] = {}  # 串口名 -> 串口控制器
+        self._adopted: List[SerialController] = []  # 由外部创建、在原线程收发的串口控制器
+        self._devices = {}  # 名称 -> 仪器
+        self.capture = None  # 之后打开的串口共用的抓包记录器
+
+    @property
+    def ports(self) -> List[str]:
+        """当前已打开的串口"""
+        with self._lock:
+            ports = [port for port, controller in self._controllers.items() if controller.is_connected]
+            ports += [c.port for c in self._adopted if c.is_connected and c.port not in ports]
+        return ports
+
+    @property
+    def devices(self) -> dict:
+        """已注册的仪器（名称 -> 仪器）"""
+        with self._lock:
+            return dict(self._devices)
+
+    def adopt(self, controller: SerialController):
+        """托管一个已有的串口控制器（例如界面使用的主串口）
+
+        该控制器连接的串口会直接复用，不再另开 I/O 线程。
+        """
+        with self._lock:
+            if controller not in self._adopted:
+                self._adopted.append(controller)
+
+    def controller(self, port: str) -> Optional[SerialController]:
+        """返回负责指定串口的控制器，未打开时返回 None"""
+        with self._lock:
+            for controller in self._adopted:
+                if controller.is_connected and controller.port == port:
+                    return controller
+            return self._controllers.get(port)
+
+    def open_port(self, settings: dict) -> SerialController:
+        """打开串口，已打开时直接返回对应的控制器
+
+        Args:
+            settings: 串口配置字典，格式同 SerialController.connect
+
+        Raises:
+            ConnectionError: 串口连接失败
+        """
+        port = settings['port']
+        with self._lock:
+            controller = self.controller(port)
+            if controller is None:
+                controller = self._start_worker(port)
+        if not controller.is_connected and not controller.connect(settings):
+            raise ConnectionError(f"串口 {port} 连接失败")
+        self.port_opened.emit(port)
+        return controller
+
+    def _start_worker(self, port: str) -> SerialController:
+        """为串口创建 I/O 线程"""
+        thread = QThread()
+        thread.setObjectName(f"serial-{port}")
+        controller = self.controller_factory(port)
+        controller.capture = self.capture
+        controller.moveToThread(thread)
+        thread.start()
+        self._workers[port] = thread
+        self._controllers[port] = controller
+        logger.info("串口 %s 的 I/O 线程已启动", port)
+        return controller
+
+    def close_port(self, port: str):
+        """关闭串口并结束其 I/O 线程（托管的控制器只断开连接）"""
+        with self._lock:
+            controller = self._controllers.pop(port, None)
+            thread = self._workers.pop(port, None)
+            if controller is None:
+                return
+            # 移除使用该串口的仪器
+            for name, device in list(self._devices.items()):
+                owner = getattr(device, 'serial_controller', None) or getattr(device, 'serial', None)
+                if owner is controller:
+                    del self._devices[name]
+        controller.disconnect()
+        thread.quit()
+        thread.wait()
+        controller.deleteLater()
+        self.port_closed.emit(port)
+        logger.info("串口 %s 的 I/O 线程已结束", port)
+
+    def register(self, name: str, device):
+        """按名称注册仪器，同名仪器会被替换"""
+        with self._lock:
+            self._devices[name] = device
+        self.device_registered.emit(name)
+
+    def get(self, name: str):
+        """按名称获取仪器
+
+        Raises:
+            KeyError: 仪器未注册
+        """
+        with self._lock:
+            if name not in self._devices:
+                raise KeyError(f"仪器 {name} 未注册")
+            return self._devices[name]
+
+    def __getitem__(self, name: str):
+        return self.get(name)
+
+    def __contains__(self, name: str):
+        with self._lock:
+            return name in self._devices
+
+    def add_pump(self, name: str, settings: dict, address='1') -> PumpController:
+        """打开串口并注册注射泵（未初始化）"""
+        pump = PumpController(self.open_port(settings), str(address))
+        self.register(name, pump)
+        return pump
+
+    def add_valve(self, name: str, settings: dict) -> ValveController:
+        """打开串口并注册旋转阀（需调用 initialize 设置地址）"""
+        valve = ValveController(self.open_port(settings))
+        self.register(name, valve)
+        return valve
+
+    def run_parallel(self, *calls: Callable) -> list:
+        """在多个线程中同时执行调用，返回各调用的结果
+
+        不同串口上的设备由各自的 I/O 线程收发，互不等待；
+        同一串口上的调用仍由总线调度器排队。任一调用出错时抛出该异常。
+        """
+        if not calls:
+            return []
+        with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+            futures = [executor.submit(call) for call in calls]
+            return [future.result() for future in futures]
+
+    def shutdown(self):
+        """关闭所有 I/O 线程"""
+        with self._lock:
+            ports = list(self._controllers)
+        for port in ports:
+            self.close_port(port)
+        with self._lock:
+            self._devices.clear()
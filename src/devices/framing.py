@@ -0,0 +1,180 @@
+"""串口接收缓冲区与应答帧解码
+
+所有接收数据只经过一个预分配的环形缓冲区，由可替换的帧解码器从中取出完整帧。
+帧以 bytes 形式交给调用方，只在取出时复制一次，不做字符串解码。
+"""
+from typing import Optional
+
+
+class ByteRingBuffer:
+    """预分配的字节环形缓冲区（容量不足时按倍数扩容）"""
+
+    def __init__(self, capacity: int = 4096):
+        self._buf = bytearray(capacity)
+        self._start = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self._buf)
+
+    def clear(self):
+        """清空缓冲区"""
+        self._start = 0
+        self._size = 0
+
+    def write(self, data) -> None:
+        """追加数据"""
+        n = len(data)
+        if not n:
+            return
+        if self._size + n > len(self._buf):
+            self._grow(self._size + n)
+        cap = len(self._buf)
+        end = (self._start + self._size) % cap
+        first = min(n, cap - end)
+        self._buf[end:end + first] = data[:first]
+        if first < n:
+            self._buf[0:n - first] = data[first:]
+        self._size += n
+
+    def _grow(self, needed: int):
+        capacity = len(self._buf)
+        while capacity < needed:
+            capacity *= 2
+        data = self.peek(self._size)
+        self._buf = bytearray(capacity)
+        self._buf[:len(data)] = data
+        self._start = 0
+
+    def _segments(self):
+        """返回数据所在的一段或两段 (起点, 终点)"""
+        cap = len(self._buf)
+        end = self._start + self._size
+        if end <= cap:
+            return ((self._start, end),)
+        return ((self._start, cap), (0, end - cap))
+
+    def __getitem__(self, index: int) -> int:
+        if not 0 <= index < self._size:
+            raise IndexError("ring buffer index out of range")
+        return self._buf[(self._start + index) % len(self._buf)]
+
+    def find(self, sub: bytes, start: int = 0) -> int:
+        """查找子串，返回相对于缓冲区起点的位置，找不到返回 -1"""
+        segments = self._segments()
+        if len(segments) == 1:
+            begin, end = segments[0]
+            index = self._buf.find(sub, begin + start, end)
+            return index - begin if index >= 0 else -1
+        (begin1, end1), (begin2, end2) = segments
+        first_len = end1 - begin1
+        if start < first_len:
+            index = self._buf.find(sub, begin1 + start, end1)
+            if index >= 0:
+                return index - begin1
+            # 跨越回绕点的匹配
+            overlap = len(sub) - 1
+            if overlap:
+                head = max(start, first_len - overlap)
+                window = self.peek(min(self._size, first_len + overlap))[head:]
+                index = window.find(sub)
+                if index >= 0:
+                    return head + index
+            start = first_len
+        index = self._buf.find(sub, begin2 + start - first_len, end2)
+        return index + first_len if index >= 0 else -1
+
+    def peek(self, n: int) -> bytes:
+        """复制前 n 个字节（不移除）"""
+        n = min(n, self._size)
+        cap = len(self._buf)
+        begin = self._start
+        if begin + n <= cap:
+            return bytes(self._buf[begin:begin + n])
+        view = memoryview(self._buf)
+        return b''.join((view[begin:cap], view[0:n - (cap - begin)]))
+
+    def take(self, n: int) -> bytes:
+        """取出前 n 个字节"""
+        data = self.peek(n)
+        self.discard(len(data))
+        return data
+
+    def discard(self, n: int):
+        """丢弃前 n 个字节"""
+        n = min(n, self._size)
+        self._size -= n
+        self._start = (self._start + n) % len(self._buf) if self._size else 0
+
+
+class FrameDecoder:
+    """帧解码器基类：从缓冲区中取出一个完整帧"""
+
+    correlates = False  # 应答帧中是否带有设备地址
+
+    def address_of(self, frame: bytes) -> Optional[int]:
+        """应答帧中的设备地址，不带地址的协议返回 None"""
+        return None
+
+    def decode(self, buffer: ByteRingBuffer) -> Optional[bytes]:
+        """取出一个完整帧，数据不足时返回 None"""
+        raise NotImplementedError
+
+
+class AsciiFrameDecoder(FrameDecoder):
+    """以结束符分隔的 ASCII 帧（注射泵应答 /0...ETX CR LF）"""
+
+    def __init__(self, terminator: bytes = b'\n'):
+        self.terminator = terminator
+
+    def decode(self, buffer: ByteRingBuffer) -> Optional[bytes]:
+        index = buffer.find(self.terminator)
+        if index < 0:
+            return None
+        return buffer.take(index + len(self.terminator))
+
+
+class FixedLengthFrameDecoder(FrameDecoder):
+    """固定长度的二进制帧（旋转阀应答为 8 字节，以起始字节开头）"""
+
+    def __init__(self, length: int, start_byte: Optional[int] = None,
+                 address_offset: Optional[int] = None):
+        self.length = length
+        self.start_byte = start_byte
+        self.address_offset = address_offset
+        self.correlates = address_offset is not None
+
+    def address_of(self, frame: bytes) -> Optional[int]:
+        if self.address_offset is None or len(frame) <= self.address_offset:
+            return None
+        return frame[self.address_offset]
+
+    def decode(self, buffer: ByteRingBuffer) -> Optional[bytes]:
+        if self.start_byte is not None:
+            # 丢弃起始字节之前的噪声以重新同步
+            skip = 0
+            while skip < len(buffer) and buffer[skip] != self.start_byte:
+                skip += 1
+            buffer.discard(skip)
+        if len(buffer) < self.length:
+            return None
+        return buffer.take(self.length)
+
+
+class AnyBytesDecoder(FrameDecoder):
+    """收到任意数据即作为一帧（最多 max_size 字节）"""
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+
+    def decode(self, buffer: ByteRingBuffer) -> Optional[bytes]:
+        if not buffer:
+            return None
+        return buffer.take(self.max_size)
@@ -0,0 +1,18 @@
+"""日志中的十六进制字节"""
+
+
+class HexBytes:
+    """按需把字节格式化为 0x03 0x55 ... 形式（作为日志参数使用）
+
+    日志记录被丢弃或只写入不输出字节的端时不会格式化::
+
+        logger.info("发送指令: %s", HexBytes(frame))
+    """
+
+    __slots__ = ('data',)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def __str__(self):
+        return ' '.join(f'0x{b:02X}' for b in self.data)
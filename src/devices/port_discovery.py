@@ -0,0 +1,120 @@
+"""串口发现服务
+
+可用串口列表只在设备插拔时重新枚举一次，所有调用方读取缓存：
+Linux 上通过 QFileSystemWatcher（inotify）监视 /dev 目录的变化，
+没有 /dev 的平台退回到按 TTL 定期刷新。
+界面启动时用 refresh_async 在后台线程中枚举，结果通过 ports_changed 通知。
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from typing import List, Optional
+
+from PyQt5.QtCore import QCoreApplication, QFileSystemWatcher, QObject, QTimer, pyqtSignal, pyqtSlot
+from PyQt5.QtSerialPort import QSerialPortInfo
+from serial.tools import list_ports
+
+logger = logging.getLogger(__name__)
+
+
+def enumerate_ports() -> List[str]:
+    """枚举可用串口（QSerialPortInfo 与 pyserial 的并集）"""
+    ports = [port.portName() for port in QSerialPortInfo.availablePorts()]
+    # 也获取 pyserial 检测到的串口
+    ports += [port.device for port in list_ports.comports()]
+    return sorted(set(ports))  # 排序以保持稳定的顺序
+
+
+class PortDiscovery(QObject):
+    """缓存可用串口列表，设备插拔时刷新"""
+
+    ports_changed = pyqtSignal(list)  # 可用串口列表发生变化
+
+    DEV_DIR = '/dev'
+    DEBOUNCE_MS = 300  # 插拔时 /dev 会连续变化，合并后再枚举
+    DEFAULT_TTL = 2.0  # 无法监视 /dev 时缓存的有效期（秒）
+
+    _instance: Optional['PortDiscovery'] = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def instance(cls) -> 'PortDiscovery':
+        """全局共用的发现服务（位于主线程）"""
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+                app = QCoreApplication.instance()
+                if app is not None and app.thread() is not cls._instance.thread():
+                    cls._instance.moveToThread(app.thread())
+            return cls._instance
+
+    def __init__(self, ttl: float = DEFAULT_TTL, parent=None):
+        super().__init__(parent)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._ports: List[str] = []
+        self._refreshed_at: Optional[float] = None  # 第一次调用 ports() 时才枚举，不拖慢启动
+        self._worker: Optional[threading.Thread] = None  # 正在进行的后台枚举
+
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(self.DEBOUNCE_MS)
+        self._debounce.timeout.connect(self.refresh)
+
+        self._watcher = None
+        self._poll_timer = None
+        if sys.platform.startswith('linux') and os.path.isdir(self.DEV_DIR):
+            self._watcher = QFileSystemWatcher([self.DEV_DIR], self)
+            self._watcher.directoryChanged.connect(self._on_dev_changed)
+        if not self.is_watching:
+            # 退回到定期刷新，以便发现拔出的串口
+            self._poll_timer = QTimer(self)
+            self._poll_timer.timeout.connect(self.refresh)
+            self._poll_timer.start(int(ttl * 1000))
+
+    @property
+    def is_watching(self) -> bool:
+        """是否通过文件系统事件刷新"""
+        return self._watcher is not None and bool(self._watcher.directories())
+
+    def ports(self) -> List[str]:
+        """可用串口列表（缓存）"""
+        with self._lock:
+            stale = self._refreshed_at is None or (
+                not self.is_watching and time.monotonic() - self._refreshed_at > self.ttl)
+            if not stale:
+                return list(self._ports)
+        return self.refresh()
+
+    def cached_ports(self) -> List[str]:
+        """缓存的串口列表，不枚举（还没有枚举过时为空）"""
+        with self._lock:
+            return list(self._ports)
+
+    @pyqtSlot()
+    def refresh(self) -> List[str]:
+        """重新枚举串口，第一次枚举或列表变化时发出 ports_changed"""
+        ports = enumerate_ports()
+        with self._lock:
+            changed = self._refreshed_at is None or ports != self._ports
+            self._ports = ports
+            self._refreshed_at = time.monotonic()
+        if changed:
+            logger.debug("Available ports changed: %s", ports)
+            self.ports_changed.emit(list(ports))
+        return list(ports)
+
+    def refresh_async(self) -> threading.Thread:
+        """在后台线程中重新枚举串口（不阻塞界面线程），已有枚举在进行时不重复启动"""
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self.refresh, name='port-discovery',
+                                                daemon=True)
+                self._worker.start()
+            return self._worker
+
+    @pyqtSlot(str)
+    def _on_dev_changed(self, path):
+        self._debounce.start()
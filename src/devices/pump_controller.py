@@ -1,14 +1,42 @@
 from typing import Optional
 from .serial_controller import SerialController
+from .framing import AsciiFrameDecoder
+from .hex_bytes import HexBytes
+from .retry_policy import RetryPolicy
 import logging
+import threading
+import time
 
-# 配置日志记录
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 class PumpController:
     """注射泵控制器"""
     
+    FRAME_DECODER = AsciiFrameDecoder(b'\n')  # 应答帧：/0 状态 数据 ETX CR LF
+    # 应答丢失后可以安全重发的命令（初始化、阀位、速度、绝对位置、停止、查询）；
+    # 相对移动（P）、延时（M）和循环（g/G）重发会重复执行，只发送一次
+    RESEND_SAFE = frozenset('ZIOVATQ')
+    COMMAND_TERMINATOR = '\r'  # 命令帧：/地址 命令 [R] CR（执行命令和状态查询相同）
+    MAX_COMMAND_LENGTH = 255  # 设备命令缓冲区长度（字符）
+    MAX_DELAY_MS = 30000  # 单条 M 延时命令的最大毫秒数
+    MAX_LOOP_COUNT = 30000  # G 循环命令的最大次数（G0 表示无限循环）
+    
+    # 状态字节（应答帧 /0 之后的第一个字节）
+    STATUS_READY_BIT = 0x20  # 1: 空闲，0: 忙
+    STATUS_ERROR_MASK = 0x0F  # 低4位为错误码
+    
+    ERROR_MESSAGES = {
+        1: "初始化错误",
+        2: "无效指令",
+        3: "无效参数",
+        6: "EEPROM 错误",
+        7: "设备未初始化",
+        9: "柱塞过载",
+        10: "阀过载",
+        11: "不允许柱塞移动",
+        15: "命令溢出"
+    }
+    
     def __init__(self, serial_controller: SerialController, pump_address: str = '1'):
         """初始化注射泵控制器
         
@@ -21,22 +49,158 @@ class PumpController:
         self.serial.data_received.connect(self.on_data_received)
         self.volume_range = 25.0  # 默认量程25ml
         self.total_steps = 6000   # 默认总步数6000步
+        self.await_completion = False  # 每条命令后等待泵执行完成
+        self.poll_interval = 0.05  # 状态查询间隔（秒）
+        self.idle_timeout = 120.0  # 等待空闲的最长时间（秒）
+        self.stop_event = threading.Event()  # 设置后等待空闲立即结束（程序运行时为解释器的停止事件）
+        # 命令应答的超时与重试，总等待时间不超过原来固定的 3 秒
+        self.retry_policy = RetryPolicy(initial_rto=1.0, max_rto=2.0, deadline=3.0)
         logger.info("注射泵控制器已初始化")
         
     def on_data_received(self, data):
         """处理接收到的串口数据"""
         # 数据已经在 MainWindow 中记录，这里只处理命令响应
-        logger.info(f"<<< {data}")  
+        logger.info("<<< %s", data)
         pass
 
     def send_command(self, command):
         """发送命令到泵"""
         if not self.serial.is_connected:
             raise ConnectionError("串口未连接")
-        # 添加泵地址和结束符
-        full_command = f"/{self.pump_address}{command}R"
-        logger.info(f">>> {full_command}")  
-        return self.serial.send_command(full_command)
+        full_command = self.command_frame(self.pump_address, command)
+        logger.info(">>> %r", full_command)
+        try:
+            response = self._request(full_command.encode(), retry=self.resend_safe(command))
+        except ConnectionError as e:
+            logger.error("Error sending command: %s", e)
+            self.serial.error_occurred.emit(f"发送命令失败：{str(e)}")
+            return False
+        if response is None:
+            self.serial.error_occurred.emit("未收到设备响应")
+            return False
+        logger.info("<<< %s", HexBytes(response))
+        if self.await_completion:
+            return self.wait_until_idle()
+        return True
+
+    @classmethod
+    def resend_safe(cls, command: str) -> bool:
+        """应答丢失后重发命令是否安全（重复执行不改变结果）"""
+        return all(ch.isdigit() or ch == ',' or ch in cls.RESEND_SAFE for ch in command)
+
+    def _request(self, frame: bytes, retry: bool = True, timeout: Optional[float] = None,
+                 notify: bool = True) -> Optional[bytes]:
+        """发送一帧并等待应答
+
+        每次等待的超时由重试策略根据观测到的往返时间给出，超时后指数退避，
+        泵无应答时在策略的 deadline 内失败。
+
+        Args:
+            frame: 完整的命令帧
+            retry: 超时后是否重发
+            timeout: 固定的等待时间（秒），默认由重试策略决定
+            notify: 是否发出 data_received 信号
+
+        Returns:
+            Optional[bytes]: 应答帧，无应答时返回 None
+        """
+        policy = self.retry_policy
+        attempts = policy.max_attempts if retry else 1
+        for attempt, rto in enumerate(policy.timeouts(attempts)):
+            try:
+                future = self.serial.submit(frame, decoder=self.FRAME_DECODER,
+                                            timeout=timeout or rto, notify=notify,
+                                            resend=attempt > 0)
+                response = self.serial.wait(future)
+            except TimeoutError:
+                policy.on_timeout()
+                logger.warning("注射泵无应答 (%d/%d, %s)", attempt + 1, attempts, policy)
+                continue
+            # 只用第一次发送的往返时间更新估计，重发后的应答无法确定对应哪一次发送
+            if attempt == 0 and getattr(future, 'rtt', None) is not None:
+                policy.observe(future.rtt)
+            return response
+        logger.error("注射泵无应答: 重试次数或等待时间已用完")
+        return None
+
+    @classmethod
+    def command_frame(cls, address, command: str, execute: bool = True) -> str:
+        """完整的命令帧
+
+        Args:
+            address: 泵地址
+            command: 命令（不含地址和结束符）
+            execute: 是否加上执行命令 R（状态查询等立即返回的命令不需要）
+        """
+        return f"/{address}{command}{'R' if execute else ''}{cls.COMMAND_TERMINATOR}"
+
+    @classmethod
+    def parse_status(cls, response: bytes) -> Optional[int]:
+        """从应答帧中取出状态字节"""
+        index = response.find(b'/0')
+        if index < 0 or index + 2 >= len(response):
+            return None
+        return response[index + 2]
+
+    def query_status(self, timeout: Optional[float] = None) -> Optional[int]:
+        """查询泵的状态字节
+
+        Args:
+            timeout: 等待应答的时间（秒），默认按 poll_interval 计算
+
+        Returns:
+            Optional[int]: 状态字节，无有效应答时返回 None
+        """
+        if not self.serial.is_connected:
+            raise ConnectionError("串口未连接")
+        response = self._request(
+            self.command_frame(self.pump_address, 'Q', execute=False).encode(),
+            retry=False,
+            timeout=self.status_timeout(self.poll_interval) if timeout is None else timeout,
+            notify=False
+        )
+        if response is None:
+            return None
+        return self.parse_status(response)
+
+    @staticmethod
+    def status_timeout(poll_interval: float) -> float:
+        """状态查询等待应答的时间（秒）"""
+        return max(poll_interval * 10, 0.5)
+
+    def wait_until_idle(self, timeout: Optional[float] = None,
+                        poll_interval: Optional[float] = None) -> bool:
+        """轮询状态字节直到泵空闲
+
+        Args:
+            timeout: 最长等待时间（秒），默认 idle_timeout
+            poll_interval: 查询间隔（秒），默认 poll_interval
+
+        Returns:
+            bool: 泵空闲且无错误时返回 True；报错或超时返回 False
+
+        Raises:
+            InterruptedError: 等待期间设置了 stop_event
+        """
+        timeout = self.idle_timeout if timeout is None else timeout
+        poll_interval = self.poll_interval if poll_interval is None else poll_interval
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.stop_event.is_set():
+                raise InterruptedError("程序已停止")
+            status = self.query_status(self.status_timeout(poll_interval))
+            if status is not None:
+                error = status & self.STATUS_ERROR_MASK
+                if error:
+                    logger.error("注射泵报错: %s", self.ERROR_MESSAGES.get(error, f'错误码 {error}'))
+                    return False
+                if status & self.STATUS_READY_BIT:
+                    return True
+            if time.monotonic() + poll_interval > deadline:
+                logger.error("等待注射泵空闲超时（%s秒）", timeout)
+                return False
+            if self.stop_event.wait(poll_interval):
+                raise InterruptedError("程序已停止")
 
     def initialize(self) -> bool:
         """初始化注射泵"""
@@ -55,10 +219,49 @@ class PumpController:
 
     def set_speed(self, speed: float) -> bool:
         """设置注射速度 (Hz)"""
+        logger.info("Setting pump speed to %s Hz", speed)
+        return self.send_command(self.speed_command(speed))
+
+    def speed_command(self, speed: float) -> str:
+        """生成设置速度的命令片段"""
         # 将速度转换为4位数字，不足补0
-        speed_str = f"{int(speed):04d}"
-        logger.info(f"Setting pump speed to {speed} Hz")
-        return self.send_command(f"V{speed_str}")
+        return f"V{int(speed):04d}"
+
+    def aspirate_command(self, volume_ml: float) -> str:
+        """生成吸液的命令片段"""
+        return f"A{self._volume_to_steps(volume_ml)}"
+
+    def dispense_command(self, volume_ml: float) -> str:
+        """生成排液的命令片段"""
+        return f"P{self._volume_to_steps(volume_ml)}"
+
+    def delay_command(self, seconds: float) -> str:
+        """生成设备端延时的命令片段（超过单条上限时拆成多条 M 命令）"""
+        ms = int(round(seconds * 1000))
+        parts = []
+        while ms > self.MAX_DELAY_MS:
+            parts.append(f"M{self.MAX_DELAY_MS}")
+            ms -= self.MAX_DELAY_MS
+        if ms > 0:
+            parts.append(f"M{ms}")
+        return ''.join(parts)
+
+    def loop_command(self, commands: list, times: int) -> str:
+        """生成设备端循环的命令（g...Gn）"""
+        if not 1 <= times <= self.MAX_LOOP_COUNT:
+            raise ValueError(f"循环次数必须在 1-{self.MAX_LOOP_COUNT} 之间")
+        return f"g{''.join(commands)}G{times}"
+
+    def batch(self) -> 'PumpBatch':
+        """创建命令批处理，多个操作合并为一条命令只需一次串口往返
+
+        用法::
+
+            with pump.batch() as batch:
+                batch.switch_to_input().set_speed(500).aspirate(5)
+            ok = batch.result
+        """
+        return PumpBatch(self)
 
     def _volume_to_steps(self, volume_ml: float) -> int:
         """将体积（ml）转换为步数"""
@@ -79,7 +282,7 @@ class PumpController:
             logger.error("量程必须大于0")
             return False
         self.volume_range = volume_ml
-        logger.info(f"Setting pump volume range to {volume_ml} ml")
+        logger.info("Setting pump volume range to %s ml", volume_ml)
         return True
 
     def set_total_steps(self, steps: int) -> bool:
@@ -88,27 +291,27 @@ class PumpController:
             logger.error("总步数必须大于0")
             return False
         self.total_steps = steps
-        logger.info(f"Setting pump total steps to {steps}")
+        logger.info("Setting pump total steps to %s", steps)
         return True
 
     def aspirate(self, volume_ml: float) -> bool:
         """吸液指定体积（单位：ml）"""
         try:
-            steps = self._volume_to_steps(volume_ml)
-            logger.info(f"Aspirating {volume_ml} ml (steps: {steps})")
-            return self.send_command(f"A{steps}")
+            command = self.aspirate_command(volume_ml)
+            logger.info("Aspirating %s ml (steps: %s)", volume_ml, command[1:])
+            return self.send_command(command)
         except ValueError as e:
-            logger.error(f"吸液失败：{str(e)}")
+            logger.error("吸液失败：%s", e)
             return False
 
     def dispense(self, volume_ml: float) -> bool:
         """排液指定体积（单位：ml）"""
         try:
-            steps = self._volume_to_steps(volume_ml)
-            logger.info(f"Dispensing {volume_ml} ml (steps: {steps})")
-            return self.send_command(f"P{steps}")
+            command = self.dispense_command(volume_ml)
+            logger.info("Dispensing %s ml (steps: %s)", volume_ml, command[1:])
+            return self.send_command(command)
         except ValueError as e:
-            logger.error(f"排液失败：{str(e)}")
+            logger.error("排液失败：%s", e)
             return False
 
     def stop(self) -> bool:
@@ -120,4 +323,103 @@ class PumpController:
         """保存设置"""
         # 这个命令在新的协议中可能不需要
         logger.info("Saving settings is not supported in current protocol")
-        return False
\ No newline at end of file
+        return False
+
+
+class PumpBatch:
+    """注射泵命令批处理
+
+    依次记录操作的命令片段，执行时合并为一条 /{addr}...R 命令发送。
+    在 with 语句中使用时，正常退出即执行，结果保存在 result 中。
+    """
+
+    def __init__(self, pump: PumpController):
+        self._pump = pump
+        self._commands = []
+        self.result = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.result = self.execute()
+        return False
+
+    def __len__(self):
+        return len(self._commands)
+
+    @property
+    def commands(self) -> list:
+        """已记录的命令片段"""
+        return list(self._commands)
+
+    def frame_length(self, times: int = 1) -> int:
+        """合并后完整命令帧的长度"""
+        command = self.command(times)
+        return len(self._pump.command_frame(self._pump.pump_address, command))
+
+    def command(self, times: int = 1) -> str:
+        """合并后的命令（不含地址和结束符）
+
+        Args:
+            times: 大于1时生成固件循环
+        """
+        if times == 1:
+            return ''.join(self._commands)
+        return self._pump.loop_command(self._commands, times)
+
+    def _add(self, command: str) -> 'PumpBatch':
+        if not command:  # 例如 0 秒延时，不产生命令片段
+            return self
+        self._commands.append(command)
+        if self.frame_length() > self._pump.MAX_COMMAND_LENGTH:
+            self._commands.pop()
+            raise ValueError(f"批处理命令超过设备缓冲区长度 {self._pump.MAX_COMMAND_LENGTH}")
+        return self
+
+    def initialize(self) -> 'PumpBatch':
+        return self._add("Z")
+
+    def switch_to_input(self) -> 'PumpBatch':
+        return self._add("I")
+
+    def switch_to_output(self) -> 'PumpBatch':
+        return self._add("O")
+
+    def set_speed(self, speed: float) -> 'PumpBatch':
+        return self._add(self._pump.speed_command(speed))
+
+    def aspirate(self, volume_ml: float) -> 'PumpBatch':
+        return self._add(self._pump.aspirate_command(volume_ml))
+
+    def dispense(self, volume_ml: float) -> 'PumpBatch':
+        return self._add(self._pump.dispense_command(volume_ml))
+
+    def delay(self, seconds: float) -> 'PumpBatch':
+        return self._add(self._pump.delay_command(seconds))
+
+    def execute(self, times: int = 1) -> bool:
+        """发送合并后的命令
+
+        Args:
+            times: 大于1时作为固件循环执行
+
+        Returns:
+            bool: 命令是否被设备接受
+
+        Raises:
+            ValueError: 命令超过设备缓冲区长度
+
+        无论是否发送成功，已记录的命令片段都会被清空。
+        """
+        if not self._commands:
+            return True
+        try:
+            if self.frame_length(times) > self._pump.MAX_COMMAND_LENGTH:
+                raise ValueError(f"批处理命令超过设备缓冲区长度 {self._pump.MAX_COMMAND_LENGTH}")
+            command = self.command(times)
+            logger.info("Executing batch of %d commands x%d: %s", len(self._commands), times, command)
+            return self._pump.send_command(command)
+        finally:
+            self._commands.clear()
@@ -0,0 +1,233 @@
+"""串口会话回放
+
+把抓包文件（见 capture.py）中记录的设备应答按发送顺序回放给 PumpController/ValveController，
+不需要连接真实设备即可重新执行生产程序，用于检查代码修改是否增加了往返次数或延迟。
+
+两种节奏：
+    realtime=True   按录制时的应答延迟返回数据
+    realtime=False  收到请求后立即返回应答（尽可能快）
+
+录制中没有的请求立即以 ReplayMismatch 失败（不等待超时），并发出 mismatched 信号，
+调用方可以在第一个不一致处停止回放。
+"""
+import logging
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from PyQt5.QtCore import QByteArray, QObject, QTimer, pyqtSignal, pyqtSlot
+from PyQt5.QtSerialPort import QSerialPort
+
+from .capture import CaptureReader, RX, TX
+from .serial_controller import SerialController
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayMismatch(ConnectionError):
+    """回放时发送了录制中没有的请求"""
+
+
+class Exchange(NamedTuple):
+    """一次请求及其应答"""
+    request: Optional[bytes]  # 为 None 表示第一次请求之前收到的主动上报数据
+    replies: Tuple[Tuple[float, bytes], ...]  # (相对请求的延迟秒数, 数据)
+
+
+def load_sessions(path: str) -> Dict[str, List[Exchange]]:
+    """从抓包文件中读取各串口的请求/应答序列"""
+    sessions: Dict[str, List[Exchange]] = {}
+    current: Dict[str, tuple] = {}  # 串口 -> (请求, 请求时间, 应答列表)
+    with CaptureReader(path) as reader:
+        for frame in reader:
+            port = frame.port
+            if frame.direction == TX:
+                if port in current:
+                    request, _, replies = current[port]
+                    sessions[port].append(Exchange(request, tuple(replies)))
+                current[port] = (bytes(frame.data), frame.timestamp, [])
+                sessions.setdefault(port, [])
+            elif frame.direction == RX:
+                if port not in current:
+                    current[port] = (None, frame.timestamp, [])
+                    sessions.setdefault(port, [])
+                _, sent_at, replies = current[port]
+                replies.append((frame.timestamp - sent_at, bytes(frame.data)))
+    for port, (request, _, replies) in current.items():
+        sessions[port].append(Exchange(request, tuple(replies)))
+    return sessions
+
+
+class ReplaySerialPort(QObject):
+    """按录制的会话应答的串口（实现 SerialController 使用到的 QSerialPort 接口）"""
+
+    readyRead = pyqtSignal()
+    errorOccurred = pyqtSignal(QSerialPort.SerialPortError)
+
+    def __init__(self, exchanges: List[Exchange], realtime: bool = False, parent=None):
+        super().__init__(parent)
+        self.exchanges = exchanges
+        self.realtime = realtime
+        self._next = 0  # 下一个期望的请求
+        self._open = False
+        self._port_name = ''
+        self._rx = bytearray()
+        self._scheduled = []  # (到期时间, 数据)，按到期时间排序
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._on_timer)
+        # 统计
+        self.writes = 0
+        self.matched = 0
+        self.unexpected = 0  # 录制中没有的请求
+        self.skipped = 0  # 录制中有、回放时没有发送的请求
+        self.first_mismatch: Optional[bytes] = None  # 第一个录制中没有的请求
+
+    # QSerialPort 接口
+    def setPortName(self, name):
+        self._port_name = name
+
+    def portName(self):
+        return self._port_name
+
+    def setBaudRate(self, *args):
+        return True
+
+    setDataBits = setParity = setStopBits = setFlowControl = setBaudRate
+
+    def open(self, mode):
+        self._open = True
+        if self.exchanges and self.exchanges[0].request is None:
+            # 第一次请求之前录制到的主动上报数据
+            self._schedule(self.exchanges[0].replies)
+            self._next = 1
+        return True
+
+    def isOpen(self):
+        return self._open
+
+    def close(self):
+        self._open = False
+        self._timer.stop()
+        self._scheduled.clear()
+        self._rx.clear()
+
+    def errorString(self):
+        return ''
+
+    def flush(self):
+        return True
+
+    def write(self, data: bytes) -> int:
+        self.writes += 1
+        index = self._find(bytes(data))
+        if index is None:
+            self.unexpected += 1
+            if self.first_mismatch is None:
+                self.first_mismatch = bytes(data)
+            logger.warning("回放中没有匹配的请求: %r", bytes(data))
+            return len(data)
+        if index > self._next:
+            self.skipped += index - self._next
+            logger.warning("回放跳过了 %d 个录制的请求", index - self._next)
+        self.matched += 1
+        self._next = index + 1
+        self._schedule(self.exchanges[index].replies)
+        return len(data)
+
+    def readAll(self) -> QByteArray:
+        data = QByteArray(bytes(self._rx))
+        self._rx.clear()
+        return data
+
+    def waitForReadyRead(self, msecs: int) -> bool:
+        """没有事件循环时（在串口线程中同步等待）直接交付到期的应答"""
+        if not self._scheduled:
+            if self._rx:
+                return True
+            time.sleep(msecs / 1000)
+            return False
+        wait = self._scheduled[0][0] - time.monotonic()
+        if wait > 0:
+            if wait * 1000 > msecs:
+                time.sleep(msecs / 1000)
+                return False
+            time.sleep(wait)
+        return self._deliver_due()
+
+    # 回放
+    @property
+    def remaining(self) -> int:
+        """尚未回放的录制请求数"""
+        return len(self.exchanges) - self._next
+
+    def _find(self, data: bytes) -> Optional[int]:
+        """从当前位置往后查找相同的录制请求"""
+        for index in range(self._next, len(self.exchanges)):
+            if self.exchanges[index].request == data:
+                return index
+        return None
+
+    def _schedule(self, replies):
+        now = time.monotonic()
+        for delay, data in replies:
+            self._scheduled.append((now + delay if self.realtime else now, data))
+        self._scheduled.sort(key=lambda item: item[0])
+        self._arm()
+
+    def _arm(self):
+        if self._scheduled:
+            wait = self._scheduled[0][0] - time.monotonic()
+            self._timer.start(max(0, int(wait * 1000)))
+
+    @pyqtSlot()
+    def _on_timer(self):
+        self._deliver_due()
+
+    def _deliver_due(self) -> bool:
+        now = time.monotonic()
+        delivered = False
+        while self._scheduled and self._scheduled[0][0] <= now:
+            self._rx += self._scheduled.pop(0)[1]
+            delivered = True
+        self._arm()
+        if delivered and self._open:
+            self.readyRead.emit()
+        return delivered
+
+    def summary(self) -> dict:
+        """回放统计"""
+        return {
+            'port': self._port_name,
+            'writes': self.writes,
+            'matched': self.matched,
+            'unexpected': self.unexpected,
+            'skipped': self.skipped,
+            'remaining': self.remaining,
+            'first_mismatch': self.first_mismatch,
+        }
+
+
+class ReplaySerialController(SerialController):
+    """使用回放串口的串口控制器"""
+
+    mismatched = pyqtSignal(bytes)  # 发送了录制中没有的请求
+
+    def __init__(self, port: str, exchanges: List[Exchange], realtime: bool = False):
+        self.replay_port = port
+        super().__init__(ReplaySerialPort(exchanges, realtime))
+
+    def _write(self, data: bytes, address=None) -> bool:
+        """写入数据，录制中没有的请求不会有应答，立即失败而不是等到超时
+
+        Raises:
+            ReplayMismatch: 录制中没有该请求
+        """
+        unexpected = self.serial.unexpected
+        written = super()._write(data, address)
+        if self.serial.unexpected != unexpected:
+            self.mismatched.emit(bytes(data))
+            raise ReplayMismatch(f"回放中没有匹配的请求: {bytes(data)!r}")
+        return written
+
+    def get_available_ports(self):
+        return [self.replay_port]
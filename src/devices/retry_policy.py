@@ -0,0 +1,69 @@
+"""按往返时间自适应的超时与重试策略
+
+参照 TCP 重传超时（RFC 6298）：用平滑往返时间 SRTT 和偏差 RTTVAR 计算超时 RTO，
+超时后 RTO 指数退避；每次命令的总等待时间有上限，设备无应答时尽快失败。
+"""
+import time
+from typing import Iterator, Optional
+
+
+class RetryPolicy:
+    """一个设备（一类命令）的超时与重试策略"""
+
+    ALPHA = 1 / 8  # SRTT 的平滑系数
+    BETA = 1 / 4  # RTTVAR 的平滑系数
+    K = 4  # RTO = SRTT + K * RTTVAR
+
+    def __init__(self, initial_rto: float = 2.0, min_rto: float = 0.1, max_rto: float = 4.0,
+                 max_attempts: int = 3, deadline: float = 8.0, backoff: float = 2.0):
+        """初始化重试策略
+
+        Args:
+            initial_rto: 还没有往返时间样本时的超时（秒）
+            min_rto: 超时下限（秒）
+            max_rto: 超时上限（秒）
+            max_attempts: 最多发送次数
+            deadline: 一次命令（包括重试）的总等待时间上限（秒）
+            backoff: 超时后 RTO 的放大倍数
+        """
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self.max_attempts = max_attempts
+        self.deadline = deadline
+        self.backoff = backoff
+        self.srtt: Optional[float] = None
+        self.rttvar: Optional[float] = None
+        self.rto = initial_rto
+
+    def observe(self, rtt: float):
+        """记录一次成功的往返时间"""
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+        self.rto = self._clamp(self.srtt + self.K * self.rttvar)
+
+    def on_timeout(self):
+        """超时后指数退避"""
+        self.rto = self._clamp(self.rto * self.backoff)
+
+    def timeouts(self, attempts: Optional[int] = None) -> Iterator[float]:
+        """依次给出每次发送的超时时间，总时间不超过 deadline
+
+        每次取当前的 RTO，调用方在超时后调用 on_timeout 即可得到退避后的值。
+        """
+        started = time.monotonic()
+        for _ in range(attempts or self.max_attempts):
+            remaining = self.deadline - (time.monotonic() - started)
+            if remaining <= 0:
+                return
+            yield min(self.rto, remaining)
+
+    def _clamp(self, rto: float) -> float:
+        return min(self.max_rto, max(self.min_rto, rto))
+
+    def __repr__(self):
+        srtt = f"{self.srtt * 1000:.1f}ms" if self.srtt is not None else "-"
+        return f"RetryPolicy(srtt={srtt}, rto={self.rto * 1000:.0f}ms)"
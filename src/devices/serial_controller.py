@@ -1,11 +1,57 @@
-from PyQt5.QtCore import QObject, pyqtSignal, QTimer
-from PyQt5.QtSerialPort import QSerialPort, QSerialPortInfo
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot, QTimer, QThread
+from PyQt5.QtSerialPort import QSerialPort
+from concurrent.futures import Future
+from typing import Optional
 import logging
-from serial.tools import list_ports
+from .bus_scheduler import BusScheduler
+from .capture import CaptureWriter, TX, RX
+from .framing import (ByteRingBuffer, FrameDecoder, AsciiFrameDecoder,
+                      FixedLengthFrameDecoder, AnyBytesDecoder)
+from .port_discovery import PortDiscovery
+from .hex_bytes import HexBytes
 import time
 
 logger = logging.getLogger(__name__)
 
+
+class SerialRequest:
+    """一次串口请求：待发送的数据以及用于判定应答帧完整的解码器"""
+
+    __slots__ = ('data', 'decoder', 'address', 'max_size', 'timeout', 'notify',
+                 'resend', 'future', 'deadline', 'sent_at')
+
+    def __init__(self, data: bytes, decoder: FrameDecoder, address=None,
+                 max_size: int = 1024, timeout: float = 3.0, notify: bool = True,
+                 resend: bool = False):
+        self.data = data
+        self.decoder = decoder
+        self.address = address
+        self.max_size = max_size
+        self.timeout = timeout
+        # 只有文本帧才通过 data_received 上报
+        self.notify = notify and isinstance(decoder, AsciiFrameDecoder)
+        self.resend = resend  # 超时后的重发
+        self.future = Future()
+        self.deadline = None
+        self.sent_at = None
+
+
+class IOStats:
+    """串口收发计数（只增不减，性能分析时按差值统计）"""
+
+    __slots__ = ('requests', 'bytes_sent', 'bytes_received', 'timeouts', 'retries')
+
+    def __init__(self):
+        self.requests = 0  # 完成的请求（往返）数
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.timeouts = 0  # 超时的请求数
+        self.retries = 0  # 超时后重发的请求数（由设备控制器的重试策略标记）
+
+    def snapshot(self) -> tuple:
+        return (self.requests, self.bytes_sent, self.bytes_received, self.timeouts, self.retries)
+
+
 class SerialController(QObject):
     # 定义信号
     connected = pyqtSignal(bool)  # 连接状态改变信号
@@ -13,34 +59,49 @@ class SerialController(QObject):
     data_received = pyqtSignal(str)  # 数据接收信号
     data_sent = pyqtSignal(str)  # 数据发送信号
     ports_discovered = pyqtSignal(list)  # 发现串口时发出信号
+    _request_posted = pyqtSignal(object)  # 内部信号：把请求投递到串口所在线程
+    _invoke_posted = pyqtSignal(object)  # 内部信号：在串口所在线程中执行调用
 
-    def __init__(self):
+    DEFAULT_TERMINATOR = b'\n'  # 注射泵 ASCII 应答帧以换行结束
+    DEFAULT_TIMEOUT = 3.0  # 单个请求的默认超时时间（秒）
+
+    def __init__(self, transport: Optional[QObject] = None):
+        """初始化串口控制器
+
+        Args:
+            transport: 与 QSerialPort 接口相同的传输对象（例如会话回放），默认使用 QSerialPort
+        """
         super().__init__()
-        self.serial = QSerialPort()
+        self.serial = transport or QSerialPort()
+        self.serial.setParent(self)  # 以控制器为父对象，随 moveToThread 一起移动
         self.serial.readyRead.connect(self._on_data_ready)
         self.serial.errorOccurred.connect(self._on_error)
-        self._buffer = ""
+        self._rx = ByteRingBuffer()  # 接收缓冲区（唯一的接收路径）
+        self.unsolicited_decoder = AsciiFrameDecoder()  # 主动上报数据的帧格式
         self._port = None  # 添加端口属性
-        
-        # 初始化时检查可用串口
-        ports = self.get_available_ports()
-        if ports:
-            self.ports_discovered.emit(ports)
-            
-        # 添加定时器检查串口状态
-        self._check_timer = QTimer()
-        self._check_timer.timeout.connect(self._check_port_status)
-        self._check_timer.start(1000)  # 每秒检查一次
+        self.capture: Optional[CaptureWriter] = None  # 抓包记录器，为 None 时不记录
+        self.stats = IOStats()
+
+        # 请求调度：半双工总线上同一时刻只有一个请求在途
+        self._bus = BusScheduler()
+        self._request_posted.connect(self._enqueue_request)
+        self._invoke_posted.connect(self._on_invoke)
+        self._timeout_timer = QTimer(self)
+        self._timeout_timer.setSingleShot(True)
+        self._timeout_timer.timeout.connect(self._check_deadline)
+
+        # 串口列表由发现服务在枚举完成和插拔时通知，构造时不枚举
+        PortDiscovery.instance().ports_changed.connect(self._on_ports_changed)
         
         logger.info("SerialController initialized")
 
-    def _check_port_status(self):
-        """检查串口状态"""
+    @pyqtSlot(list)
+    def _on_ports_changed(self, ports):
+        """可用串口列表变化时检查当前串口是否仍然存在"""
+        self.ports_discovered.emit(ports)
         if self.is_connected:
-            # 检查串口是否仍然存在
-            current_ports = self.get_available_ports()
-            if self._port not in current_ports:
-                logger.warning(f"串口 {self._port} 已断开")
+            if self._port not in self.get_available_ports():
+                logger.warning("串口 %s 已断开", self._port)
                 self.disconnect()
                 self.error_occurred.emit(f"串口 {self._port} 已断开连接")
 
@@ -66,9 +127,14 @@ class SerialController(QObject):
                 - stopbits: 停止位
                 - flowcontrol: 流控制
         """
+        if QThread.currentThread() is not self.thread():
+            return self._call_in_thread(self.connect, settings)
         try:
             # 检查端口是否存在
             available_ports = self.get_available_ports()
+            if settings['port'] not in available_ports:
+                # 缓存可能还没来得及更新，重新枚举一次
+                available_ports = self._refresh_ports()
             if settings['port'] not in available_ports:
                 raise ConnectionError(f"串口 {settings['port']} 不存在")
                 
@@ -122,45 +188,136 @@ class SerialController(QObject):
             
             # 发送连接状态信号
             self.connected.emit(True)
-            logger.info(f"串口 {settings['port']} 已连接")
+            logger.info("串口 %s 已连接", settings['port'])
             return True
             
         except Exception as e:
-            logger.error(f"串口连接失败: {str(e)}")
+            logger.error("串口连接失败: %s", e)
             self.error_occurred.emit(str(e))
             return False
 
     def disconnect(self):
         """断开连接"""
+        if QThread.currentThread() is not self.thread():
+            return self._call_in_thread(self.disconnect)
         if self.is_connected:
             logger.info("Disconnecting from serial port")
+            self._fail_all(ConnectionError("串口已断开"))
             self.serial.close()
+            self._rx.clear()
             self._port = None  # 清除端口名
             self.connected.emit(False)
 
+    def start_capture(self, path: str) -> CaptureWriter:
+        """开始把收发的帧记录到二进制抓包文件"""
+        self.stop_capture()
+        self.capture = CaptureWriter(path)
+        logger.info("开始抓包: %s", path)
+        return self.capture
+
+    def stop_capture(self):
+        """停止抓包并关闭文件"""
+        if self.capture is not None:
+            self.capture.close()
+            logger.info("抓包已保存: %s（%d 帧）", self.capture.path, self.capture.frames)
+            self.capture = None
+
     def write(self, data: bytes):
         """写入数据"""
+        if QThread.currentThread() is not self.thread():
+            return self._call_in_thread(self.write, data)
+        return self._write(data)
+
+    def _write(self, data: bytes, address=None) -> bool:
+        """在串口线程中写入数据"""
         if not self.is_connected:
             logger.error("Attempted to write while not connected")
             raise ConnectionError("串口未连接")
 
-        logger.debug(f"Writing data: {data}")
+        logger.debug("Writing data: %r", data)
         written = self.serial.write(data)
         if written == -1:
             error = self.serial.errorString()
-            logger.error(f"Failed to write data: {error}")
+            logger.error("Failed to write data: %s", error)
             self.error_occurred.emit(f"写入数据失败：{error}")
             return False
         
         self.serial.flush()
-        self.data_sent.emit(data.hex())  # 发送数据发送信号，使用十六进制显示
+        self.stats.bytes_sent += len(data)
+        if self.capture is not None:
+            self.capture.record(TX, self._port, address, data)
+        if self.receivers(self.data_sent):
+            self.data_sent.emit(data.hex())  # 发送数据发送信号，使用十六进制显示
         return True
 
+    def submit(self, data: bytes, decoder: Optional[FrameDecoder] = None,
+               terminator: Optional[bytes] = None, expected_length: Optional[int] = None,
+               address=None, max_size: int = 1024, timeout: Optional[float] = None,
+               notify: bool = True, resend: bool = False) -> Future:
+        """提交一个请求，立即返回 Future，收到完整应答帧后即被解析
+
+        可以在任意线程调用，请求会被投递到串口所在线程，由总线调度器按顺序发送。
+
+        Args:
+            data: 要发送的数据，为空时只等待接收
+            decoder: 应答帧解码器，未指定时按 terminator/expected_length 创建
+            terminator: 应答帧结束符
+            expected_length: 应答帧固定长度
+            address: 设备地址，应答帧带地址时用于确认应答来自该设备
+            max_size: 未指定帧格式时单次最多接收的字节数
+            timeout: 超时时间（秒），默认 DEFAULT_TIMEOUT
+            notify: 文本应答是否通过 data_received 上报（状态轮询等可关闭）
+            resend: 是否为超时后的重发（计入 stats.retries）
+
+        Returns:
+            Future: 结果为应答帧 bytes；超时抛出 TimeoutError，断开抛出 ConnectionError
+        """
+        if decoder is None:
+            if expected_length:
+                decoder = FixedLengthFrameDecoder(expected_length)
+            elif terminator:
+                decoder = AsciiFrameDecoder(terminator)
+            else:
+                decoder = AnyBytesDecoder(max_size)
+        request = SerialRequest(
+            data, decoder, address=address, max_size=max_size,
+            timeout=self.DEFAULT_TIMEOUT if timeout is None else timeout,
+            notify=notify, resend=resend
+        )
+        if not self.is_connected:
+            request.future.set_exception(ConnectionError("串口未连接"))
+            return request.future
+        # 同线程时直接调用，跨线程时由 Qt 自动排队到串口线程
+        self._request_posted.emit(request)
+        return request.future
+
+    def wait(self, future: Future) -> bytes:
+        """阻塞等待请求完成（供脚本和同步接口使用）
+
+        在串口所在线程中调用时没有事件循环可用，改用 waitForReadyRead 驱动接收。
+        """
+        if QThread.currentThread() is self.thread():
+            while not future.done():
+                if not self.is_connected:
+                    self._fail_all(ConnectionError("串口已断开"))
+                    break
+                self._check_deadline()
+                if future.done():
+                    break
+                deadline = self._bus.deadline()
+                remaining = deadline - time.monotonic() if deadline else 0
+                self.serial.waitForReadyRead(max(1, min(int(remaining * 1000), 50)))
+        return future.result()
+
+    def request(self, data: bytes, **kwargs) -> bytes:
+        """发送数据并阻塞等待应答帧，参数同 submit"""
+        return self.wait(self.submit(data, **kwargs))
+
     def read(self, size: int) -> bytes:
-        """读取指定字节数的数据
+        """读取已经收到的数据（不等待）
         
         Args:
-            size: 要读取的字节数
+            size: 最多读取的字节数
             
         Returns:
             bytes: 读取的数据
@@ -171,23 +328,22 @@ class SerialController(QObject):
         if not self.is_connected:
             logger.error("Attempted to read while not connected")
             raise ConnectionError("串口未连接")
-            
-        data = self.serial.readAll().data()
+
+        data = self._rx.take(size)
         if data:
-            logger.debug(f"Read data: {data.hex()}")  # 使用十六进制显示
-            return data
-        return bytes()
+            logger.debug("Read data: %s", HexBytes(data))  # 使用十六进制显示
+        return data
 
     def read_with_retry(self, size: int, retries: int = 3, timeout: float = 2.0) -> bytes:
-        """读取指定字节数的数据，带重试和超时机制
+        """读取数据，收到任意数据立即返回，最长等待 retries * timeout 秒
         
         Args:
-            size: 要读取的字节数
+            size: 最多读取的字节数
             retries: 重试次数
             timeout: 每次重试的超时时间（秒）
         
         Returns:
-            bytes: 读取的数据
+            bytes: 读取的数据，超时返回空
         
         Raises:
             ConnectionError: 串口未连接时抛出
@@ -196,19 +352,13 @@ class SerialController(QObject):
             logger.error("Attempted to read while not connected")
             raise ConnectionError("串口未连接")
 
-        attempt = 0
-        while attempt < retries:
-            data = self.serial.readAll().data()
-            if data:
-                logger.debug(f"Read data: {data.hex()}")  # 使用十六进制显示
-                return data
-            else:
-                logger.warning(f"No data received, retrying... ({attempt + 1}/{retries})")
-                time.sleep(timeout)
-                attempt += 1
-
-        logger.error("Failed to receive data after multiple attempts")
-        return bytes()
+        try:
+            data = self.request(b'', max_size=size, timeout=retries * timeout)
+        except TimeoutError:
+            logger.error("Failed to receive data after multiple attempts")
+            return bytes()
+        logger.debug("Read data: %s", HexBytes(data))  # 使用十六进制显示
+        return data
 
     def send_command(self, command):
         """发送命令并等待反馈
@@ -220,59 +370,162 @@ class SerialController(QObject):
             bool: 命令是否成功执行
         """
         try:
-            # 发送命令
-            if not self.write(command.encode()):
-                return False
-                
-            # 等待并读取反馈
-            response = self.read_with_retry(size=1024, retries=3, timeout=1.0)
-            if response:
-                logger.info(f"<<< {response.hex()}")  # 使用十六进制显示接收到的数据
-                self.data_received.emit(response.decode())  # 发送反馈信号
-                return True
-            else:
-                logger.error("No response received from device")
-                self.error_occurred.emit("未收到设备响应")
-                return False
-                
+            response = self.request(command.encode(), terminator=self.DEFAULT_TERMINATOR)
+            logger.info("<<< %s", HexBytes(response))  # 使用十六进制显示接收到的数据
+            return True
+        except TimeoutError:
+            logger.error("No response received from device")
+            self.error_occurred.emit("未收到设备响应")
+            return False
         except Exception as e:
-            logger.error(f"Error sending command: {e}")
+            logger.error("Error sending command: %s", e)
             self.error_occurred.emit(f"发送命令失败：{str(e)}")
             return False
 
+    def _call_in_thread(self, fn, *args):
+        """在串口所在线程中同步执行调用（QSerialPort 不能跨线程直接使用）"""
+        future = Future()
+        self._invoke_posted.emit((fn, args, future))
+        return future.result()
+
+    @pyqtSlot(object)
+    def _on_invoke(self, invocation):
+        """执行从其他线程投递过来的调用"""
+        fn, args, future = invocation
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+
+    @pyqtSlot(object)
+    def _enqueue_request(self, request: SerialRequest):
+        """在串口线程中把请求加入队列"""
+        self._bus.push(request)
+        self._start_next()
+
+    def _start_next(self):
+        """发送所有当前可以发送的请求"""
+        while True:
+            request = self._bus.next_ready()
+            if request is None:
+                break
+            if request.data and self._bus.in_flight is None:
+                # 总线空闲时残留的数据不属于新请求
+                self._flush_unsolicited()
+                if self._rx:
+                    logger.debug("Discarding %d bytes of stale data", len(self._rx))
+                    self._rx.clear()
+            try:
+                if request.data and not self._write(request.data, request.address):
+                    raise ConnectionError("写入数据失败")
+            except Exception as e:
+                request.future.set_exception(e)
+                continue
+            if request.resend:
+                self.stats.retries += 1
+            request.sent_at = time.monotonic()
+            request.deadline = request.sent_at + request.timeout
+            self._bus.start(request)
+        self._arm_timer()
+        # 数据可能已在缓冲区中（只读请求）
+        self._process_rx()
+
+    def _arm_timer(self):
+        """按在途请求的截止时间设置超时定时器"""
+        deadline = self._bus.deadline()
+        if deadline is None:
+            self._timeout_timer.stop()
+        else:
+            self._timeout_timer.start(max(1, int((deadline - time.monotonic()) * 1000)))
+
+    def _process_rx(self):
+        """把接收缓冲区中的应答帧匹配给在途请求，其余作为主动上报处理"""
+        while self._bus.in_flight is not None:
+            frame = self._bus.decoder().decode(self._rx)
+            if frame is None:
+                return
+            request = self._bus.match(frame)
+            if request is None:
+                if self.capture is not None:
+                    self.capture.record(RX, self._port, self._bus.decoder().address_of(frame), frame)
+                logger.warning("Unmatched frame: %s", HexBytes(frame))
+                continue
+            self._complete(request, frame)
+        self._flush_unsolicited()
+
+    def _complete(self, request: SerialRequest, frame: bytes):
+        """请求完成"""
+        self._bus.finish(request)
+        if self.capture is not None:
+            self.capture.record(RX, self._port, request.address, frame)
+        # 往返时间从真正发出时算起（不含排队时间），供重试策略估计超时
+        request.future.rtt = time.monotonic() - request.sent_at
+        self.stats.requests += 1
+        logger.debug("Request completed in %.1f ms", request.future.rtt * 1000)
+        request.future.set_result(frame)
+        if request.notify:
+            # 文本协议的应答同时作为接收数据上报
+            self.data_received.emit(frame.decode(errors='replace').strip())
+        self._start_next()
+
+    @pyqtSlot()
+    def _check_deadline(self):
+        """处理已超时的在途请求"""
+        request = self._bus.in_flight
+        if request is not None and request.deadline <= time.monotonic():
+            # 应答不带地址时，超时前收到的不完整数据仍然返回给调用方
+            if not self._bus.correlated(request) and self._rx:
+                frame = self._rx.take(request.max_size)
+                logger.warning("Incomplete frame after %ss: %s", request.timeout, HexBytes(frame))
+                self._complete(request, frame)
+            else:
+                self._bus.finish(request)
+                self.stats.timeouts += 1
+                request.future.set_exception(TimeoutError(f"等待应答超时（{request.timeout}秒）"))
+        self._start_next()
+
+    def _fail_all(self, error: Exception):
+        """取消所有未完成的请求"""
+        self._timeout_timer.stop()
+        for request in self._bus.drain():
+            if not request.future.done():
+                request.future.set_exception(error)
+
+    def _flush_unsolicited(self):
+        """把不属于任何请求的完整行作为主动上报数据发出"""
+        while True:
+            frame = self.unsolicited_decoder.decode(self._rx)
+            if frame is None:
+                return
+            if self.capture is not None:
+                self.capture.record(RX, self._port, None, frame)
+            line = frame.decode(errors='replace').strip()
+            if line:  # 忽略空行
+                logger.debug("Received line: %s", line)
+                self.data_received.emit(line)
+
+    @pyqtSlot()
     def _on_data_ready(self):
         """数据就绪时调用"""
         try:
-            data = self.serial.readAll().data().decode()
-            self._buffer += data
-            
-            # 处理完整的行
-            while '\n' in self._buffer:
-                line, self._buffer = self._buffer.split('\n', 1)
-                line = line.strip()
-                if line:  # 忽略空行
-                    logger.debug(f"Received line: {line}")
-                    self.data_received.emit(line)
-                    
+            data = self.serial.readAll().data()
+            self.stats.bytes_received += len(data)
+            self._rx.write(data)
+            self._process_rx()
         except Exception as e:
-            logger.error(f"Error reading data: {e}")
+            logger.error("Error reading data: %s", e)
             self.error_occurred.emit(f"读取数据失败：{str(e)}")
 
+    @pyqtSlot(QSerialPort.SerialPortError)
     def _on_error(self, error):
         """错误发生时调用"""
         self.error_occurred.emit(str(error))
 
     def get_available_ports(self):
-        """获取可用串口列表"""
-        ports = []
-        for port in QSerialPortInfo.availablePorts():
-            ports.append(port.portName())
-        
-        # 也获取 pyserial 检测到的串口
-        serial_ports = [port.device for port in list_ports.comports()]
-        
-        # 合并两个列表并去重
-        all_ports = list(set(ports + serial_ports))
-        all_ports.sort()  # 排序以保持稳定的顺序
-        
-        return all_ports
+        """获取可用串口列表（来自发现服务的缓存）"""
+        return PortDiscovery.instance().ports()
+
+    def _refresh_ports(self):
+        """重新枚举串口"""
+        PortDiscovery.instance().refresh()
+        return self.get_available_ports()
@@ -34,7 +34,7 @@ class SerialSettings:
                     self.current_settings.update(json.load(f))
                 logger.info("已加载串口设置")
         except Exception as e:
-            logger.error(f"加载串口设置失败: {e}")
+            logger.error("加载串口设置失败: %s", e)
             
     def save_settings(self):
         """保存设置"""
@@ -45,7 +45,7 @@ class SerialSettings:
             logger.info("已保存串口设置")
             return True
         except Exception as e:
-            logger.error(f"保存串口设置失败: {e}")
+            logger.error("保存串口设置失败: %s", e)
             return False
             
     def update_settings(self, **kwargs):
@@ -1,6 +1,9 @@
 import logging
 import time
-from typing import Optional, Tuple
+from typing import Optional
+from .framing import FixedLengthFrameDecoder
+from .retry_policy import RetryPolicy
+from .hex_bytes import HexBytes
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +16,11 @@ class ValveController:
     QUERY_POS_CMD = 0x33  # 查询当前孔位
     QUERY_LAST_POS_CMD = 0x44  # 查询断电前孔位
     STATUS_CMD = 0x55  # 查询状态
+    ADDRESS_OFFSET = 2  # 帧中设备地址所在的字节
+    # 旋转指令的应答在转到位后才返回，耗时取决于转过的孔位数：
+    # 超时下限取转过半圈（最远的孔位）的最长时间，短距离旋转学到的往返时间不会让长距离旋转超时
+    MAX_ROTATION_TIME = 1.5  # 转过半圈的最长时间（秒）
+    ROTATE_MIN_RTO = MAX_ROTATION_TIME + 0.5
     
     # 状态码
     STATUS_SUCCESS = 0x00
@@ -39,6 +47,7 @@ class ValveController:
         """
         self.serial_controller = serial_controller
         self.device_address = None
+        self._retry_policies = {}  # 指令 -> RetryPolicy
     
     def initialize(self, device_address: int) -> bool:
         """初始化旋转阀
@@ -54,16 +63,30 @@ class ValveController:
             # 检查设备状态
             status = self.check_status()
             if status == self.STATUS_SUCCESS:
-                logger.info(f"旋转阀 (地址: {device_address}) 初始化成功")
+                logger.info("旋转阀 (地址: %s) 初始化成功", device_address)
                 return True
             else:
-                logger.error(f"旋转阀 (地址: {device_address}) 初始化失败: {self.STATUS_MESSAGES.get(status, '未知状态')}")
+                logger.error("旋转阀 (地址: %s) 初始化失败: %s", device_address, self.STATUS_MESSAGES.get(status, '未知状态'))
                 return False
         except Exception as e:
-            logger.error(f"旋转阀初始化出错: {str(e)}")
+            logger.error("旋转阀初始化出错: %s", e)
             return False
     
-    def _calculate_checksum(self, data: list) -> int:
+    @classmethod
+    def status_frame(cls, device_address: int) -> bytes:
+        """构造查询状态的指令帧（用于自动检测）"""
+        command = [cls.START_BYTE, cls.STATUS_CMD, device_address, 0x00, 0x00, 0x00, 0x00]
+        return bytes(command + [cls._calculate_checksum(command)])
+
+    @classmethod
+    def is_valid_response(cls, response: bytes, command: int, device_address: int) -> bool:
+        """检查应答帧的起始字节、指令、地址和校验和"""
+        return (len(response) == 8 and response[0] == cls.START_BYTE and response[1] == command
+                and response[cls.ADDRESS_OFFSET] == device_address
+                and cls._calculate_checksum(response[:7]) == response[7])
+
+    @staticmethod
+    def _calculate_checksum(data: list) -> int:
         """计算校验和 (XOR)
         
         Args:
@@ -77,15 +100,29 @@ class ValveController:
             checksum ^= byte
         return checksum
     
-    def _send_command(self, command: list, expected_length: int = 8, retry_count: int = 3, retry_timeout: float = 1.0, read_timeout: float = 2.0) -> Optional[bytes]:
+    def _retry_policy(self, command: int) -> RetryPolicy:
+        """每种指令各自学习往返时间（旋转指令的应答比查询慢得多）"""
+        policy = self._retry_policies.get(command)
+        if policy is None:
+            if command == self.ROTATE_CMD:
+                policy = RetryPolicy(min_rto=self.ROTATE_MIN_RTO)
+            else:
+                policy = RetryPolicy()
+            self._retry_policies[command] = policy
+        return policy
+
+    def _send_command(self, command: list, expected_length: int = 8, retry_count: Optional[int] = None, retry_timeout: float = 0.0, read_timeout: Optional[float] = None) -> Optional[bytes]:
         """发送命令并接收响应
-        
+
+        每次等待的超时由重试策略根据观测到的往返时间给出，超时后指数退避，
+        所有重试的总等待时间不超过策略的 deadline。
+
         Args:
             command: 命令字节列表
             expected_length: 期望的响应长度
-            retry_count: 最大重试次数
-            retry_timeout: 每次重试之间的等待时间（秒）
-            read_timeout: 每次读取的超时时间（秒）
+            retry_count: 最大发送次数，默认由重试策略决定
+            retry_timeout: 每次重试之前额外等待的时间（秒）
+            read_timeout: 固定的读取超时时间（秒），默认由重试策略决定
             
         Returns:
             Optional[bytes]: 响应数据，如果出错则返回 None
@@ -97,60 +134,68 @@ class ValveController:
             
             # 记录发送的指令
             cmd_bytes = bytes(command)
-            cmd_str = ' '.join([f'0x{b:02X}' for b in cmd_bytes])
             
-            # 如果是旋转命令，添加孔位说明
+            # 如果是旋转命令，添加孔位说明（消息在输出时才格式化）
             if len(command) > 2 and command[1] == self.ROTATE_CMD:
                 target_pos = command[6]  # 0-based position
-                logger.info(f"发送指令: {cmd_str} (旋转到孔位 {target_pos + 1}，协议中使用从0开始的编号 0x{target_pos:02X})")
+                logger.info("发送指令: %s (旋转到孔位 %d，协议中使用从0开始的编号 0x%02X)",
+                            HexBytes(cmd_bytes), target_pos + 1, target_pos)
             else:
-                logger.info(f"发送指令: {cmd_str}")
+                logger.info("发送指令: %s", HexBytes(cmd_bytes))
             
-            # 发送命令，最多重试指定次数
-            for attempt in range(retry_count):
+            policy = self._retry_policy(command[1])
+            attempts = retry_count or policy.max_attempts
+            # 发送命令，超时后重试，直到次数或总时间用完
+            for attempt, timeout in enumerate(policy.timeouts(attempts)):
+                if attempt and retry_timeout:
+                    time.sleep(retry_timeout)
                 try:
-                    if not self.serial_controller.write(cmd_bytes):
-                        logger.warning(f"发送命令失败，尝试重试... ({attempt + 1}/{retry_count})")
-                        time.sleep(retry_timeout)  # 等待指定时间后重试
-                        continue
-                        
-                    # 读取响应，使用带重试的读取方法
-                    response = self.serial_controller.read_with_retry(
-                        size=expected_length,
-                        retries=retry_count,
-                        timeout=read_timeout
+                    # 发送并等待完整的应答帧，收满即返回
+                    future = self.serial_controller.submit(
+                        cmd_bytes,
+                        decoder=FixedLengthFrameDecoder(
+                            expected_length, self.START_BYTE, self.ADDRESS_OFFSET),
+                        address=self.device_address,
+                        timeout=read_timeout or timeout,
+                        resend=attempt > 0
                     )
-                    
-                    # 记录接收到的数据
-                    if response:
-                        resp_str = ' '.join([f'0x{b:02X}' for b in response])
-                        if len(response) > 2 and response[1] == self.ROTATE_CMD:
-                            current_pos = response[6]  # 0-based position
-                            logger.info(f"接收数据: {resp_str} (当前孔位 {current_pos + 1}，协议中使用从0开始的编号 0x{current_pos:02X})")
-                        else:
-                            logger.info(f"接收数据: {resp_str}")
-                            
-                        if len(response) != expected_length:
-                            logger.warning(f"响应长度错误: 期望 {expected_length} 字节，实际收到 {len(response)} 字节，尝试重试... ({attempt + 1}/{retry_count})")
-                            time.sleep(retry_timeout)  # 等待指定时间后重试
-                            continue
-                            
-                        return response
-                    else:
-                        logger.warning(f"未接收到数据，尝试重试... ({attempt + 1}/{retry_count})")
-                        time.sleep(retry_timeout)  # 等待指定时间后重试
-                        continue
-                        
+                    response = self.serial_controller.wait(future)
+                except TimeoutError:
+                    policy.on_timeout()
+                    logger.warning("未接收到数据，尝试重试... (%d/%d, %s)", attempt + 1, attempts, policy)
+                    continue
+                except ConnectionError as e:
+                    # 串口断开时重试没有意义
+                    logger.error("通信出错: %s", e)
+                    return None
                 except Exception as e:
-                    logger.warning(f"通信出错: {str(e)}，尝试重试... ({attempt + 1}/{retry_count})")
-                    time.sleep(retry_timeout)  # 等待指定时间后重试
+                    logger.warning("通信出错: %s，尝试重试... (%d/%d)", e, attempt + 1, attempts)
                     continue
-                    
-            logger.error("发送命令失败: 重试次数已用完")
+
+                # 只用第一次发送的往返时间更新估计，重发后的应答无法确定对应哪一次发送
+                if attempt == 0 and getattr(future, 'rtt', None) is not None:
+                    policy.observe(future.rtt)
+
+                # 记录接收到的数据
+                if len(response) > 2 and response[1] == self.ROTATE_CMD:
+                    current_pos = response[6]  # 0-based position
+                    logger.info("接收数据: %s (当前孔位 %d，协议中使用从0开始的编号 0x%02X)",
+                                HexBytes(response), current_pos + 1, current_pos)
+                else:
+                    logger.info("接收数据: %s", HexBytes(response))
+
+                if len(response) != expected_length:
+                    logger.warning("响应长度错误: 期望 %d 字节，实际收到 %d 字节，尝试重试... (%d/%d)",
+                                   expected_length, len(response), attempt + 1, attempts)
+                    continue
+
+                return response
+
+            logger.error("发送命令失败: 重试次数或等待时间已用完")
             return None
             
         except Exception as e:
-            logger.error(f"发送命令出错: {str(e)}")
+            logger.error("发送命令出错: %s", e)
             return None
     
     def check_status(self) -> int:
@@ -181,7 +226,7 @@ class ValveController:
             bool: 是否成功
         """
         if not 1 <= position <= 12:
-            logger.error(f"无效的孔位: {position}，孔位必须在 1-12 之间")
+            logger.error("无效的孔位: %s，孔位必须在 1-12 之间", position)
             return False
             
         if self.device_address is None:
@@ -200,16 +245,16 @@ class ValveController:
             
         # 检查响应
         if response[6] != zero_based_pos:
-            logger.error(f"旋转失败: 目标孔位 {position}，实际孔位 {response[6] + 1}")
+            logger.error("旋转失败: 目标孔位 %d，实际孔位 %d", position, response[6] + 1)
             return False
             
         # 检查执行状态
         status = self.check_status()
         if status != self.STATUS_SUCCESS:
-            logger.error(f"旋转失败: {self.STATUS_MESSAGES.get(status, '未知状态')}")
+            logger.error("旋转失败: %s", self.STATUS_MESSAGES.get(status, '未知状态'))
             return False
             
-        logger.info(f"成功旋转到孔位 {position}")
+        logger.info("成功旋转到孔位 %d", position)
         return True
     
     def get_current_position(self) -> Optional[int]:
@@ -231,12 +276,12 @@ class ValveController:
         # 检查执行状态
         status = self.check_status()
         if status != self.STATUS_SUCCESS:
-            logger.error(f"获取当前孔位失败: {self.STATUS_MESSAGES.get(status, '未知状态')}")
+            logger.error("获取当前孔位失败: %s", self.STATUS_MESSAGES.get(status, '未知状态'))
             return None
             
         # 转换为1基孔位
         position = response[6] + 1
-        logger.info(f"当前孔位: {position}")
+        logger.info("当前孔位: %d", position)
         return position
     
     def get_last_position(self) -> Optional[int]:
@@ -258,10 +303,10 @@ class ValveController:
         # 检查执行状态
         status = self.check_status()
         if status != self.STATUS_SUCCESS:
-            logger.error(f"获取断电前孔位失败: {self.STATUS_MESSAGES.get(status, '未知状态')}")
+            logger.error("获取断电前孔位失败: %s", self.STATUS_MESSAGES.get(status, '未知状态'))
             return None
             
         # 转换为1基孔位
         position = response[6] + 1
-        logger.info(f"断电前孔位: {position}")
+        logger.info("断电前孔位: %d", position)
         return position
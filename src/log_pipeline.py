@@ -0,0 +1,59 @@
+"""异步日志管道
+
+所有日志记录通过 QueueHandler 放入队列，由 QueueListener 的后台线程交给各个输出端
+（界面、控制台、文件）。记录在入队时不做格式化，只有输出端处理时才拼接消息，
+串口 I/O 线程和程序执行线程不会因为界面或文件输出而阻塞。
+"""
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[logging.Handler] = None
+
+
+class LazyQueueHandler(QueueHandler):
+    """不在调用线程中格式化消息的 QueueHandler
+
+    标准 QueueHandler 在入队前会调用 format 合并 msg 和 args，
+    这里直接把原始记录放入队列，格式化留给输出端。
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def setup_logging(*handlers: logging.Handler, level: int = logging.INFO) -> QueueListener:
+    """把根日志记录器的输出改为经过队列的异步管道
+
+    重复调用时会先停止之前的管道。
+
+    Args:
+        handlers: 输出端
+        level: 根日志级别
+
+    Returns:
+        QueueListener: 后台监听器
+    """
+    global _listener, _queue_handler
+    stop_logging()
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    _queue_handler = LazyQueueHandler(log_queue)
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """停止异步管道，输出队列中剩余的记录"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
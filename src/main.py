@@ -1,23 +1,39 @@
+from startup import StartupProfile
+
+startup_profile = StartupProfile()  # 尽早开始计时
+
+import argparse
 import sys
 import os
+from PyQt5.QtCore import QCoreApplication, Qt
 from PyQt5.QtWidgets import QApplication
 from main_window import MainWindow
 
+startup_profile.mark('导入模块')
+
 def main():
     print("Starting application...")
     print(f"Python version: {sys.version}")
     print(f"Current directory: {os.getcwd()}")
     print(f"PYTHONPATH: {sys.path}")
-    
-    app = QApplication(sys.argv)
+
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--startup-report', metavar='FILE',
+                        help='把启动耗时追加保存到 JSON Lines 文件')
+    args, qt_args = parser.parse_known_args()
+
+    # 允许在创建 QApplication 之后再导入 QtWebEngine（窗口显示后才加载 Blockly）
+    QCoreApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
+    app = QApplication(sys.argv[:1] + qt_args)
     print("Created QApplication")
-    
-    window = MainWindow()
+    startup_profile.mark('创建 QApplication')
+
+    window = MainWindow(startup_profile=startup_profile, startup_report=args.startup_report)
     print("Created MainWindow")
-    
+
     window.show()
     print("Showing window")
-    
+
     return app.exec_()
 
 if __name__ == '__main__':
@@ -1,23 +1,29 @@
-from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-                             QSplitter, QMessageBox, QApplication, QSizePolicy, QFileDialog, QPushButton)
-from PyQt5.QtCore import Qt, QTimer, QMetaObject, Q_ARG, pyqtSignal, QObject, pyqtSlot
-from PyQt5.QtSerialPort import QSerialPortInfo
-from PyQt5.QtWebChannel import QWebChannel
+from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
+                             QSplitter, QMessageBox, QFileDialog, QPushButton)
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QObject, pyqtSlot
 import logging
 import json
-from serial.tools import list_ports
 import sys
-import ast
 
-from components.blockly_workspace import BlocklyWorkspace
 from components.code_editor import CodeEditor
 from components.log_viewer import LogViewer
 from components.toolbar import Toolbar
+from devices.device_manager import DeviceManager
+from devices.port_discovery import PortDiscovery
 from devices.pump_controller import PumpController
 from devices.serial_controller import SerialController
 from devices.serial_settings import SerialSettings
 from devices.valve_controller import ValveController
-from line_tracer import LineTracer
+from log_pipeline import setup_logging, stop_logging
+from program.cache import ProgramCache
+from program.block_trace import BLOCK_HOOK, BlockTracer, instrument
+from program.checkpoints import CHECK_STOP
+from program.profiler import BlockProfiler
+from program.interpreter import Interpreter
+from program.planner import Planner
+from program.runner import ProgramRunner
+from program.timeline import Timeline
+from startup import StartupProfile
 
 logger = logging.getLogger(__name__)
 
@@ -105,7 +111,7 @@ class WebBridge(QObject):
     def getAvailablePorts(self):
         """获取可用的串口列表"""
         try:
-            ports = self.serial_controller.get_available_ports()
+            ports = PortDiscovery.instance().cached_ports()  # 枚举在后台完成后会发出 portsUpdated
             if not ports:
                 ports = ['COM3']  # 如果没有可用端口，默认显示 COM3
             logger.info(f"发现可用串口: {', '.join(ports)}")
@@ -115,9 +121,26 @@ class WebBridge(QObject):
             return json.dumps({'ports': ['COM3']})  # 发生错误时也返回 COM3
 
 
+class LogSignal(QObject):
+    """把日志记录从任意线程转发到界面线程"""
+    
+    record_ready = pyqtSignal(str, str)  # 消息, 级别
+
+
 class MainWindow(QMainWindow):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, startup_profile: StartupProfile = None, startup_report: str = None):
+        """初始化主窗口
+
+        窗口先以占位界面显示，QtWebEngine、Blockly 页面和串口枚举在事件循环开始后再加载。
+
+        Args:
+            parent: 父窗口
+            startup_profile: 启动耗时统计，页面加载完成后输出报告
+            startup_report: 启动耗时追加保存到的文件（JSON Lines），为 None 时只输出到日志
+        """
         super().__init__(parent)
+        self.startup_profile = startup_profile or StartupProfile()
+        self.startup_report = startup_report
         
         # 设置日志处理器
         class LogHandler(logging.Handler):
@@ -126,6 +149,9 @@ class MainWindow(QMainWindow):
             def __init__(self, log_viewer):
                 super().__init__()
                 self.log_viewer = log_viewer
+                # 在日志管道的后台线程中调用，通过信号排队到界面线程显示
+                self.signal = LogSignal()
+                self.signal.record_ready.connect(log_viewer.append_log)
                 # 设置格式化器
                 self.setFormatter(
                     logging.Formatter('%(message)s')
@@ -135,20 +161,17 @@ class MainWindow(QMainWindow):
                 """发送日志记录"""
                 try:
                     msg = self.format(record)
-                    # 直接在主线程中更新日志
-                    self.log_viewer.append_log(msg, record.levelname)
-                    # 立即刷新应用程序
-                    QApplication.processEvents()
+                    self.signal.record_ready.emit(msg, record.levelname)
                 except Exception as e:
                     print(f"Error in log handler: {e}", file=sys.stderr)
         
         # 创建日志查看器（需要最先创建以捕获所有日志）
         self.log_viewer = LogViewer()
         
-        # 添加日志处理器
-        handler = LogHandler(self.log_viewer)
-        logging.getLogger().addHandler(handler)
-        logging.getLogger().setLevel(logging.INFO)
+        # 日志经过队列异步输出，产生日志的线程不等待界面
+        console = logging.StreamHandler()
+        console.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        setup_logging(LogHandler(self.log_viewer), console, level=logging.INFO)
         
         # 创建串口控制器（在 Blockly 之前创建）
         self.serial_controller = SerialController()
@@ -157,17 +180,28 @@ class MainWindow(QMainWindow):
         # 创建 Web Bridge
         self.web_bridge = WebBridge()
         
-        # 创建其他界面元素
+        # 创建其他界面元素（Blockly 工作区在窗口显示后创建，见 _load_workspace）
         self.toolbar = Toolbar()
-        self.blockly_workspace = BlocklyWorkspace(self)
-        self.blockly_workspace.set_web_bridge(self.web_bridge)  # 设置 Web Bridge
+        self.blockly_workspace = None
+        self.workspace_placeholder = QLabel("正在加载 Blockly 工作区...")
+        self.workspace_placeholder.setAlignment(Qt.AlignCenter)
         self.code_editor = CodeEditor()
         
-        # 设置代码编辑器
-        self.blockly_workspace.code_editor = self.code_editor
-        
         # 创建泵控制器（在串口控制器之后创建）
         self.pump = PumpController(self.serial_controller)
+
+        # 创建设备管理器：其他串口上的仪器各自使用独立的 I/O 线程
+        self.device_manager = DeviceManager(self)
+        self.device_manager.adopt(self.serial_controller)
+        self.device_manager.register('pump', self.pump)
+        
+        # 创建程序执行线程
+        self.program_runner = ProgramRunner(self)
+        self.program_cache = ProgramCache()  # 重复运行同一程序时跳过解析和编译
+        self.block_tracer = BlockTracer()  # 执行进度（当前块）
+        self.block_profiler = None  # 最近一次运行的按块统计
+        self._profiling = False
+        self.program_runner.program_finished.connect(self.on_program_finished)
         
         # 初始化UI
         self.init_ui()
@@ -178,22 +212,25 @@ class MainWindow(QMainWindow):
         self.toolbar.stop_clicked.connect(self.on_stop_clicked)
         self.toolbar.log_clicked.connect(self.toggle_log_viewer)
         self.toolbar.clear_log_clicked.connect(self.clear_log)
-        self.toolbar.refresh_clicked.connect(self.update_ports)
+        self.toolbar.refresh_clicked.connect(self.refresh_ports)
         self.toolbar.port_changed.connect(self.on_port_changed)
         
         # 连接其他信号
-        self.blockly_workspace.code_generated.connect(self.on_code_generated)
         self.serial_controller.data_received.connect(self.on_data_received)
-        self.serial_controller.ports_discovered.connect(self.on_ports_discovered)
+        self.port_discovery = PortDiscovery.instance()
+        self.port_discovery.ports_changed.connect(self.on_ports_discovered)
         
         # 加载串口设置
         self._load_serial_settings()
+        self.startup_profile.mark('界面构建')
         
-        # 初始化串口列表并发送更新信号
-        self.update_ports()
+        # 窗口显示后再加载 Blockly 页面和枚举串口
+        QTimer.singleShot(0, self._load_workspace)
         
-        # 添加程序执行控制标志
-        self.is_running = False
+    @property
+    def is_running(self):
+        """程序是否正在运行"""
+        return self.program_runner.is_running
         
     def init_ui(self):
         """初始化UI"""
@@ -227,6 +264,28 @@ class MainWindow(QMainWindow):
         self.load_button.clicked.connect(self._load_program)
         toolbar_layout.addWidget(self.load_button)
         
+        # 添加性能分析按钮：选中后运行时按块统计耗时，结束后在工作区显示热图
+        self.profile_button = QPushButton("性能分析")
+        self.profile_button.setCheckable(True)
+        self.profile_button.toggled.connect(self._on_profile_toggled)
+        toolbar_layout.addWidget(self.profile_button)
+        
+        self.export_profile_button = QPushButton("导出分析")
+        self.export_profile_button.setEnabled(False)
+        self.export_profile_button.clicked.connect(self._export_profile)
+        toolbar_layout.addWidget(self.export_profile_button)
+        
+        # 添加固定节拍开关：选中后循环中的延时以计划时间为基准，命令耗时计入延时
+        self.drift_free_button = QPushButton("固定节拍")
+        self.drift_free_button.setCheckable(True)
+        self.drift_free_button.setToolTip("循环中的延时从上一次延时的计划结束时间算起，长时间运行不会逐渐推迟")
+        toolbar_layout.addWidget(self.drift_free_button)
+        
+        # 添加耗时估算按钮：不连接设备估算工作区程序的耗时和体积
+        self.plan_button = QPushButton("估算时间")
+        self.plan_button.clicked.connect(self._plan_program)
+        toolbar_layout.addWidget(self.plan_button)
+        
         # 添加工具栏
         toolbar_layout.addWidget(self.toolbar)
         
@@ -236,9 +295,10 @@ class MainWindow(QMainWindow):
         # 创建水平分割器
         hsplitter = QSplitter(Qt.Horizontal)
         main_layout.addWidget(hsplitter)
+        self.hsplitter = hsplitter
         
-        # 添加 Blockly 工作区
-        hsplitter.addWidget(self.blockly_workspace)
+        # 添加 Blockly 工作区的占位界面
+        hsplitter.addWidget(self.workspace_placeholder)
         
         # 创建右侧垂直分割器
         vsplitter = QSplitter(Qt.Vertical)
@@ -261,6 +321,39 @@ class MainWindow(QMainWindow):
         # 最大化窗口
         self.showMaximized()
         
+    def _load_workspace(self):
+        """创建 Blockly 工作区（导入 QtWebEngine 较慢，放在窗口显示之后）"""
+        from components.blockly_workspace import BlocklyWorkspace
+        self.startup_profile.mark('窗口显示')
+        
+        self.blockly_workspace = BlocklyWorkspace(self)
+        self.blockly_workspace.set_web_bridge(self.web_bridge)  # 设置 Web Bridge
+        self.blockly_workspace.code_editor = self.code_editor
+        self.blockly_workspace.loadFinished.connect(self._on_workspace_loaded)
+        self.hsplitter.replaceWidget(0, self.blockly_workspace)
+        self.workspace_placeholder.deleteLater()
+        self.workspace_placeholder = None
+        self.startup_profile.mark('创建 Blockly')
+        
+        # 页面在 QtWebEngine 进程中加载，同时在后台线程中枚举串口
+        QTimer.singleShot(0, self._discover_ports)
+
+    def _discover_ports(self):
+        """在后台线程中首次枚举串口，完成后由 ports_changed 更新列表"""
+        self.port_discovery.refresh_async()
+
+    def _on_workspace_loaded(self, ok):
+        """Blockly 页面加载完成，输出启动耗时"""
+        if self.startup_profile.reported:
+            return
+        self.startup_profile.mark('页面加载')
+        self.startup_profile.log_report()
+        if self.startup_report:
+            try:
+                self.startup_profile.save(self.startup_report)
+            except OSError as e:
+                logger.error(f"保存启动耗时失败: {e}")
+
     def _load_serial_settings(self):
         """加载串口设置"""
         try:
@@ -274,100 +367,136 @@ class MainWindow(QMainWindow):
         except Exception as e:
             logger.error(f"加载串口设置失败: {e}")
             
-    def on_code_generated(self, code):
-        """代码生成完成事件"""
-        try:
-            # 更新代码编辑器
-            if self.code_editor:
-                self.code_editor.setPlainText(code)
-        except Exception as e:
-            logger.error(f"更新代码编辑器失败: {str(e)}")
-            
     def execute_code(self, code):
-        """执行代码"""
+        """在程序执行线程中执行代码"""
         if not code:
             logger.warning("生成的代码为空")
             return
 
         try:
-            # 设置运行标志
-            self.is_running = True
-            
             # 创建一个新的代码执行环境
             exec_globals = {
                 'print': lambda *args: logger.info(' '.join(map(str, args))),
                 'logger': logger,
                 'pump': self.pump,
                 'serial_controller': self.serial_controller,
+                'device_manager': self.device_manager,
                 'SerialController': SerialController,
                 'ValveController': ValveController,
                 'PumpController': PumpController,
-                # 包装泵的方法，检查运行状态
-                'wrapped_pump': self._create_wrapped_pump(),
-                'wrapped_serial': self._create_wrapped_serial()
+                # 延时和定时开始的步骤，停止时立即结束等待
+                'timeline': Timeline(self.program_runner.stop_event,
+                                     drift_free=self.drift_free_button.isChecked()),
+                # 插入到循环和设备调用前的停止检查
+                CHECK_STOP: self.program_runner.check_stop,
+                # 插入到每个块之前的进度报告
+                BLOCK_HOOK: self.block_tracer.enter
             }
             
-            # 替换代码中的 pump 和 serial_controller 为包装后的版本
-            code = code.replace('pump.', 'wrapped_pump.')
-            code = code.replace('serial_controller.', 'wrapped_serial.')
+            # 插入停止检查和块进度调用并编译（结果被缓存）
+            compiled = self.program_cache.compile_code(code, '<blockly>', instrument)
             
-            # 执行代码
-            exec(code, exec_globals)
-            
-            # 代码执行完成提示
-            if self.is_running:  # 只有在正常完成时才显示
-                logger.info("程序执行完成")
+            # 在工作线程中执行代码，界面保持响应
+            exec_globals['timeline'].start()
+            self._start_profiling()
+            if self.program_runner.start_program(compiled, exec_globals):
+                self._on_program_started()
             
         except Exception as e:
-            if not self.is_running:
-                logger.info("程序已停止")
-            else:
-                logger.error(f"代码执行失败: {str(e)}")
-        finally:
-            self.is_running = False  # 确保运行标志被重置
+            logger.error(f"代码执行失败: {str(e)}")
             
-    def _create_wrapped_pump(self):
-        """创建包装后的泵对象，每个方法调用前都会检查运行状态"""
-        class WrappedPump:
-            def __init__(self, parent, pump):
-                self._parent = parent
-                self._pump = pump
-                
-            def __getattr__(self, name):
-                # 获取原始方法
-                attr = getattr(self._pump, name)
-                if callable(attr):
-                    # 如果是方法，返回包装后的版本
-                    def wrapped_method(*args, **kwargs):
-                        if not self._parent.is_running:
-                            raise InterruptedError("程序已停止")
-                        return attr(*args, **kwargs)
-                    return wrapped_method
-                return attr
-                
-        return WrappedPump(self, self.pump)
-        
-    def _create_wrapped_serial(self):
-        """创建包装后的串口对象，每个方法调用前都会检查运行状态"""
-        class WrappedSerial:
-            def __init__(self, parent, serial):
-                self._parent = parent
-                self._serial = serial
-                
-            def __getattr__(self, name):
-                # 获取原始方法
-                attr = getattr(self._serial, name)
-                if callable(attr):
-                    # 如果是方法，返回包装后的版本
-                    def wrapped_method(*args, **kwargs):
-                        if not self._parent.is_running:
-                            raise InterruptedError("程序已停止")
-                        return attr(*args, **kwargs)
-                    return wrapped_method
-                return attr
-                
-        return WrappedSerial(self, self.serial_controller)
+    def _on_program_started(self):
+        """程序开始执行：禁用运行按钮并在工作区中跟踪执行进度"""
+        self.toolbar.run_btn.setEnabled(False)
+        if self.blockly_workspace:
+            self.blockly_workspace.follow(self.block_tracer)
+            
+    def on_program_finished(self, status):
+        """程序执行结束事件"""
+        self.toolbar.run_btn.setEnabled(True)
+        self.block_tracer.current = None
+        if self.blockly_workspace:
+            self.blockly_workspace.unfollow()
+        self._finish_profiling()
+        logger.debug(f"Program finished: {status}")
+        
+    def _serial_controllers(self):
+        """所有串口控制器（用于性能统计）"""
+        devices = self.device_manager
+        return [self.serial_controller] + [devices.controller(port) for port in devices.ports]
+        
+    def _start_profiling(self, labels=None):
+        """性能分析开启时，在程序开始之前开始按块统计"""
+        if self._profiling:
+            # 上次程序没有启动成功，丢弃其统计
+            self.block_profiler.detach(self.block_tracer)
+            self._profiling = False
+        if not self.profile_button.isChecked():
+            return
+        if self.blockly_workspace:
+            self.blockly_workspace.clear_profile()
+        self.block_profiler = BlockProfiler(self._serial_controllers, labels)
+        self.block_profiler.attach(self.block_tracer)
+        self._profiling = True
+        
+    def _finish_profiling(self):
+        """结束按块统计，在工作区中显示热图"""
+        profiler = self.block_profiler
+        if not self._profiling:
+            return
+        self._profiling = False
+        profiler.detach(self.block_tracer)
+        for stats in profiler.ranked()[:3]:
+            logger.info("耗时最多的块 %s %s: %.2f 秒，往返 %d 次，重发 %d 次",
+                        stats.block_id, stats.label, stats.wall, stats.requests, stats.retries)
+        if self.blockly_workspace:
+            self.blockly_workspace.show_profile(profiler.heatmap())
+        self.export_profile_button.setEnabled(bool(profiler.blocks))
+        
+    def _on_profile_toggled(self, checked):
+        """关闭性能分析时清除工作区中的热图"""
+        if not checked and self.blockly_workspace:
+            self.blockly_workspace.clear_profile()
+            
+    def _plan_program(self):
+        """估算工作区程序的耗时、体积和设备占用"""
+        if not (self.blockly_workspace and self.blockly_workspace.page):
+            logger.warning("工作区尚未加载")
+            return
+        self.blockly_workspace.get_workspace_xml(self._show_plan)
         
+    def _show_plan(self, xml_text):
+        """显示工作区程序的估算结果"""
+        try:
+            program, errors = self.program_cache.load_program(xml_text or '<xml/>')
+        except Exception as e:
+            logger.error(f"无法估算: 程序中包含不支持的块（{e}）")
+            return
+        if errors:
+            for error in errors:
+                logger.error(f"程序校验失败: {error}")
+            return
+        plan = Planner(await_completion=self.pump.await_completion,
+                       drift_free=self.drift_free_button.isChecked()).plan(program)
+        report = plan.report()
+        logger.info(f"耗时估算:\n{report}")
+        QMessageBox.information(self, "耗时估算", report)
+            
+    def _export_profile(self):
+        """把最近一次运行的按块统计导出为 CSV"""
+        if self.block_profiler is None:
+            return
+        file_name, _ = QFileDialog.getSaveFileName(self, "导出性能分析", "", "CSV 文件 (*.csv)")
+        if not file_name:
+            return
+        if not file_name.endswith('.csv'):
+            file_name += '.csv'
+        try:
+            self.block_profiler.write_csv(file_name)
+            logger.info(f"性能分析已导出到: {file_name}")
+        except OSError as e:
+            logger.error(f"导出性能分析失败: {e}")
+            
     def toggle_log_viewer(self):
         """切换日志查看器显示状态"""
         if self.log_viewer.isVisible():
@@ -377,20 +506,15 @@ class MainWindow(QMainWindow):
             self.log_viewer.show()
             self.toolbar.log_btn.setText("隐藏日志")
 
+    def refresh_ports(self):
+        """在后台线程中重新枚举串口，列表变化时更新"""
+        self.port_discovery.refresh_async()
+
     def update_ports(self):
         """更新可用串口列表"""
         try:
-            # 获取可用串口列表
-            ports = []
-            for port in QSerialPortInfo.availablePorts():
-                ports.append(port.portName())
-            
-            # 也获取 pyserial 检测到的串口
-            serial_ports = [port.device for port in list_ports.comports()]
-            
-            # 合并两个列表并去重
-            all_ports = list(set(ports + serial_ports))
-            all_ports.sort()  # 排序以保持稳定的顺序
+            # 获取可用串口列表（发现服务的缓存，不在界面线程中枚举）
+            all_ports = self.port_discovery.cached_ports()
             
             # 更新工具栏的串口列表
             self.toolbar.update_ports(all_ports)
@@ -452,9 +576,51 @@ class MainWindow(QMainWindow):
 
     def on_run_clicked(self):
         """运行按钮点击事件"""
+        if self.program_runner.isRunning():
+            logger.warning("已有程序正在运行")
+            return
+        # 优先用解释器执行工作区程序，工作区不可用时执行生成的代码
+        if self.blockly_workspace and self.blockly_workspace.page:
+            self.blockly_workspace.get_workspace_xml(self._run_workspace_xml)
+        else:
+            self._run_generated_code()
+
+    def _run_workspace_xml(self, xml_text):
+        """把工作区 XML 转换为程序 IR 并执行"""
+        try:
+            program, errors = self.program_cache.load_program(xml_text or '<xml/>')
+        except Exception as e:
+            # 程序中包含解释器不支持的块（如通用逻辑块），退回到执行生成的代码
+            logger.debug(f"Interpreter unavailable for workspace: {e}")
+            self._run_generated_code()
+            return
+        if not program.ops:
+            logger.warning("没有可执行的代码")
+            return
+        if errors:
+            for error in errors:
+                logger.error(f"程序校验失败: {error}")
+            return
+        interpreter = Interpreter(
+            self.serial_controller,
+            pump=self.pump,
+            stop_event=self.program_runner.stop_event,
+            devices=self.device_manager,
+            drift_free=self.drift_free_button.isChecked()
+        )
+        interpreter.tracer = self.block_tracer
+        self._start_profiling({op.block_id: type(op).__name__ for op in program.walk() if op.block_id})
+        if self.program_runner.start_interpreter(program, interpreter):
+            self._on_program_started()
+
+    def _run_generated_code(self):
+        """执行代码编辑器中生成的代码"""
         try:
-            # 从代码编辑器获取代码
-            code = self.code_editor.toPlainText()
+            # 获取生成的代码（带块 ID 注释，编辑器中显示的版本去掉了这些注释）
+            if self.blockly_workspace and self.blockly_workspace.generated_code:
+                code = self.blockly_workspace.generated_code
+            else:
+                code = self.code_editor.toPlainText()
             if code:
                 # 执行代码
                 self.execute_code(code)
@@ -468,7 +634,7 @@ class MainWindow(QMainWindow):
         try:
             logger.info("正在停止程序...")
             # 停止程序执行
-            self.is_running = False
+            self.program_runner.stop()
             
             # 如果串口已连接，先停止泵再断开连接
             if hasattr(self, 'serial_controller') and self.serial_controller.is_connected:
@@ -487,13 +653,18 @@ class MainWindow(QMainWindow):
         except Exception as e:
             logger.error(f"停止时出错: {str(e)}")
 
+    def closeEvent(self, event):
+        """关闭窗口时停止程序并结束所有串口 I/O 线程"""
+        self.program_runner.stop()
+        self.device_manager.shutdown()
+        stop_logging()
+        super().closeEvent(event)
+
     def on_ports_discovered(self, ports):
-        """处理发现新串口的信号"""
-        if ports:
-            logging.info(f"发现可用串口: {', '.join(ports)}")
-            # 发送串口更新信号
-            if hasattr(self, 'web_bridge'):
-                self.web_bridge.portsUpdated.emit()
+        """处理串口枚举完成和插拔"""
+        if not self.startup_profile.reported and '枚举串口' not in dict(self.startup_profile.stages):
+            self.startup_profile.mark('枚举串口')
+        self.update_ports()
 
     def _save_program(self):
         """保存程序"""
@@ -528,31 +699,10 @@ class MainWindow(QMainWindow):
         """新建程序"""
         try:
             # 清空工作区
-            self.blockly_workspace._page.runJavaScript('workspace.clear();')
+            if self.blockly_workspace and self.blockly_workspace._page:
+                self.blockly_workspace._page.runJavaScript('workspace.clear();')
             # 清空代码编辑器
             self.code_editor.setPlainText('')
             logger.info("已新建程序")
         except Exception as e:
             logger.error(f"新建程序失败: {str(e)}")
-
-class LineTracer:
-    """行追踪器"""
-    def __init__(self, lines, blockly_workspace):
-        self.lines = lines
-        self.blockly_workspace = blockly_workspace
-        
-    def get_line_description(self, line_number):
-        """获取行描述"""
-        try:
-            if line_number < len(self.lines):
-                line = self.lines[line_number]
-                block_id = self.blockly_workspace.get_block_id(line_number)
-                if block_id:
-                    return f"执行操作：{block_id}"
-                else:
-                    logger.debug("No block ID found for this line")
-                    return "执行代码"
-            return ""
-        except Exception as e:
-            logger.error(f"获取行描述失败: {e}")
-            return ""
@@ -0,0 +1,112 @@
+"""块级执行进度
+
+不再用 sys.settrace 逐行追踪整个解释器，而是只在块的边界上报告进度：
+    - 解释器执行 IR 时，每个操作之前调用 BlockTracer.enter(block_id)；
+    - 生成的 Python 代码中，Blockly 在每个语句块前输出 “# block_id: 'xxx'” 注释
+      （Blockly.Python.STATEMENT_PREFIX），编译时在对应语句前插入 __block__('xxx') 调用。
+没有监听者时每个块只多一次属性赋值；界面按固定频率读取当前块并合并高亮（见 BlocklyWorkspace.follow）。
+"""
+import ast
+import re
+from typing import Callable, Dict, List, Optional
+
+from program.checkpoints import insert_checkpoints
+
+BLOCK_HOOK = '__block__'  # 执行环境中报告当前块的函数名
+
+# Blockly 原样把块 ID 放在单引号中（不转义），ID 本身可能包含引号和反斜杠，取最外层引号之间的全部内容
+BLOCK_ID_COMMENT = re.compile(r"^\s*# block_id: (?:'(.*)'|(\S+))\s*$")
+
+
+class BlockTracer:
+    """记录程序当前执行到的块"""
+
+    def __init__(self):
+        self.current: Optional[str] = None  # 当前块 ID
+        self._listeners: List[Callable[[Optional[str]], None]] = []
+
+    def enter(self, block_id: Optional[str]):
+        """开始执行一个块（在程序执行线程中调用）"""
+        self.current = block_id
+        if self._listeners:
+            for listener in self._listeners:
+                listener(block_id)
+
+    def finish(self):
+        """程序结束"""
+        self.enter(None)
+
+    def add_listener(self, listener: Callable[[Optional[str]], None]):
+        """添加监听者，每进入一个块调用一次（在程序执行线程中调用，应尽快返回）"""
+        self._listeners = self._listeners + [listener]
+
+    def remove_listener(self, listener: Callable[[Optional[str]], None]):
+        """移除监听者"""
+        self._listeners = [l for l in self._listeners if l != listener]
+
+
+def block_lines(source: str) -> Dict[int, str]:
+    """块 ID 注释之后第一条语句的行号（从 1 开始）-> 块 ID"""
+    lines = {}
+    pending = None
+    for number, line in enumerate(source.splitlines(), 1):
+        match = BLOCK_ID_COMMENT.match(line)
+        if match:
+            pending = match.group(1) if match.group(1) is not None else match.group(2)
+        elif pending and line.strip() and not line.lstrip().startswith('#'):
+            lines[number] = pending
+            pending = None
+    return lines
+
+
+def _hook(block_id: str, node: ast.AST) -> ast.Expr:
+    call = ast.Expr(ast.Call(func=ast.Name(id=BLOCK_HOOK, ctx=ast.Load()),
+                             args=[ast.Constant(block_id)], keywords=[]))
+    return ast.copy_location(call, node)
+
+
+class BlockHookInserter(ast.NodeTransformer):
+    """在每个块的第一条语句前插入 __block__ 调用"""
+
+    def __init__(self, lines: Dict[int, str]):
+        self.lines = lines
+
+    def _statements(self, body):
+        result = []
+        hooked = set()
+        for stmt in body:
+            stmt = self.visit(stmt)
+            block_id = self.lines.get(getattr(stmt, 'lineno', None))
+            if block_id is not None and stmt.lineno not in hooked:
+                hooked.add(stmt.lineno)
+                result.append(_hook(block_id, stmt))
+            result.append(stmt)
+        return result
+
+    def generic_visit(self, node):
+        for field in ('body', 'orelse', 'finalbody'):
+            body = getattr(node, field, None)
+            if isinstance(body, list) and body and isinstance(body[0], ast.stmt):
+                setattr(node, field, self._statements(body))
+        for handler in getattr(node, 'handlers', ()):
+            handler.body = self._statements(handler.body)
+        for case in getattr(node, 'cases', ()):
+            case.body = self._statements(case.body)
+        return node
+
+    def visit_Module(self, node):
+        node.body = self._statements(node.body)
+        return node
+
+
+def insert_block_hooks(tree: ast.Module, source: str) -> ast.Module:
+    """按源码中的块 ID 注释在语法树中插入 __block__ 调用"""
+    lines = block_lines(source)
+    if lines:
+        tree = BlockHookInserter(lines).visit(tree)
+    return ast.fix_missing_locations(tree)
+
+
+def instrument(source: str) -> ast.Module:
+    """生成代码的编译步骤：插入停止检查和块进度调用"""
+    return insert_block_hooks(insert_checkpoints(source), source)
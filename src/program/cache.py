@@ -0,0 +1,181 @@
+"""编译结果缓存
+
+批量循环执行同一个协议时，每次运行都会重复解析 XML、校验、编译 IR 或编译生成的 Python 代码。
+缓存以程序内容的哈希为键，保存在内存中（LRU 淘汰），也可以保存到磁盘目录供下次启动使用。
+键中包含 Python 版本和程序加载/编译/插桩模块的源码哈希，这些代码修改后旧的缓存自动失效。
+"""
+import ast
+import hashlib
+import logging
+import marshal
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+from types import CodeType
+from typing import Callable, List, Optional, Tuple, Union
+
+from program import block_trace, checkpoints, compiler, ir, xml_loader
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def _toolchain_version() -> str:
+    """程序加载/编译/插桩模块的源码哈希
+
+    生成代码缓存的是插桩（检查点、块计时）之后的结果，插桩模块也要计入。
+    """
+    digest = hashlib.sha256(sys.implementation.cache_tag.encode())
+    for module in (ir, xml_loader, compiler, checkpoints, block_trace):
+        try:
+            with open(module.__file__, 'rb') as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(module.__name__.encode())
+    return digest.hexdigest()[:16]
+
+
+class ProgramCache:
+    """程序编译结果的 LRU 缓存"""
+
+    DEFAULT_SIZE = 32
+
+    def __init__(self, maxsize: int = DEFAULT_SIZE, cache_dir: Optional[str] = None):
+        """初始化缓存
+
+        Args:
+            maxsize: 内存中最多保存的条目数
+            cache_dir: 磁盘缓存目录，为 None 时只缓存在内存中
+        """
+        self.maxsize = maxsize
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = _toolchain_version()
+        self.hits = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, kind: str, source: str, *options) -> str:
+        """程序内容的哈希"""
+        digest = hashlib.sha256(f"{kind}\0{self._version}\0{options!r}\0".encode())
+        digest.update(source.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key: str, default=None):
+        """查找缓存（先内存后磁盘）"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        value = self._load(key)
+        if value is _MISSING:
+            with self._lock:
+                self.misses += 1
+            return default
+        with self._lock:
+            self.hits += 1
+            self._remember(key, value)
+        return value
+
+    def put(self, key: str, value):
+        """保存缓存"""
+        with self._lock:
+            self._remember(key, value)
+        self._store(key, value)
+
+    def clear(self):
+        """清空内存中的缓存"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def compile_code(self, source: str, filename: str = '<program>',
+                     transform: Optional[Callable[[str], Union[str, ast.AST]]] = None) -> CodeType:
+        """编译生成的 Python 代码
+
+        Args:
+            source: 源码
+            filename: 代码对象中的文件名（出现在异常信息中）
+            transform: 编译前对源码做的改写（返回源码或语法树），结果同样被缓存
+
+        Returns:
+            CodeType: 可直接交给 exec 的代码对象
+        """
+        key = self.key('code', source, filename, getattr(transform, '__qualname__', None))
+        code = self.get(key)
+        if code is None:
+            code = compile(transform(source) if transform else source, filename, 'exec')
+            self.put(key, code)
+        return code
+
+    def load_program(self, xml_text: str, firmware_loops: bool = False) -> Tuple[ir.Program, List[str]]:
+        """把 Blockly XML 转换为编译后的程序 IR
+
+        Returns:
+            Tuple[Program, List[str]]: (程序 IR, 校验错误)，有校验错误时返回未编译的 IR
+
+        Raises:
+            与 xml_loader.load_program 相同（解析失败的结果不缓存）
+        """
+        key = self.key('ir', xml_text, firmware_loops)
+        entry = self.get(key)
+        if entry is None:
+            program = xml_loader.load_program(xml_text)
+            errors = program.validate()
+            if not errors:
+                program = compiler.compile_program(program, firmware_loops=firmware_loops)
+            entry = (program, errors)
+            self.put(key, entry)
+        return entry
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> Optional[str]:
+        return os.path.join(self.cache_dir, key) if self.cache_dir else None
+
+    def _load(self, key: str):
+        path = self._path(key)
+        if path is None or not os.path.exists(path):
+            return _MISSING
+        try:
+            with open(path, 'rb') as f:
+                kind = f.read(1)
+                data = f.read()
+            # 代码对象用 marshal 保存，其他结果用 pickle
+            return marshal.loads(data) if kind == b'm' else pickle.loads(data)
+        except Exception as e:
+            logger.warning("Discarding unreadable cache entry %s: %s", path, e)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return _MISSING
+
+    def _store(self, key: str, value):
+        path = self._path(key)
+        if path is None:
+            return
+        try:
+            if isinstance(value, CodeType):
+                data = b'm' + marshal.dumps(value)
+            else:
+                data = b'p' + pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            # 先写临时文件再替换，避免并发运行时读到写了一半的文件
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except Exception as e:
+            logger.warning("Failed to write cache entry %s: %s", path, e)
@@ -0,0 +1,72 @@
+"""在生成的程序中插入停止检查点
+
+按语法树改写，而不是替换源码文本：
+    - 每个循环体开头（循环回边）插入一次检查，死循环和长循环也能停止；
+    - 每条包含函数调用的语句（设备调用）之前插入一次检查，
+      不论设备对象叫什么名字（pump、valve 或其别名）都能覆盖，字符串常量不受影响。
+检查函数由执行环境提供（见 CHECK_STOP），程序只需编译一次，之后每次检查只是一次函数调用。
+"""
+import ast
+
+CHECK_STOP = '__check_stop__'  # 执行环境中检查停止请求的函数名，已请求停止时应抛出 InterruptedError
+
+
+def _checkpoint(node: ast.AST) -> ast.Expr:
+    call = ast.Expr(ast.Call(func=ast.Name(id=CHECK_STOP, ctx=ast.Load()), args=[], keywords=[]))
+    return ast.copy_location(call, node)
+
+
+def _is_checkpoint(stmt: ast.stmt) -> bool:
+    return (isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Call)
+            and isinstance(stmt.value.func, ast.Name) and stmt.value.func.id == CHECK_STOP)
+
+
+def _has_call(node: ast.stmt) -> bool:
+    """语句本身（不含嵌套的语句块）是否包含函数调用"""
+    for field, value in ast.iter_fields(node):
+        if field in ('body', 'orelse', 'finalbody', 'handlers', 'cases'):
+            continue
+        values = value if isinstance(value, list) else [value]
+        for item in values:
+            if isinstance(item, ast.AST) and any(isinstance(n, ast.Call) for n in ast.walk(item)):
+                return True
+    return False
+
+
+class CheckpointInserter(ast.NodeTransformer):
+    """在循环回边和设备调用前插入停止检查"""
+
+    def _statements(self, body, loop_body=False):
+        result = [_checkpoint(body[0])] if loop_body and body else []
+        for stmt in body:
+            stmt = self.visit(stmt)
+            if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef,
+                                 ast.Import, ast.ImportFrom)):
+                result.append(stmt)
+                continue
+            if _has_call(stmt) and not (result and _is_checkpoint(result[-1])):
+                result.append(_checkpoint(stmt))
+            result.append(stmt)
+        return result
+
+    def generic_visit(self, node):
+        for field in ('body', 'orelse', 'finalbody'):
+            body = getattr(node, field, None)
+            if isinstance(body, list) and body and isinstance(body[0], ast.stmt):
+                loop_body = field == 'body' and isinstance(node, (ast.For, ast.While, ast.AsyncFor))
+                setattr(node, field, self._statements(body, loop_body))
+        for handler in getattr(node, 'handlers', ()):
+            handler.body = self._statements(handler.body)
+        for case in getattr(node, 'cases', ()):
+            case.body = self._statements(case.body)
+        return node
+
+    def visit_Module(self, node):
+        node.body = self._statements(node.body)
+        return node
+
+
+def insert_checkpoints(source: str) -> ast.Module:
+    """解析源码并插入停止检查，返回可直接交给 compile 的语法树"""
+    tree = CheckpointInserter().visit(ast.parse(source))
+    return ast.fix_missing_locations(tree)
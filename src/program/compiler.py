@@ -0,0 +1,65 @@
+"""程序 IR 优化"""
+import logging
+from dataclasses import replace
+
+from devices.pump_controller import PumpController
+from program import ir
+
+logger = logging.getLogger(__name__)
+
+# 可以下发到泵固件循环中的操作
+FIRMWARE_LOOP_OPS = (ir.SwitchInput, ir.SwitchOutput, ir.SetSpeed,
+                     ir.Aspirate, ir.Dispense, ir.Delay)
+
+
+def fold_pump_loops(program: ir.Program) -> ir.Program:
+    """把循环体只包含泵操作的重复块折叠为泵固件循环
+
+    N 次循环由 N×k 次串口往返变为 1 次。循环体中的延时改为设备端 M 命令。
+    嵌套循环只折叠最内层。
+
+    Args:
+        program: 程序 IR
+
+    Returns:
+        Program: 优化后的程序 IR
+    """
+    return ir.Program(_fold(program.ops))
+
+
+def _fold(ops):
+    folded = []
+    for op in ops:
+        if isinstance(op, ir.Repeat) and not isinstance(op, ir.PumpLoop):
+            body = tuple(_fold(op.body))
+            if _foldable(body, op.times):
+                logger.debug("Folding repeat x%d into a firmware loop", op.times)
+                op = ir.PumpLoop(block_id=op.block_id, times=op.times, body=body)
+            else:
+                op = replace(op, body=body)
+        folded.append(op)
+    return folded
+
+
+def _foldable(body, times: int) -> bool:
+    """循环是否可以完全在泵固件中执行"""
+    if not 2 <= times <= PumpController.MAX_LOOP_COUNT or not body:
+        return False
+    if not any(isinstance(op, (ir.Aspirate, ir.Dispense)) for op in body):
+        return False
+    return all(type(op) in FIRMWARE_LOOP_OPS for op in body)
+
+
+def compile_program(program: ir.Program, firmware_loops: bool = False) -> ir.Program:
+    """执行前的编译步骤
+
+    Args:
+        program: 程序 IR
+        firmware_loops: 是否把纯泵操作的循环折叠为固件循环
+
+    Returns:
+        Program: 编译后的程序 IR
+    """
+    if firmware_loops:
+        program = fold_pump_loops(program)
+    return program
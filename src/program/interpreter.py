@@ -0,0 +1,183 @@
+import logging
+import threading
+from typing import Optional
+
+from devices.device_manager import DeviceManager
+from devices.pump_controller import PumpController
+from devices.valve_controller import ValveController
+from program import ir
+from program.timeline import Timeline
+
+logger = logging.getLogger(__name__)
+
+
+class Interpreter:
+    """程序 IR 解释器
+
+    逐个执行 IR 操作并直接调用 PumpController/ValveController，
+    每个操作之前检查一次停止事件。延时按时间线（见 timeline.py）等待。
+    """
+
+    def __init__(self, serial_controller, pump: Optional[PumpController] = None,
+                 port: Optional[str] = None, baudrate: Optional[int] = None,
+                 stop_event: Optional[threading.Event] = None,
+                 devices: Optional[DeviceManager] = None, drift_free: bool = False):
+        """初始化解释器
+
+        Args:
+            serial_controller: 串口控制器
+            pump: 注射泵控制器，默认新建
+            port: 覆盖程序中配置的串口
+            baudrate: 覆盖程序中配置的波特率
+            stop_event: 停止事件，设置后程序在下一个操作之前停止
+            devices: 设备管理器，提供时旋转阀等仪器可以使用独立串口的 I/O 线程
+            drift_free: 循环中的延时以计划时间为基准（见 timeline.py）
+        """
+        self.serial = serial_controller
+        self.pump = pump or PumpController(serial_controller)
+        self.valve = None
+        self.port = port
+        self.baudrate = baudrate
+        self.stop_event = stop_event or threading.Event()
+        self.devices = devices
+        self.timeline = Timeline(self.stop_event, drift_free=drift_free)
+        self.tracer = None  # BlockTracer，设置后每个操作之前报告所在的块
+        if devices is not None:
+            devices.adopt(serial_controller)
+        self._handlers = {
+            ir.InitPump: self._init_pump,
+            ir.SetVolumeRange: lambda op: self.pump.set_volume_range(op.volume),
+            ir.SetTotalSteps: lambda op: self.pump.set_total_steps(op.steps),
+            ir.SwitchInput: lambda op: self.pump.switch_to_input(),
+            ir.SwitchOutput: lambda op: self.pump.switch_to_output(),
+            ir.SetSpeed: lambda op: self.pump.set_speed(op.speed),
+            ir.Aspirate: lambda op: self.pump.aspirate(op.volume),
+            ir.Dispense: lambda op: self.pump.dispense(op.volume),
+            ir.StopPump: lambda op: self.pump.stop(),
+            ir.WaitIdle: lambda op: self.pump.wait_until_idle(op.timeout),
+            ir.Delay: lambda op: self.timeline.sleep(op.seconds),
+            ir.WaitUntil: lambda op: self.timeline.wait_until(op.offset),
+            ir.CloseSerial: self._close_serial,
+            ir.InitValve: self._init_valve,
+            ir.Rotate: self._rotate,
+            ir.Repeat: self._repeat,
+            ir.PumpLoop: self._pump_loop,
+        }
+
+    @property
+    def delay_scale(self) -> float:
+        """延时块的时间系数（回放时可设为 0）"""
+        return self.timeline.scale
+
+    @delay_scale.setter
+    def delay_scale(self, scale: float):
+        self.timeline.scale = scale
+
+    def run(self, program: ir.Program):
+        """执行程序
+
+        Raises:
+            InterruptedError: 程序被停止
+            ConnectionError: 串口连接失败
+        """
+        self.timeline.start()
+        # 停止时正在进行的等待空闲立即结束
+        pump_stop_event, self.pump.stop_event = self.pump.stop_event, self.stop_event
+        try:
+            self.execute(program.ops)
+        finally:
+            self.pump.stop_event = pump_stop_event
+            if self.tracer is not None:
+                self.tracer.finish()
+
+    def execute(self, ops):
+        """依次执行操作序列"""
+        handlers = self._handlers
+        tracer = self.tracer
+        for op in ops:
+            if self.stop_event.is_set():
+                raise InterruptedError("程序已停止")
+            if tracer is not None:
+                tracer.enter(op.block_id)
+            if handlers[type(op)](op) is False:
+                logger.warning("操作 %s 执行失败", type(op).__name__)
+
+    def _settings(self, config: Optional[dict]) -> dict:
+        """程序中的串口配置（构造参数优先）"""
+        settings = dict(config or {})
+        if self.port:
+            settings['port'] = self.port
+        if self.baudrate:
+            settings['baudrate'] = self.baudrate
+        return settings
+
+    def _connect(self, config: Optional[dict]):
+        """按程序中的串口配置连接"""
+        if self.serial.is_connected:
+            return
+        settings = self._settings(config)
+        if self.devices is not None:
+            shared = self.devices.controller(settings.get('port'))
+            if shared is not None and shared.is_connected:
+                # 同一串口已由设备管理器打开，直接复用
+                self.serial = self.pump.serial = shared
+                return
+        logger.info("正在连接串口 %s...", settings.get('port'))
+        if not self.serial.connect(settings):
+            raise ConnectionError(f"串口 {settings.get('port')} 连接失败")
+
+    def _init_pump(self, op: ir.InitPump):
+        self._connect(op.serial_config)
+        logger.info("正在初始化注射泵...")
+        self.pump.pump_address = op.address
+        if self.devices is not None:
+            self.devices.register('pump', self.pump)
+        return self.pump.initialize()
+
+    def _close_serial(self, op: ir.CloseSerial):
+        if self.serial.is_connected:
+            logger.info("正在关闭串口...")
+            self.serial.disconnect()
+
+    def _init_valve(self, op: ir.InitValve):
+        if self.devices is None:
+            self._connect(op.serial_config)
+            self.valve = ValveController(self.serial)
+        else:
+            # 旋转阀所在的串口由设备管理器的 I/O 线程收发，与注射泵互不阻塞
+            self.valve = self.devices.add_valve('valve', self._settings(op.serial_config))
+        return self.valve.initialize(op.address)
+
+    def _rotate(self, op: ir.Rotate):
+        if self.valve is None:
+            raise RuntimeError("旋转阀未初始化")
+        return self.valve.rotate_to_position(op.position)
+
+    def _repeat(self, op: ir.Repeat):
+        # 每次循环开始时更新时间线的循环起点（“在第 x 秒开始”以此为基准，见 timeline.py）
+        with self.timeline.loop() as iterate:
+            for _ in range(op.times):
+                iterate()
+                self.execute(op.body)
+
+    def _pump_loop(self, op: ir.PumpLoop):
+        batch = self.pump.batch()
+        try:
+            for body_op in op.body:
+                if isinstance(body_op, ir.SwitchInput):
+                    batch.switch_to_input()
+                elif isinstance(body_op, ir.SwitchOutput):
+                    batch.switch_to_output()
+                elif isinstance(body_op, ir.SetSpeed):
+                    batch.set_speed(body_op.speed)
+                elif isinstance(body_op, ir.Aspirate):
+                    batch.aspirate(body_op.volume)
+                elif isinstance(body_op, ir.Dispense):
+                    batch.dispense(body_op.volume)
+                elif isinstance(body_op, ir.Delay):
+                    batch.delay(body_op.seconds)
+            return batch.execute(times=op.times)
+        except ValueError:
+            # 超出设备缓冲区，退回到逐条发送
+            logger.info("固件循环命令过长，改为逐条执行")
+            return self._repeat(op)
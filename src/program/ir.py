@@ -0,0 +1,169 @@
+"""程序中间表示（IR）
+
+Blockly 程序被转换为一组带类型的操作，由解释器直接调用设备控制器执行，
+也可以在执行前进行校验、优化和耗时估算。
+"""
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+
+@dataclass(frozen=True)
+class Op:
+    """操作基类"""
+    block_id: Optional[str] = field(default=None, compare=False)
+
+
+@dataclass(frozen=True)
+class InitPump(Op):
+    """连接串口并初始化注射泵"""
+    serial_config: Optional[dict] = field(default=None, hash=False)
+    address: str = '1'
+
+
+@dataclass(frozen=True)
+class SetVolumeRange(Op):
+    """设置量程（ml）"""
+    volume: float = 0
+
+
+@dataclass(frozen=True)
+class SetTotalSteps(Op):
+    """设置总步数"""
+    steps: int = 0
+
+
+@dataclass(frozen=True)
+class SwitchInput(Op):
+    """切换到输入模式"""
+
+
+@dataclass(frozen=True)
+class SwitchOutput(Op):
+    """切换到输出模式"""
+
+
+@dataclass(frozen=True)
+class SetSpeed(Op):
+    """设置速度（Hz）"""
+    speed: float = 0
+
+
+@dataclass(frozen=True)
+class Aspirate(Op):
+    """吸液（ml）"""
+    volume: float = 0
+
+
+@dataclass(frozen=True)
+class Dispense(Op):
+    """排液（ml）"""
+    volume: float = 0
+
+
+@dataclass(frozen=True)
+class StopPump(Op):
+    """停止注射泵"""
+
+
+@dataclass(frozen=True)
+class WaitIdle(Op):
+    """等待注射泵执行完成（轮询状态字节）"""
+    timeout: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class Delay(Op):
+    """延时（秒）"""
+    seconds: float = 0
+
+
+@dataclass(frozen=True)
+class WaitUntil(Op):
+    """在程序开始（循环中为本次循环开始）后的第 offset 秒继续"""
+    offset: float = 0
+
+
+@dataclass(frozen=True)
+class CloseSerial(Op):
+    """关闭串口"""
+
+
+@dataclass(frozen=True)
+class InitValve(Op):
+    """连接串口并初始化旋转阀"""
+    serial_config: Optional[dict] = field(default=None, hash=False)
+    address: int = 1
+
+
+@dataclass(frozen=True)
+class Rotate(Op):
+    """旋转阀转到孔位（1-12）"""
+    position: int = 1
+
+
+@dataclass(frozen=True)
+class Repeat(Op):
+    """重复执行"""
+    times: int = 0
+    body: tuple = ()
+
+
+@dataclass(frozen=True)
+class PumpLoop(Repeat):
+    """在泵固件中执行的循环（循环体只包含可下发到泵的操作）"""
+
+
+# 只作用于注射泵的操作
+PUMP_OPS = (SetVolumeRange, SetTotalSteps, SwitchInput, SwitchOutput,
+            SetSpeed, Aspirate, Dispense, StopPump, WaitIdle)
+
+
+@dataclass
+class Program:
+    """一个完整的程序"""
+    ops: List[Op] = field(default_factory=list)
+
+    def walk(self):
+        """按出现顺序遍历所有操作（包括循环体内的操作）"""
+        stack = [iter(self.ops)]
+        while stack:
+            op = next(stack[-1], None)
+            if op is None:
+                stack.pop()
+                continue
+            yield op
+            if isinstance(op, Repeat):
+                stack.append(iter(op.body))
+
+    def validate(self) -> List[str]:
+        """在执行前检查程序
+
+        Returns:
+            List[str]: 错误信息列表，为空表示通过
+        """
+        errors = []
+        valve_ready = False
+        for op in self.walk():
+            where = f"（块 {op.block_id}）" if op.block_id else ""
+            if isinstance(op, (Aspirate, Dispense)) and op.volume < 0:
+                errors.append(f"体积不能为负数: {op.volume}{where}")
+            elif isinstance(op, SetSpeed) and not 0 <= op.speed <= 9999:
+                errors.append(f"速度超出范围 0-9999: {op.speed}{where}")
+            elif isinstance(op, SetVolumeRange) and op.volume <= 0:
+                errors.append(f"量程必须大于0: {op.volume}{where}")
+            elif isinstance(op, SetTotalSteps) and op.steps <= 0:
+                errors.append(f"总步数必须大于0: {op.steps}{where}")
+            elif isinstance(op, Delay) and op.seconds < 0:
+                errors.append(f"延时不能为负数: {op.seconds}{where}")
+            elif isinstance(op, WaitUntil) and op.offset < 0:
+                errors.append(f"开始时间不能为负数: {op.offset}{where}")
+            elif isinstance(op, Repeat) and op.times < 0:
+                errors.append(f"重复次数不能为负数: {op.times}{where}")
+            elif isinstance(op, InitValve):
+                valve_ready = True
+            elif isinstance(op, Rotate):
+                if not 1 <= op.position <= 12:
+                    errors.append(f"无效的孔位: {op.position}，孔位必须在 1-12 之间{where}")
+                if not valve_ready:
+                    errors.append(f"旋转阀未初始化{where}")
+        return errors
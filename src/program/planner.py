@@ -0,0 +1,387 @@
+"""执行前的耗时估算（不连接设备）
+
+按程序 IR 模拟一次运行，估算总耗时、吸液/排液总体积、串口往返次数和各设备的占用时间：
+    - 泵的运动时间按量程和总步数把体积换算为步数，再除以设置的速度（Hz，即每秒步数）；
+      吸液是绝对位置（柱塞移动到设定体积），排液是相对移动；
+    - 旋转阀按最短方向转过的孔位数计时；
+    - 延时和“在第 x 秒开始”使用与运行时相同的时间线规则（见 timeline.py），重复块逐次展开；
+    - 泵命令与运行时相同只计一次往返，泵自行运动，程序继续执行下一步；
+      只有等待空闲块（或 await_completion）按状态轮询等泵完成。
+主机等待某个设备时，等待时间记到使设备忙碌的块上，这些块的耗时之和等于总耗时，即关键路径。
+设备的时间参数（DeviceTiming）是估计值，可以用抓包文件中实测的应答延迟校准。
+"""
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from program import ir
+from program.timeline import Timeline
+
+logger = logging.getLogger(__name__)
+
+VALVE_POSITIONS = 12
+
+
+@dataclass
+class DeviceTiming:
+    """估算使用的设备时间参数（秒）"""
+    round_trip: float = 0.03  # 一次命令的串口往返
+    pump_initialize: float = 5.0  # 注射泵初始化（柱塞归零）
+    default_speed: float = 1000.0  # 程序没有设置速度时假定的泵速度（Hz）
+    valve_step: float = 0.1  # 旋转阀每转过一个孔位
+    poll_interval: float = 0.05  # 等待空闲时的状态查询间隔
+
+
+@dataclass
+class PlanStep:
+    """关键路径上的一个块"""
+    block_id: str
+    label: str = ''
+    seconds: float = 0.0
+    count: int = 0
+
+
+@dataclass
+class Plan:
+    """估算结果"""
+    duration: float = 0.0  # 总耗时（秒），包括程序结束时设备仍在执行的时间
+    aspirated: float = 0.0  # 吸液总体积（ml）
+    dispensed: float = 0.0  # 排液总体积（ml）
+    commands: int = 0  # 串口往返次数
+    busy: Dict[str, float] = field(default_factory=dict)  # 设备 -> 占用时间（秒）
+    steps: Dict[str, PlanStep] = field(default_factory=dict)  # 块 -> 关键路径上的耗时
+    warnings: List[str] = field(default_factory=list)
+
+    def utilization(self) -> Dict[str, float]:
+        """各设备的占用率（0-1）"""
+        if self.duration <= 0:
+            return {device: 0.0 for device in self.busy}
+        return {device: busy / self.duration for device, busy in self.busy.items()}
+
+    def critical_path(self) -> List[PlanStep]:
+        """按耗时从多到少排列的关键路径"""
+        return sorted(self.steps.values(), key=lambda step: step.seconds, reverse=True)
+
+    def report(self, top: int = 10) -> str:
+        """文字报告"""
+        lines = [f"预计耗时 {_format_duration(self.duration)}，串口往返 {self.commands} 次",
+                 f"吸液 {self.aspirated:.3f} ml，排液 {self.dispensed:.3f} ml"]
+        for device, ratio in self.utilization().items():
+            lines.append(f"{device}: 占用 {_format_duration(self.busy[device])}（{ratio:.0%}）")
+        if self.steps:
+            lines.append("关键路径（耗时最多的块）:")
+            for step in self.critical_path()[:top]:
+                share = step.seconds / self.duration if self.duration > 0 else 0.0
+                lines.append(f"  {step.block_id} {step.label}: {_format_duration(step.seconds)}"
+                             f"（{share:.0%}），执行 {step.count} 次")
+        lines.extend(f"警告: {warning}" for warning in self.warnings)
+        return '\n'.join(lines)
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:06.3f}"
+    if minutes:
+        return f"{minutes}:{seconds:06.3f}"
+    return f"{seconds:.3f} 秒"
+
+
+class _SimulatedTimeline(Timeline):
+    """在模拟时钟上执行的时间线：等待只推进时钟"""
+
+    def __init__(self, drift_free: bool = False):
+        super().__init__(drift_free=drift_free)
+        self.now = 0.0
+        self.clock = lambda: self.now
+
+    def _wait_until(self, deadline: float, scheduled: bool = True):
+        if deadline < self.now:
+            # 落后于计划，从当前时间重新计划
+            self.cursor = self.now
+            return
+        self.now = self.cursor = deadline
+
+
+class _Device:
+    """模拟的设备状态"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.free_at = 0.0  # 当前动作的结束时间
+        self.started_at = 0.0  # 当前动作的开始时间
+        self.step = None  # 当前动作所在的块
+        self.volume = 0.0  # 当前动作的吸液（正）或排液（负）体积
+
+
+class Planner:
+    """按程序 IR 估算耗时和体积"""
+
+    def __init__(self, timing: Optional[DeviceTiming] = None, await_completion: bool = False,
+                 drift_free: bool = False):
+        """初始化估算
+
+        Args:
+            timing: 设备时间参数，默认 DeviceTiming()
+            await_completion: 与 PumpController.await_completion 相同，每条泵命令后等待泵执行完成
+            drift_free: 与 Timeline.drift_free 相同，循环中的延时以计划时间为基准
+        """
+        self.timing = timing or DeviceTiming()
+        self.await_completion = await_completion
+        self.drift_free = drift_free
+        self._handlers = {
+            ir.InitPump: self._init_pump,
+            ir.SetVolumeRange: self._set_volume_range,
+            ir.SetTotalSteps: self._set_total_steps,
+            ir.SwitchInput: lambda op: self._pump_command(op),
+            ir.SwitchOutput: lambda op: self._pump_command(op),
+            ir.SetSpeed: self._set_speed,
+            ir.Aspirate: self._move,
+            ir.Dispense: self._move,
+            ir.StopPump: self._stop_pump,
+            ir.WaitIdle: self._wait_idle,
+            ir.Delay: lambda op: self.timeline.sleep(op.seconds),
+            ir.WaitUntil: lambda op: self.timeline.wait_until(op.offset),
+            ir.CloseSerial: lambda op: None,
+            ir.InitValve: self._init_valve,
+            ir.Rotate: self._rotate,
+            ir.Repeat: self._repeat,
+            ir.PumpLoop: self._pump_loop,
+        }
+
+    def plan(self, program: ir.Program) -> Plan:
+        """估算程序的执行
+
+        Returns:
+            Plan: 估算结果
+        """
+        self.timeline = _SimulatedTimeline(self.drift_free)
+        self.timeline.start()
+        self.result = Plan()
+        self.pump = _Device('注射泵')
+        self.valve = _Device('旋转阀')
+        self.volume_range = 25.0  # 与 PumpController 的默认值一致
+        self.total_steps = 6000
+        self.speed = None
+        self.plunger = 0.0  # 注射器中的体积（ml）
+        self.position = None  # 旋转阀当前孔位，未知时为 None
+        self._warned = set()
+
+        self.execute(program.ops)
+
+        # 程序结束后仍在执行的设备动作计入总耗时
+        self._current = None
+        for device in (self.pump, self.valve):
+            self._wait_for(device)
+        self.result.duration = self.timeline.now
+        return self.result
+
+    def execute(self, ops):
+        """依次模拟操作序列"""
+        for op in ops:
+            self._current = op
+            started = self.timeline.now
+            self._handlers[type(op)](op)
+            if type(op) is not ir.Repeat:  # 重复块的耗时记在循环体中的块上
+                self._record(op, self.timeline.now - started)
+
+    def _step(self, op: ir.Op) -> PlanStep:
+        label = type(op).__name__
+        key = op.block_id or label
+        step = self.result.steps.get(key)
+        if step is None:
+            step = self.result.steps[key] = PlanStep(key, label)
+        return step
+
+    def _record(self, op: ir.Op, seconds: float, count: int = 1):
+        step = self._step(op)
+        step.seconds += seconds
+        step.count += count
+
+    def _warn(self, message: str):
+        op = self._current
+        where = f"（块 {op.block_id}）" if op and op.block_id else ""
+        key = (message, op.block_id if op else None)
+        if key not in self._warned:
+            self._warned.add(key)
+            self.result.warnings.append(message + where)
+
+    def _round_trip(self, count: int = 1):
+        """主机发送命令并等待应答"""
+        self.result.commands += count
+        self.timeline.now += self.timing.round_trip * count
+
+    def _wait_for(self, device: _Device) -> bool:
+        """主机等待设备完成当前动作，等待时间记到使设备忙碌的块上
+
+        Returns:
+            bool: 是否需要等待
+        """
+        waited = device.free_at - self.timeline.now
+        if waited <= 0:
+            return False
+        self.timeline.now = device.free_at
+        self._record(device.step, waited, count=0)
+        if self._current is not None:
+            # 等待时间不再计入正在执行的块
+            self._record(self._current, -waited, count=0)
+        return True
+
+    def _occupy(self, device: _Device, seconds: float, volume: float = 0.0):
+        """设备从当前时间开始执行一个持续 seconds 秒的动作"""
+        device.started_at = self.timeline.now
+        device.free_at = self.timeline.now + seconds
+        device.step = self._current
+        device.volume = volume
+        self.result.busy[device.name] = self.result.busy.get(device.name, 0.0) + seconds
+
+    def _pump_command(self, op: ir.Op, seconds: float = 0.0, volume: float = 0.0):
+        """发送一条泵命令，泵执行 seconds 秒
+
+        与运行时相同，主机只等待命令的应答，不等待泵执行完成；await_completion 时再轮询到泵空闲。
+        """
+        self._send_pump_command(motion=seconds > 0)
+        self._start_pump(op, seconds, volume)
+
+    def _send_pump_command(self, motion: bool):
+        """命令的往返；泵仍在运动时收到运动命令，按新命令立即开始、之前的动作中止估算"""
+        self._round_trip()
+        if motion and self.pump.free_at > self.timeline.now:
+            # 泵可能拒绝（命令溢出）
+            self._warn("泵仍在运动时发送了新的运动命令，泵可能不执行，应先等待空闲")
+            self._cancel_pump()
+
+    def _start_pump(self, op: ir.Op, seconds: float, volume: float):
+        """泵开始执行已发送的命令"""
+        if seconds > 0:
+            self._occupy(self.pump, seconds, volume)
+        if self.await_completion:
+            self._wait_idle(op)
+
+    def _init_pump(self, op: ir.InitPump):
+        self._send_pump_command(motion=True)
+        self.plunger = 0.0
+        self._start_pump(op, self.timing.pump_initialize, 0.0)
+
+    def _set_volume_range(self, op: ir.SetVolumeRange):
+        if op.volume > 0:
+            self.volume_range = op.volume
+
+    def _set_total_steps(self, op: ir.SetTotalSteps):
+        if op.steps > 0:
+            self.total_steps = op.steps
+
+    def _set_speed(self, op: ir.SetSpeed):
+        self.speed = op.speed
+        self._pump_command(op)
+
+    def _move_seconds(self, volume: float) -> float:
+        """按当前量程、总步数和速度计算泵的运动时间"""
+        speed = self.speed
+        if not speed or speed <= 0:
+            self._warn(f"没有设置泵速度，按 {self.timing.default_speed:g} Hz 估算")
+            speed = self.timing.default_speed
+        steps = int(abs(volume) * self.total_steps / self.volume_range)
+        return steps / speed
+
+    def _stroke(self, op: ir.Op) -> float:
+        """吸液/排液命令使注射器中的体积变化多少（吸液为正）
+
+        吸液发送绝对位置命令 A（柱塞移动到该体积），排液发送相对移动命令 P。
+        """
+        if isinstance(op, ir.Aspirate):
+            return op.volume - self.plunger
+        return -op.volume
+
+    def _displace(self, volume: float):
+        """改变注射器中的体积并检查范围"""
+        self.plunger += volume
+        if self.plunger > self.volume_range + 1e-9:
+            self._warn(f"吸液后注射器中的体积 {self.plunger:g} ml 超过量程 {self.volume_range:g} ml")
+        elif self.plunger < -1e-9:
+            self._warn(f"排液体积超过注射器中的体积（{self.plunger:g} ml）")
+        if volume > 0:
+            self.result.aspirated += volume
+        else:
+            self.result.dispensed -= volume
+
+    def _move(self, op: ir.Op):
+        # 中止的动作会改变柱塞位置，先处理再计算绝对位置命令的行程
+        self._send_pump_command(motion=True)
+        volume = self._stroke(op)
+        self._displace(volume)
+        self._start_pump(op, self._move_seconds(volume), volume)
+
+    def _stop_pump(self, op: ir.StopPump):
+        self._round_trip()
+        if self.pump.free_at > self.timeline.now:
+            self._warn("停止时泵仍在运动，实际体积小于设定值")
+            self._cancel_pump()
+        if self.await_completion:
+            self._wait_idle(op)
+
+    def _cancel_pump(self):
+        """中止泵当前的动作，未完成的部分不计入体积和占用时间"""
+        pump = self.pump
+        remaining = pump.free_at - self.timeline.now
+        if remaining <= 0:
+            return
+        total = pump.free_at - pump.started_at
+        undone = pump.volume * remaining / total if total > 0 else 0.0
+        self.plunger -= undone
+        if undone > 0:
+            self.result.aspirated -= undone
+        else:
+            self.result.dispensed += undone
+        self.result.busy[pump.name] -= remaining
+        pump.free_at = self.timeline.now
+
+    def _wait_idle(self, op: ir.Op):
+        self._wait_for(self.pump)
+        # 最后一次状态查询，平均在完成后半个查询间隔
+        self.timeline.now += self.timing.poll_interval / 2
+        self._round_trip()
+
+    def _init_valve(self, op: ir.InitValve):
+        self._round_trip()
+
+    def _rotate(self, op: ir.Rotate):
+        if self.position is None:
+            # 起始孔位未知，按转过半圈估算
+            hops = VALVE_POSITIONS // 2
+        else:
+            distance = abs(op.position - self.position) % VALVE_POSITIONS
+            hops = min(distance, VALVE_POSITIONS - distance)
+        self.position = op.position
+        # 转阀命令的应答在转到位后返回，之后再查询一次状态
+        self._round_trip()
+        self._occupy(self.valve, hops * self.timing.valve_step)
+        self._wait_for(self.valve)
+        self._round_trip()
+
+    def _repeat(self, op: ir.Repeat):
+        with self.timeline.loop() as iterate:
+            for _ in range(op.times):
+                iterate()
+                self.execute(op.body)
+
+    def _pump_loop(self, op: ir.PumpLoop):
+        # 整个循环作为一条命令在泵固件中执行，延时为设备端延时
+        self._send_pump_command(motion=True)
+        seconds = 0.0
+        net = 0.0
+        for _ in range(op.times):
+            for body_op in op.body:
+                self._current = body_op
+                if isinstance(body_op, ir.SetSpeed):
+                    self.speed = body_op.speed
+                elif isinstance(body_op, (ir.Aspirate, ir.Dispense)):
+                    volume = self._stroke(body_op)
+                    self._displace(volume)
+                    seconds += self._move_seconds(volume)
+                    net += volume
+                elif isinstance(body_op, ir.Delay):
+                    seconds += max(0.0, body_op.seconds)
+        self._current = op
+        self._start_pump(op, seconds, net)
@@ -0,0 +1,121 @@
+"""按块统计执行耗时
+
+作为 BlockTracer 的监听者，记录每个块（Blockly 块 ID）的执行次数、耗时，
+以及期间的串口往返次数、收发字节数、超时次数和重发次数（设备控制器的重试策略超时后的重发），用于找出协议中占用周期时间最多的步骤。
+耗时为块的自身耗时：从进入该块到进入下一个块（循环块本身只包含开始循环的时间）。
+多个串口并行时，串口计数归属于程序执行线程当前所在的块。
+"""
+import csv
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional
+
+CSV_FIELDS = ('block_id', 'label', 'count', 'wall_s', 'share', 'requests',
+              'bytes_sent', 'bytes_received', 'timeouts', 'retries')
+
+
+@dataclass
+class BlockStats:
+    """一个块的统计"""
+    block_id: str
+    label: str = ''
+    count: int = 0
+    wall: float = 0.0  # 秒
+    requests: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    timeouts: int = 0
+    retries: int = 0
+
+
+class BlockProfiler:
+    """按块统计耗时和串口收发"""
+
+    def __init__(self, controllers: Callable[[], Iterable] = lambda: (),
+                 labels: Optional[Dict[str, str]] = None):
+        """初始化统计
+
+        Args:
+            controllers: 返回当前所有串口控制器的函数（读取其 stats 计数）
+            labels: 块 ID -> 显示名称（例如操作类型）
+        """
+        self.controllers = controllers
+        self.labels = labels or {}
+        self.blocks: Dict[str, BlockStats] = {}
+        self._current: Optional[str] = None
+        self._entered_at = 0.0
+        self._counters = (0, 0, 0, 0, 0)
+
+    def attach(self, tracer):
+        """开始统计（清空之前的结果）"""
+        self.blocks = {}
+        self._current = None
+        tracer.add_listener(self.on_block)
+
+    def detach(self, tracer):
+        """结束统计"""
+        tracer.remove_listener(self.on_block)
+        self.on_block(None)
+
+    def on_block(self, block_id: Optional[str]):
+        """进入下一个块（BlockTracer 监听者，在程序执行线程中调用）"""
+        now = time.perf_counter()
+        counters = self._read_counters()
+        if self._current is not None:
+            stats = self.blocks.get(self._current)
+            if stats is None:
+                stats = self.blocks[self._current] = BlockStats(
+                    self._current, self.labels.get(self._current, ''))
+            stats.count += 1
+            stats.wall += now - self._entered_at
+            stats.requests += counters[0] - self._counters[0]
+            stats.bytes_sent += counters[1] - self._counters[1]
+            stats.bytes_received += counters[2] - self._counters[2]
+            stats.timeouts += counters[3] - self._counters[3]
+            stats.retries += counters[4] - self._counters[4]
+        self._current = block_id
+        self._entered_at = now
+        self._counters = counters
+
+    def _read_counters(self) -> tuple:
+        totals = [0, 0, 0, 0, 0]
+        seen = set()
+        for controller in self.controllers():
+            if controller is None or id(controller) in seen:
+                continue
+            seen.add(id(controller))
+            for i, value in enumerate(controller.stats.snapshot()):
+                totals[i] += value
+        return tuple(totals)
+
+    @property
+    def total_wall(self) -> float:
+        """所有块的耗时之和（秒）"""
+        return sum(stats.wall for stats in self.blocks.values())
+
+    def ranked(self) -> List[BlockStats]:
+        """按耗时从多到少排列的统计"""
+        return sorted(self.blocks.values(), key=lambda stats: stats.wall, reverse=True)
+
+    def heatmap(self) -> Dict[str, dict]:
+        """块 ID -> {'share': 耗时占比 0-1, 'text': 说明文字}，供工作区显示"""
+        total = self.total_wall or 1.0
+        return {
+            stats.block_id: {
+                'share': stats.wall / total,
+                'text': (f"{stats.wall:.2f} s（{stats.wall / total:.0%}），执行 {stats.count} 次，"
+                         f"往返 {stats.requests} 次，超时 {stats.timeouts} 次，重发 {stats.retries} 次"),
+            }
+            for stats in self.blocks.values()
+        }
+
+    def write_csv(self, path: str):
+        """导出 CSV（按耗时排序）"""
+        total = self.total_wall or 1.0
+        with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_FIELDS)
+            for stats in self.ranked():
+                writer.writerow((stats.block_id, stats.label, stats.count, f"{stats.wall:.6f}",
+                                 f"{stats.wall / total:.4f}", stats.requests, stats.bytes_sent,
+                                 stats.bytes_received, stats.timeouts, stats.retries))
@@ -0,0 +1,92 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class ProgramRunner(QThread):
+    """程序执行线程
+
+    生成的程序在独立线程中执行，界面线程只负责显示和设备 I/O。
+    设备调用通过 SerialController 的跨线程请求队列回到串口所在线程，
+    日志通过 Qt 信号排队回到界面线程。
+    """
+
+    # 定义信号
+    program_started = pyqtSignal()  # 程序开始执行
+    program_finished = pyqtSignal(str)  # 程序结束：'completed' / 'stopped' / 'failed'
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._target = None
+        self._stop_event = threading.Event()
+
+    @property
+    def is_running(self) -> bool:
+        """程序是否在运行且未被请求停止"""
+        return self.isRunning() and not self._stop_event.is_set()
+
+    @property
+    def stop_event(self) -> threading.Event:
+        """停止事件，可供等待操作使用以便立即响应停止"""
+        return self._stop_event
+
+    def check_stop(self):
+        """检查是否已请求停止，已停止时抛出 InterruptedError"""
+        if self._stop_event.is_set():
+            raise InterruptedError("程序已停止")
+
+    def start_program(self, code, exec_globals: dict) -> bool:
+        """在工作线程中开始执行程序
+
+        Args:
+            code: 要执行的代码（源码或编译好的代码对象）
+            exec_globals: 执行环境
+
+        Returns:
+            bool: 是否成功启动（已有程序在运行时返回 False）
+        """
+        return self._start_target(lambda: exec(code, exec_globals))
+
+    def start_interpreter(self, program, interpreter) -> bool:
+        """在工作线程中用解释器执行程序 IR
+
+        Args:
+            program: 程序 IR
+            interpreter: 解释器，应使用本线程的 stop_event
+
+        Returns:
+            bool: 是否成功启动（已有程序在运行时返回 False）
+        """
+        return self._start_target(lambda: interpreter.run(program))
+
+    def _start_target(self, target) -> bool:
+        if self.isRunning():
+            logger.warning("已有程序正在运行")
+            return False
+        self._target = target
+        self._stop_event.clear()
+        self.start()
+        return True
+
+    def stop(self):
+        """请求停止程序"""
+        self._stop_event.set()
+
+    def run(self):
+        """线程入口"""
+        self.program_started.emit()
+        status = 'completed'
+        try:
+            self._target()
+            logger.info("程序执行完成")
+        except Exception as e:
+            if self._stop_event.is_set():
+                status = 'stopped'
+                logger.info("程序已停止")
+            else:
+                status = 'failed'
+                logger.error("代码执行失败: %s", e)
+        finally:
+            self._target = None
+            self.program_finished.emit(status)
@@ -0,0 +1,128 @@
+"""程序时间线
+
+延时在单调时钟上等待，停止时立即结束：
+    - 默认延时从上一条命令结束（当前时间）开始计算，与原来的行为一致；
+    - drift_free=True 时，循环中的延时以计划时间为基准，命令本身的耗时计入延时，
+      周期性加样即使运行很久也不会因串口往返而逐渐推迟（不在循环中的延时仍从当前时间开始）；
+    - wait_until(x) 在程序开始（循环中为本次循环开始）之后 x 秒继续，用于“在 T+x 秒开始”的步骤，
+      总是按截止时间等待，是不开启 drift_free 时显式的无漂移定时。
+截止时间已经过去时（命令耗时超过了延时）不等待、记录警告，并从当前时间重新计划，不会为了追赶而连续执行。
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Timeline:
+    """可被停止的时间线"""
+
+    def __init__(self, stop_event: Optional[threading.Event] = None, scale: float = 1.0,
+                 drift_free: bool = False):
+        """初始化时间线
+
+        Args:
+            stop_event: 停止事件，设置后等待立即结束并抛出 InterruptedError
+            scale: 时间系数（回放时可设为 0 跳过所有等待）
+            drift_free: 循环中的延时是否以计划时间为基准（命令耗时计入延时）
+        """
+        self.stop_event = stop_event or threading.Event()
+        self.scale = scale
+        self.drift_free = drift_free
+        self.origin: Optional[float] = None  # 程序开始时间
+        self.cursor: Optional[float] = None  # 当前步骤的计划时间
+        self._anchors: List[float] = []  # 各层循环本次循环开始的计划时间
+        self.clock = time.monotonic  # 时钟（耗时估算中替换为模拟时钟，见 planner.py）
+
+    def start(self):
+        """程序开始，时间线从当前时间计时"""
+        self.origin = self.cursor = self.clock()
+        self._anchors = []
+
+    @property
+    def elapsed(self) -> float:
+        """程序开始后经过的时间（秒）"""
+        if self.origin is None:
+            return 0.0
+        return self.clock() - self.origin
+
+    def sleep(self, seconds: float):
+        """延时
+
+        Raises:
+            InterruptedError: 等待期间程序被停止
+        """
+        self._ensure_started()
+        seconds = max(0.0, seconds) * self.scale
+        if self.drift_free and self._anchors:
+            self._wait_until(self.cursor + seconds)
+        else:
+            self._wait_until(self.clock() + seconds, scheduled=False)
+
+    def wait_until(self, offset: float):
+        """等到程序开始（循环中为本次循环开始）之后 offset 秒
+
+        Raises:
+            InterruptedError: 等待期间程序被停止
+        """
+        self._ensure_started()
+        anchor = self._anchors[-1] if self._anchors else self.origin
+        self._wait_until(anchor + max(0.0, offset) * self.scale)
+
+    @contextmanager
+    def loop(self):
+        """一个循环：每次循环开始时调用 yield 出的函数，记录本次循环的起点
+
+        drift_free 时以计划时间作为起点，否则以实际开始的时间作为起点。
+        """
+        self._ensure_started()
+        if not self._anchors:
+            # 最外层循环从当前时间开始计划
+            self.cursor = self.clock()
+        self._anchors.append(self.cursor)
+
+        def iterate():
+            if not self.drift_free:
+                self.cursor = self.clock()
+            self._anchors[-1] = self.cursor
+
+        try:
+            yield iterate
+        finally:
+            self._anchors.pop()
+
+    def repeat(self, times: int) -> Iterator[int]:
+        """按时间线执行的重复循环（供生成的 Python 代码使用：for count in timeline.repeat(n)）"""
+        with self.loop() as iterate:
+            for count in range(int(times)):
+                iterate()
+                yield count
+
+    def _ensure_started(self):
+        if self.origin is None:
+            self.start()
+
+    def _wait_until(self, deadline: float, scheduled: bool = True):
+        """等到截止时间，并把计划时间推进到截止时间
+
+        Args:
+            deadline: 截止时间
+            scheduled: 截止时间是否按计划时间计算（相对当前时间的延时不会真正落后）
+        """
+        remaining = deadline - self.clock()
+        if remaining < 0:
+            # 落后于计划，从当前时间重新计划
+            if scheduled and self.scale:
+                logger.warning("定时已过 %.1f ms，不再等待", -remaining * 1000)
+            self.cursor = self.clock()
+            if self.stop_event.is_set():
+                raise InterruptedError("程序已停止")
+            return
+        while remaining > 0:
+            if self.stop_event.wait(remaining):
+                raise InterruptedError("程序已停止")
+            remaining = deadline - self.clock()
+        self.cursor = deadline
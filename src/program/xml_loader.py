@@ -0,0 +1,158 @@
+import itertools
+import logging
+import xml.etree.ElementTree as ET
+from dataclasses import replace
+from typing import List
+
+from program import ir
+
+logger = logging.getLogger(__name__)
+
+
+# 语句块类型 -> (需要求值的输入名称, IR 构造函数)
+STATEMENT_BLOCKS = {
+    'pump_initialize': (('SERIAL_CONFIG', 'DEVICE_ADDRESS'),
+                        lambda a: ir.InitPump(serial_config=a['SERIAL_CONFIG'],
+                                              address=str(a['DEVICE_ADDRESS'] or 1))),
+    'pump_set_volume_range': (('VOLUME',), lambda a: ir.SetVolumeRange(volume=a['VOLUME'] or 0)),
+    'pump_set_total_steps': (('STEPS',), lambda a: ir.SetTotalSteps(steps=int(a['STEPS'] or 0))),
+    'pump_switch_input': ((), lambda a: ir.SwitchInput()),
+    'pump_switch_output': ((), lambda a: ir.SwitchOutput()),
+    'pump_set_speed': (('SPEED',), lambda a: ir.SetSpeed(speed=a['SPEED'] or 0)),
+    'pump_aspirate': (('VOLUME',), lambda a: ir.Aspirate(volume=a['VOLUME'] or 0)),
+    'pump_dispense': (('VOLUME',), lambda a: ir.Dispense(volume=a['VOLUME'] or 0)),
+    'pump_stop': ((), lambda a: ir.StopPump()),
+    'pump_delay': (('SECONDS',), lambda a: ir.Delay(seconds=a['SECONDS'] or 0)),
+    'pump_wait_idle': ((), lambda a: ir.WaitIdle()),
+    'timeline_wait_until': (('SECONDS',), lambda a: ir.WaitUntil(offset=a['SECONDS'] or 0)),
+    'serial_close': ((), lambda a: ir.CloseSerial()),
+    'init_valve': (('SERIAL_CONFIG', 'DEVICE_ADDRESS'),
+                   lambda a: ir.InitValve(serial_config=a['SERIAL_CONFIG'],
+                                          address=int(a['DEVICE_ADDRESS'] or 1))),
+    'rotate_valve': (('POSITION',), lambda a: ir.Rotate(position=int(a['POSITION'] or 0))),
+    'controls_repeat_ext': (('TIMES',), lambda a: ir.Repeat(times=int(a['TIMES'] or 0))),
+}
+
+
+def _local(tag: str) -> str:
+    """去掉 XML 命名空间"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _children(element, tag: str):
+    return [child for child in element if _local(child.tag) == tag]
+
+
+def _field(block, name: str):
+    for field in _children(block, 'field'):
+        if field.get('name') == name:
+            return field.text or ''
+    return None
+
+
+def _input(block, tag: str, name: str):
+    """获取 value/statement 输入中的块（真实块优先于 shadow 块）"""
+    for item in _children(block, tag):
+        if item.get('name') == name:
+            blocks = _children(item, 'block') or _children(item, 'shadow')
+            return blocks[0] if blocks else None
+    return None
+
+
+def _next(block):
+    """获取通过 next 连接的下一个语句块"""
+    for item in _children(block, 'next'):
+        blocks = _children(item, 'block')
+        return blocks[0] if blocks else None
+    return None
+
+
+def _number(text: str):
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+
+def evaluate_value(block):
+    """计算值块的结果
+
+    Args:
+        block: 值块 XML 元素
+
+    Returns:
+        数字、字符串或串口配置字典
+    """
+    if block is None:
+        return None
+    block_type = block.get('type')
+    if block_type == 'math_number':
+        return _number(_field(block, 'NUM'))
+    if block_type == 'device_address':
+        return _number(_field(block, 'ADDRESS'))
+    if block_type == 'serial_port_select':
+        return _field(block, 'PORT')
+    if block_type == 'text':
+        return _field(block, 'TEXT')
+    if block_type == 'serial_config':
+        port = evaluate_value(_input(block, 'value', 'PORT')) or 'COM3'
+        return {
+            'port': port,
+            'baudrate': int(_field(block, 'BAUDRATE')),
+            'databits': int(_field(block, 'DATABITS')),
+            'parity': _field(block, 'PARITY'),
+            'stopbits': _number(_field(block, 'STOPBITS')),
+            'flowcontrol': 'N'
+        }
+    raise ValueError(f"不支持的值块类型: {block_type}")
+
+
+def _load_statements(block, numbers) -> List[ir.Op]:
+    """加载从 block 开始、通过 next 连接的语句序列
+
+    保存的程序文件中没有块 ID，这时按出现顺序编号为 #1、#2……（用于错误信息和性能统计）
+    """
+    ops = []
+    while block is not None:
+        block_type = block.get('type')
+        if block_type not in STATEMENT_BLOCKS:
+            raise ValueError(f"不支持的语句块类型: {block_type}")
+        inputs, build = STATEMENT_BLOCKS[block_type]
+        args = {name: evaluate_value(_input(block, 'value', name)) for name in inputs}
+        op = replace(build(args), block_id=block.get('id') or f"#{next(numbers)}")
+        if isinstance(op, ir.Repeat):
+            op = replace(op, body=tuple(_load_statements(_input(block, 'statement', 'DO'), numbers)))
+        ops.append(op)
+        block = _next(block)
+    return ops
+
+
+def load_program(xml_text: str) -> ir.Program:
+    """把 Blockly 工作区 XML 转换为程序 IR
+
+    工作区中的多个顶层块按 y 坐标（其次 x 坐标）依次执行。
+
+    Args:
+        xml_text: Blockly XML 文本
+
+    Returns:
+        Program: 程序 IR
+
+    Raises:
+        ValueError: XML 中包含不支持的块
+    """
+    root = ET.fromstring(xml_text)
+    top_blocks = sorted(
+        _children(root, 'block'),
+        key=lambda b: (float(b.get('y', 0)), float(b.get('x', 0)))
+    )
+    ops = []
+    numbers = itertools.count(1)
+    for block in top_blocks:
+        ops.extend(_load_statements(block, numbers))
+    logger.debug("Loaded %d top-level ops", len(ops))
+    return ir.Program(ops)
+
+
+def load_program_file(path: str) -> ir.Program:
+    """从文件加载程序 IR"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return load_program(f.read())
@@ -0,0 +1,61 @@
+"""启动耗时统计
+
+记录从进程启动到 Blockly 页面可用的各阶段耗时（导入、界面构建、页面加载等），
+用于跟踪实验室电脑上的冷启动时间。
+"""
+import json
+import logging
+import platform
+import time
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StartupProfile:
+    """按阶段记录启动耗时"""
+
+    def __init__(self, started_at: Optional[float] = None):
+        self.started_at = time.perf_counter() if started_at is None else started_at
+        self._last = self.started_at
+        self.stages: List[Tuple[str, float]] = []  # (阶段, 耗时秒数)
+        self.reported = False
+
+    def mark(self, stage: str) -> float:
+        """结束一个阶段，返回该阶段的耗时（秒）"""
+        now = time.perf_counter()
+        elapsed = now - self._last
+        self._last = now
+        self.stages.append((stage, elapsed))
+        return elapsed
+
+    @property
+    def total(self) -> float:
+        """到最后一个阶段结束为止的总耗时（秒）"""
+        return self._last - self.started_at
+
+    def report(self) -> str:
+        """格式化的耗时报告"""
+        lines = ["启动耗时:"]
+        for stage, elapsed in self.stages:
+            lines.append(f"  {stage:<16} {elapsed * 1000:8.1f} ms")
+        lines.append(f"  {'合计':<16} {self.total * 1000:8.1f} ms")
+        return '\n'.join(lines)
+
+    def log_report(self):
+        """输出耗时报告（只输出一次）"""
+        if not self.reported:
+            self.reported = True
+            logger.info("%s", self.report())
+
+    def save(self, path: str):
+        """把本次启动耗时追加到 JSON Lines 文件，便于比较多台电脑、多次启动"""
+        entry = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'host': platform.node(),
+            'python': platform.python_version(),
+            'stages': {stage: round(elapsed * 1000, 1) for stage, elapsed in self.stages},
+            'total_ms': round(self.total * 1000, 1),
+        }
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
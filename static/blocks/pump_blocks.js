@@ -133,6 +133,14 @@ Blockly.defineBlocksWithJsonArray([
         "colour": 230,
         "tooltip": "停止注射泵"
     },
+    {
+        "type": "pump_wait_idle",
+        "message0": "等待泵执行完成",
+        "previousStatement": null,
+        "nextStatement": null,
+        "colour": 210,
+        "tooltip": "轮询注射泵状态，直到柱塞停止"
+    },
     {
         "type": "pump_delay",
         "message0": "延时 %1 秒",
@@ -146,7 +154,22 @@ Blockly.defineBlocksWithJsonArray([
         "previousStatement": null,
         "nextStatement": null,
         "colour": 210,
-        "tooltip": "等待指定的秒数"
+        "tooltip": "等待指定的秒数（从上一条命令结束算起；需要固定节拍时用“在第 x 秒开始”）"
+    },
+    {
+        "type": "timeline_wait_until",
+        "message0": "在第 %1 秒开始",
+        "args0": [
+            {
+                "type": "input_value",
+                "name": "SECONDS",
+                "check": "Number"
+            }
+        ],
+        "previousStatement": null,
+        "nextStatement": null,
+        "colour": 210,
+        "tooltip": "等到程序开始（在循环中为本次循环开始）后的第几秒再执行后面的步骤"
     }
 ]);
 
@@ -215,5 +238,28 @@ Blockly.Python['pump_stop'] = function(block) {
 
 Blockly.Python['pump_delay'] = function(block) {
     var seconds = Blockly.Python.valueToCode(block, 'SECONDS', Blockly.Python.ORDER_ATOMIC) || '0';
-    return 'import time\ntime.sleep(' + seconds + ')\n';
+    return 'timeline.sleep(' + seconds + ')\n';
+};
+
+Blockly.Python['timeline_wait_until'] = function(block) {
+    var seconds = Blockly.Python.valueToCode(block, 'SECONDS', Blockly.Python.ORDER_ATOMIC) || '0';
+    return 'timeline.wait_until(' + seconds + ')\n';
+};
+
+// 重复块按时间线执行：每次循环开始时更新循环起点，“在第 x 秒开始”以本次循环开始为基准
+(Blockly.Python.forBlock || Blockly.Python)['controls_repeat_ext'] = function(block) {
+    var repeats;
+    if (block.getField('TIMES')) {
+        repeats = String(parseInt(block.getFieldValue('TIMES'), 10));
+    } else {
+        repeats = Blockly.Python.valueToCode(block, 'TIMES', Blockly.Python.ORDER_NONE) || '0';
+    }
+    var branch = Blockly.Python.statementToCode(block, 'DO');
+    branch = Blockly.Python.addLoopTrap(branch, block) || Blockly.Python.PASS;
+    var loopVar = Blockly.Python.nameDB_.getDistinctName('count', Blockly.Names.NameType.VARIABLE);
+    return 'for ' + loopVar + ' in timeline.repeat(' + repeats + '):\n' + branch;
+};
+
+Blockly.Python['pump_wait_idle'] = function(block) {
+    return 'pump.wait_until_idle()\n';
 };
@@ -26,10 +26,9 @@ Blockly.Python['init_valve'] = function(block) {
     
     // 生成初始化代码
     var code = '';
-    code += 'serial_controller = SerialController()\n';
-    code += `if serial_controller.connect(${serial_config}):\n`;
-    code += '    valve = ValveController(serial_controller)\n';
-    code += `    valve.initialize(${device_address})\n`;
+    // 旋转阀所在的串口由设备管理器打开，每个串口有独立的 I/O 线程
+    code += `valve = device_manager.add_valve('valve', ${serial_config})\n`;
+    code += `valve.initialize(${device_address})\n`;
     
     return code;
 };
@@ -0,0 +1,33 @@
+"""测试配置：与 src/main.py、src/cli.py 相同，以 src 为导入根目录"""
+import os
+import sys
+
+import pytest
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(TESTS_DIR), 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+
+def fixture_path(name: str) -> str:
+    """tests 目录中示例程序的路径"""
+    return os.path.join(TESTS_DIR, name)
+
+
+SERIAL_SETTINGS = {'baudrate': 9600, 'databits': 8, 'parity': 'N', 'stopbits': 1, 'flowcontrol': 'N'}
+
+
+@pytest.fixture(scope='session')
+def qapp():
+    """串口控制器等 QObject 需要的 Qt 应用"""
+    from PyQt5.QtCore import QCoreApplication
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+def replay_controller(exchanges, port: str = 'REPLAY', realtime: bool = False):
+    """按录制的请求/应答回放的已连接串口控制器（见 devices/replay.py）"""
+    from devices.replay import ReplaySerialController
+    controller = ReplaySerialController(port, list(exchanges), realtime)
+    assert controller.connect(dict(SERIAL_SETTINGS, port=port))
+    return controller
@@ -0,0 +1,67 @@
+"""串口设备自动检测"""
+import time
+
+from conftest import replay_controller
+from devices.auto_detect import DetectedDevice, probe_port, unique_ports
+from devices.pump_controller import PumpController
+from devices.replay import Exchange
+from devices.valve_controller import ValveController
+
+
+def valve_status_reply(address):
+    frame = [ValveController.START_BYTE, ValveController.STATUS_CMD, address, 0, 0, 0, 0]
+    return bytes(frame + [ValveController._calculate_checksum(frame)])
+
+
+def test_unique_ports_prefers_full_paths():
+    assert unique_ports(['ttyUSB0', '/dev/ttyUSB0', 'COM3']) == ['/dev/ttyUSB0', 'COM3']
+
+
+def test_probe_port_finds_devices_one_address_at_a_time(qapp):
+    pump_query = PumpController.command_frame('2', 'Q', execute=False).encode()
+    controller = replay_controller([
+        Exchange(pump_query, ((0.0, b'/0`\x03\r\n'),)),
+        Exchange(ValveController.status_frame(3), ((0.0, valve_status_reply(3)),)),
+    ], port='COM7')
+    port = controller.serial
+    busy_writes = []
+    write = port.write
+
+    def checked_write(data):
+        # 写入时总线上不应有其他在途的查询
+        busy_writes.append(controller._bus.in_flight is not None)
+        return write(data)
+    port.write = checked_write
+
+    found = probe_port(controller, pump_addresses=('1', '2', '3'), valve_addresses=(1, 2, 3, 4),
+                       timeout=0.05, scan_all=True)
+    assert found == [DetectedDevice('COM7', 'pump', '2'), DetectedDevice('COM7', 'valve', 3)]
+    assert busy_writes == [False] * 7
+
+
+def pump_query(address):
+    return PumpController.command_frame(address, 'Q', execute=False).encode()
+
+
+def test_silent_port_costs_one_timeout_per_device_kind(qapp):
+    controller = replay_controller([Exchange(pump_query('1'), ()),
+                                    Exchange(ValveController.status_frame(1), ())], port='COM8')
+    started = time.monotonic()
+    assert probe_port(controller, timeout=0.1) == []
+    assert time.monotonic() - started < 0.5
+    summary = controller.serial.summary()
+    assert summary['matched'] == 2 and summary['unexpected'] == 0
+
+
+def test_mixed_bus_scans_until_the_first_silent_address(qapp):
+    controller = replay_controller([
+        Exchange(pump_query('1'), ((0.0, b'/0`\x03\r\n'),)),
+        Exchange(pump_query('2'), ()),
+        Exchange(ValveController.status_frame(1), ((0.0, valve_status_reply(1)),)),
+        Exchange(ValveController.status_frame(2), ((0.0, valve_status_reply(2)),)),
+        Exchange(ValveController.status_frame(3), ()),
+    ], port='COM9')
+    found = probe_port(controller, timeout=0.05)
+    assert found == [DetectedDevice('COM9', 'pump', '1'), DetectedDevice('COM9', 'valve', 1),
+                     DetectedDevice('COM9', 'valve', 2)]
+    assert controller.serial.summary()['unexpected'] == 0
@@ -0,0 +1,127 @@
+"""块级执行进度"""
+import ast
+
+import pytest
+
+from program.block_trace import (BLOCK_HOOK, BlockTracer, block_lines, insert_block_hooks,
+                                 instrument)
+from program.checkpoints import CHECK_STOP
+
+
+def run(source, tracer):
+    scope = {BLOCK_HOOK: tracer.enter, CHECK_STOP: lambda: None}
+    exec(compile(instrument(source), '<test>', 'exec'), scope)
+    return scope
+
+
+@pytest.mark.parametrize('comment, block_id', [
+    ("# block_id: 'a1'", 'a1'),
+    ("# block_id: a1", 'a1'),
+    ("  # block_id: 'q)U[7|=d;/#x@~'  ", 'q)U[7|=d;/#x@~'),
+    ("# block_id: 'it's'", "it's"),
+    ("# block_id: 'back\\\\slash\\n'", 'back\\\\slash\\n'),
+])
+def test_block_id_comment_keeps_the_whole_id(comment, block_id):
+    assert block_lines(f"{comment}\nx = 1\n") == {2: block_id}
+
+
+def test_hooks_use_the_exact_id():
+    source = "# block_id: 'it's \\\\'\nx = 1\n"
+    tree = insert_block_hooks(ast.parse(source), source)
+    hook = tree.body[0].value
+    assert hook.func.id == BLOCK_HOOK and hook.args[0].value == "it's \\\\"
+
+
+def test_hooks_in_nested_blocks_keep_indentation():
+    source = (
+        "# block_id: 'loop'\n"
+        "for i in range(2):\n"
+        "    # block_id: 'if'\n"
+        "    if i:\n"
+        "        # block_id: 'inner'\n"
+        "        x = i\n"
+        "    else:\n"
+        "        # block_id: 'other'\n"
+        "        x = -i\n"
+    )
+    lines = ast.unparse(insert_block_hooks(ast.parse(source), source)).splitlines()
+    assert lines == [
+        f"{BLOCK_HOOK}('loop')",
+        "for i in range(2):",
+        f"    {BLOCK_HOOK}('if')",
+        "    if i:",
+        f"        {BLOCK_HOOK}('inner')",
+        "        x = i",
+        "    else:",
+        f"        {BLOCK_HOOK}('other')",
+        "        x = -i",
+    ]
+
+
+def test_tracer_reports_blocks_in_execution_order():
+    source = (
+        "# block_id: 'start'\n"
+        "n = 0\n"
+        "# block_id: 'loop'\n"
+        "for i in range(2):\n"
+        "    # block_id: 'body'\n"
+        "    n += i\n"
+        "# block_id: 'end'\n"
+        "done = True\n"
+    )
+    tracer = BlockTracer()
+    seen = []
+    tracer.add_listener(seen.append)
+    scope = run(source, tracer)
+    tracer.finish()
+    assert seen == ['start', 'loop', 'body', 'body', 'end', None]
+    assert scope['n'] == 1 and tracer.current is None
+
+
+def test_removed_listener_is_not_called():
+    tracer = BlockTracer()
+    seen = []
+    tracer.add_listener(seen.append)
+    tracer.enter('a')
+    tracer.remove_listener(seen.append)
+    tracer.enter('b')
+    assert seen == ['a'] and tracer.current == 'b'
+
+
+class FakeTimer:
+    def __init__(self):
+        self.active = False
+
+    def start(self):
+        self.active = True
+
+    def stop(self):
+        self.active = False
+
+
+class FakeWorkspace:
+    """只包含 follow/unfollow 用到的属性，不创建 QtWebEngine 页面"""
+
+    def __init__(self):
+        self._highlight_timer = FakeTimer()
+        self._tracer = None
+        self._highlighted = None
+        self.highlights = []
+
+    def highlight_block(self, block_id):
+        self.highlights.append(block_id)
+
+
+def test_workspace_follows_tracer():
+    workspace_module = pytest.importorskip('components.blockly_workspace')
+    cls = workspace_module.BlocklyWorkspace
+    workspace = FakeWorkspace()
+    tracer = BlockTracer()
+    cls.follow(workspace, tracer)
+    assert workspace._highlight_timer.active
+    for block_id in ('a', 'a', 'b'):
+        tracer.enter(block_id)
+        cls._update_highlight(workspace)
+    cls.unfollow(workspace)
+    assert workspace.highlights == ['a', 'b', None]
+    assert not workspace._highlight_timer.active
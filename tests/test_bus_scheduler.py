@@ -0,0 +1,110 @@
+"""半双工总线上的请求调度"""
+from concurrent.futures import Future
+
+from conftest import replay_controller
+from devices.bus_scheduler import BusScheduler
+from devices.framing import AsciiFrameDecoder, FixedLengthFrameDecoder
+from devices.replay import Exchange
+from devices.valve_controller import ValveController
+
+VALVE_DECODER = FixedLengthFrameDecoder(8, ValveController.START_BYTE, ValveController.ADDRESS_OFFSET)
+
+
+class Request:
+    def __init__(self, address=None, decoder=VALVE_DECODER):
+        self.address = address
+        self.decoder = decoder
+        self.future = Future()
+        self.deadline = 0.0
+
+
+def valve_reply(address):
+    return bytes([0x03, 0x55, address, 0, 0, 0, 0, 0])
+
+
+def test_only_one_request_in_flight():
+    bus = BusScheduler()
+    first, second = Request(1), Request(2)
+    bus.push(first)
+    bus.push(second)
+    assert bus.next_ready() is first
+    bus.start(first)
+    # 不同地址的请求也要等总线空闲
+    assert bus.next_ready() is None
+    bus.finish(first)
+    assert bus.next_ready() is second
+
+
+def test_in_flight_slot_and_deadline():
+    bus = BusScheduler()
+    request = Request(1)
+    request.deadline = 12.5
+    assert bus.deadline() is None and not bus
+    bus.push(request)
+    bus.start(bus.next_ready())
+    assert bus.in_flight is request and bus.deadline() == 12.5
+    bus.finish(Request(2))  # 不是在途请求，不影响
+    assert bus.in_flight is request
+    bus.finish(request)
+    assert bus.in_flight is None and bus.deadline() is None
+
+
+def test_drain_returns_in_flight_first():
+    bus = BusScheduler()
+    first, second = Request(1), Request(2)
+    bus.push(first)
+    bus.push(second)
+    bus.start(bus.next_ready())
+    assert bus.drain() == [first, second]
+    assert bus.in_flight is None and not bus
+
+
+def test_requests_keep_submission_order():
+    bus = BusScheduler()
+    requests = [Request(), Request(3), Request('1', AsciiFrameDecoder())]
+    for request in requests:
+        bus.push(request)
+    order = []
+    while bus:
+        request = bus.next_ready()
+        order.append(request)
+        bus.start(request)
+        bus.finish(request)
+    assert order == requests
+
+
+def test_cancelled_requests_are_skipped():
+    bus = BusScheduler()
+    cancelled, live = Request(1), Request(2)
+    cancelled.future.cancel()
+    bus.push(cancelled)
+    bus.push(live)
+    assert bus.next_ready() is live
+
+
+def test_reply_from_another_address_is_not_matched():
+    bus = BusScheduler()
+    request = Request(2)
+    bus.start(request)
+    assert bus.match(valve_reply(1)) is None  # 例如上一个超时请求迟到的应答
+    assert bus.match(valve_reply(2)) is request
+
+
+def test_uncorrelated_reply_matches_current_request():
+    bus = BusScheduler()
+    request = Request('1', AsciiFrameDecoder())
+    bus.start(request)
+    assert not bus.correlated(request)
+    assert bus.match(b'/0`\x03\r\n') is request
+
+
+def test_controller_writes_next_request_only_after_reply(qapp):
+    frames = {address: ValveController.status_frame(address) for address in (1, 2)}
+    controller = replay_controller(
+        [Exchange(frames[address], ((0.0, valve_reply(address)),)) for address in (1, 2)])
+    port = controller.serial
+    futures = [controller.submit(frames[address], decoder=VALVE_DECODER, address=address, timeout=1)
+               for address in (1, 2)]
+    assert port.writes == 1
+    assert [controller.wait(future)[2] for future in futures] == [1, 2]
+    assert port.summary()['matched'] == 2
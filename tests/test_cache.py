@@ -0,0 +1,87 @@
+"""编译结果缓存"""
+from types import CodeType
+
+from conftest import fixture_path
+from program import block_trace, cache, checkpoints
+from program.cache import ProgramCache
+
+
+def read_fixture(name):
+    with open(fixture_path(name), encoding='utf-8') as f:
+        return f.read()
+
+
+def test_toolchain_version_covers_instrumentation(monkeypatch, tmp_path):
+    before = cache._toolchain_version()
+    for module in (checkpoints, block_trace):
+        edited = tmp_path / f"{module.__name__}.py"
+        edited.write_bytes(open(module.__file__, 'rb').read() + b'\n# edited\n')
+        with monkeypatch.context() as m:
+            m.setattr(module, '__file__', str(edited))
+            assert cache._toolchain_version() != before
+    assert cache._toolchain_version() == before
+
+
+def test_key_depends_on_kind_source_and_options():
+    programs = ProgramCache()
+    key = programs.key('code', 'x = 1', 'a')
+    assert key == programs.key('code', 'x = 1', 'a')
+    assert key != programs.key('ir', 'x = 1', 'a')
+    assert key != programs.key('code', 'x = 2', 'a')
+    assert key != programs.key('code', 'x = 1', 'b')
+
+
+def test_lru_eviction():
+    programs = ProgramCache(maxsize=2)
+    programs.put('a', 1)
+    programs.put('b', 2)
+    assert programs.get('a') == 1  # a 变为最近使用
+    programs.put('c', 3)
+    assert programs.get('b') is None
+    assert programs.get('a') == 1 and programs.get('c') == 3
+    assert len(programs) == 2
+
+
+def test_disk_round_trip(tmp_path):
+    programs = ProgramCache(cache_dir=str(tmp_path))
+    code = programs.compile_code('x = 1 + 1')
+    entry = programs.load_program(read_fixture('1.xml'))
+
+    restarted = ProgramCache(cache_dir=str(tmp_path))
+    assert restarted.compile_code('x = 1 + 1') == code
+    assert restarted.load_program(read_fixture('1.xml')) == entry
+    assert restarted.hits == 2 and restarted.misses == 0
+
+
+def test_unreadable_entry_is_discarded(tmp_path):
+    programs = ProgramCache(cache_dir=str(tmp_path))
+    (tmp_path / 'broken').write_bytes(b'pnot a pickle')
+    assert programs.get('broken') is None
+    assert not (tmp_path / 'broken').exists()
+
+
+def test_compile_code_caches_transformed_code():
+    calls = []
+
+    def transform(source):
+        calls.append(source)
+        return source.replace('1', '2')
+
+    programs = ProgramCache()
+    code = programs.compile_code('x = 1', transform=transform)
+    assert programs.compile_code('x = 1', transform=transform) is code
+    assert calls == ['x = 1']
+    assert isinstance(code, CodeType)
+    scope = {}
+    exec(code, scope)
+    assert scope['x'] == 2
+    assert programs.compile_code('x = 1') is not code  # 不同的改写是不同的条目
+
+
+def test_load_program_caches_compiled_ir():
+    programs = ProgramCache()
+    program, errors = programs.load_program(read_fixture('1.xml'))
+    assert errors == []
+    assert programs.load_program(read_fixture('1.xml'))[0] is program
+    assert programs.load_program(read_fixture('1.xml'), firmware_loops=True)[0] is not program
+    assert programs.hits == 1 and programs.misses == 2
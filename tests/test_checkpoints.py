@@ -0,0 +1,66 @@
+"""生成代码中的停止检查点"""
+import ast
+import threading
+import time
+
+import pytest
+
+from program.checkpoints import CHECK_STOP, insert_checkpoints
+
+
+def rewritten(source):
+    return ast.unparse(insert_checkpoints(source))
+
+
+def run_with_stop_event(source, stop_event, scope=None):
+    def check_stop():
+        if stop_event.is_set():
+            raise InterruptedError("程序已停止")
+    scope = dict(scope or {}, **{CHECK_STOP: check_stop})
+    exec(compile(insert_checkpoints(source), '<test>', 'exec'), scope)
+    return scope
+
+
+def test_checkpoint_at_loop_back_edge():
+    lines = rewritten("while True:\n    x = 1\n").splitlines()
+    assert lines == ['while True:', f'    {CHECK_STOP}()', '    x = 1']
+
+
+def test_checkpoint_before_device_calls():
+    lines = rewritten("pump.aspirate(1)\nv = 2\nvalve.rotate_to_position(v)\n").splitlines()
+    assert lines == [f'{CHECK_STOP}()', 'pump.aspirate(1)', 'v = 2',
+                     f'{CHECK_STOP}()', 'valve.rotate_to_position(v)']
+
+
+def test_no_duplicate_checkpoint_at_start_of_loop_body():
+    lines = rewritten("for i in range(3):\n    pump.dispense(i)\n").splitlines()
+    assert lines.count(f'    {CHECK_STOP}()') == 1
+
+
+def test_string_literals_are_not_rewritten():
+    source = "message = 'pump.aspirate(1)'\n"
+    assert rewritten(source) == "message = 'pump.aspirate(1)'"
+
+
+def test_stop_interrupts_infinite_loop_promptly():
+    stop_event = threading.Event()
+    timer = threading.Timer(0.05, stop_event.set)
+    started = time.monotonic()
+    timer.start()
+    with pytest.raises(InterruptedError):
+        run_with_stop_event("n = 0\nwhile True:\n    n += 1\n", stop_event)
+    assert time.monotonic() - started < 1.0
+
+
+def test_stop_skips_remaining_device_calls():
+    calls = []
+    stop_event = threading.Event()
+
+    class Pump:
+        def aspirate(self, volume):
+            calls.append(volume)
+            stop_event.set()
+
+    with pytest.raises(InterruptedError):
+        run_with_stop_event("pump.aspirate(1)\npump.aspirate(2)\n", stop_event, {'pump': Pump()})
+    assert calls == [1]
@@ -0,0 +1,43 @@
+"""把重复块折叠为泵固件循环"""
+from devices.pump_controller import PumpController
+from program import compiler, ir
+
+BODY = (ir.SwitchInput(), ir.Aspirate(volume=1), ir.SwitchOutput(), ir.Dispense(volume=1),
+        ir.Delay(seconds=2))
+
+
+def fold(*ops):
+    return compiler.compile_program(ir.Program(list(ops)), firmware_loops=True).ops
+
+
+def test_pump_only_repeat_becomes_firmware_loop():
+    [op] = fold(ir.Repeat(block_id='r', times=5, body=BODY))
+    assert isinstance(op, ir.PumpLoop)
+    assert op.times == 5 and op.body == BODY and op.block_id == 'r'
+
+
+def test_folding_is_opt_in():
+    program = ir.Program([ir.Repeat(times=5, body=BODY)])
+    assert compiler.compile_program(program).ops == program.ops
+
+
+def test_loop_count_limits_follow_pump_controller():
+    limit = PumpController.MAX_LOOP_COUNT
+    assert isinstance(fold(ir.Repeat(times=limit, body=BODY))[0], ir.PumpLoop)
+    assert type(fold(ir.Repeat(times=limit + 1, body=BODY))[0]) is ir.Repeat
+    assert type(fold(ir.Repeat(times=1, body=BODY))[0]) is ir.Repeat
+
+
+def test_repeat_with_other_devices_is_not_folded():
+    body = BODY + (ir.Rotate(position=2),)
+    assert type(fold(ir.InitValve(), ir.Repeat(times=5, body=body))[1]) is ir.Repeat
+
+
+def test_repeat_without_liquid_handling_is_not_folded():
+    assert type(fold(ir.Repeat(times=5, body=(ir.Delay(seconds=1),)))[0]) is ir.Repeat
+
+
+def test_only_innermost_loop_is_folded():
+    [outer] = fold(ir.Repeat(times=3, body=(ir.Repeat(times=4, body=BODY), ir.Delay(seconds=1))))
+    assert type(outer) is ir.Repeat
+    assert isinstance(outer.body[0], ir.PumpLoop) and outer.body[0].times == 4
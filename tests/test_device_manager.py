@@ -0,0 +1,90 @@
+"""多串口设备管理：每个串口一个 I/O 线程"""
+from PyQt5.QtCore import QThread
+
+from conftest import SERIAL_SETTINGS
+from devices.device_manager import DeviceManager
+from devices.replay import Exchange, ReplaySerialController
+
+READY = b'/0`\x03\r\n'
+
+
+def replay_manager(sessions):
+    """按串口名回放 sessions 中录制的会话的设备管理器"""
+    return DeviceManager(controller_factory=lambda port: ReplaySerialController(port, sessions[port]))
+
+
+def settings(port):
+    return dict(SERIAL_SETTINGS, port=port)
+
+
+def record_write_threads(controller):
+    """记录控制器每次写入串口时所在的线程"""
+    threads = []
+    write = controller._write
+
+    def _write(data, address=None):
+        threads.append(QThread.currentThread())
+        return write(data, address)
+
+    controller._write = _write
+    return threads
+
+
+def test_each_port_gets_its_own_io_thread(qapp):
+    manager = replay_manager({'COM1': [], 'COM2': []})
+    try:
+        com1 = manager.open_port(settings('COM1'))
+        com2 = manager.open_port(settings('COM2'))
+        assert manager.open_port(settings('COM1')) is com1
+        assert sorted(manager.ports) == ['COM1', 'COM2']
+        assert manager.controller('COM2') is com2
+        threads = {com1.thread(), com2.thread()}
+        assert len(threads) == 2
+        assert QThread.currentThread() not in threads
+        assert all(thread.isRunning() for thread in threads)
+    finally:
+        manager.shutdown()
+
+
+def test_requests_are_sent_from_the_port_thread(qapp):
+    manager = replay_manager({
+        'COM1': [Exchange(b'/1QR\r', ((0.0, READY),))],
+        'COM2': [Exchange(b'/2QR\r', ((0.0, READY),))],
+    })
+    try:
+        com1 = manager.open_port(settings('COM1'))
+        com2 = manager.open_port(settings('COM2'))
+        writes1, writes2 = record_write_threads(com1), record_write_threads(com2)
+        replies = manager.run_parallel(
+            lambda: com1.request(b'/1QR\r', terminator=b'\n'),
+            lambda: com2.request(b'/2QR\r', terminator=b'\n'),
+        )
+        assert replies == [READY, READY]
+        assert writes1 == [com1.thread()]
+        assert writes2 == [com2.thread()]
+        assert com1.serial.summary()['matched'] == com2.serial.summary()['matched'] == 1
+    finally:
+        manager.shutdown()
+
+
+def test_close_port_stops_thread_and_unregisters_devices(qapp):
+    manager = replay_manager({'COM1': [], 'COM2': []})
+    closed = []
+    manager.port_closed.connect(closed.append)
+    try:
+        pump = manager.add_pump('pump', settings('COM1'))
+        valve = manager.add_valve('valve', settings('COM2'))
+        controller = pump.serial
+        thread = controller.thread()
+        manager.close_port('COM1')
+        assert closed == ['COM1']
+        assert thread.isFinished()
+        assert not controller.is_connected
+        assert manager.controller('COM1') is None
+        assert manager.ports == ['COM2']
+        assert 'pump' not in manager and manager['valve'] is valve
+        manager.close_port('COM1')  # 重复关闭无效果
+        assert closed == ['COM1']
+    finally:
+        manager.shutdown()
+    assert manager.ports == [] and manager.devices == {}
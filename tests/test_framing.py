@@ -0,0 +1,82 @@
+"""接收环形缓冲区和帧解码器"""
+import pytest
+
+from devices.framing import (AnyBytesDecoder, AsciiFrameDecoder, ByteRingBuffer,
+                             FixedLengthFrameDecoder)
+
+
+def wrapped(capacity=8, offset=5):
+    """起点位于 offset 的空缓冲区，写入的数据会跨越回绕点"""
+    buffer = ByteRingBuffer(capacity)
+    buffer.write(b'x' * offset)
+    buffer.discard(offset)
+    return buffer
+
+
+def test_write_and_take_across_wraparound():
+    buffer = wrapped()
+    buffer.write(b'abcdef')
+    assert buffer.capacity == 8 and len(buffer) == 6
+    assert buffer.peek(6) == b'abcdef'
+    assert buffer.take(4) == b'abcd'
+    assert buffer.take(10) == b'ef'
+    assert not buffer
+
+
+def test_grows_and_keeps_order():
+    buffer = wrapped(capacity=4, offset=3)
+    buffer.write(b'0123456789')
+    assert buffer.capacity == 16
+    assert buffer.take(10) == b'0123456789'
+
+
+@pytest.mark.parametrize('offset', range(8))
+def test_find_at_every_wrap_position(offset):
+    buffer = wrapped(capacity=8, offset=offset)
+    buffer.write(b'ab\r\ncd')
+    assert buffer.find(b'\r\n') == 2
+    assert buffer.find(b'cd') == 4
+    assert buffer.find(b'\r\n', 3) == -1
+    assert buffer.find(b'zz') == -1
+
+
+def test_index_out_of_range():
+    buffer = ByteRingBuffer(4)
+    buffer.write(b'ab')
+    assert buffer[1] == ord('b')
+    with pytest.raises(IndexError):
+        buffer[2]
+
+
+def test_ascii_decoder_waits_for_terminator_and_splits_frames():
+    buffer = ByteRingBuffer(16)
+    decoder = AsciiFrameDecoder(b'\n')
+    buffer.write(b'/0`\x03\r')
+    assert decoder.decode(buffer) is None
+    buffer.write(b'\n/0@\x03\r\n/0')
+    assert decoder.decode(buffer) == b'/0`\x03\r\n'
+    assert decoder.decode(buffer) == b'/0@\x03\r\n'
+    assert decoder.decode(buffer) is None
+    assert buffer.peek(2) == b'/0'
+
+
+def test_fixed_length_decoder_resyncs_on_start_byte():
+    buffer = ByteRingBuffer(8)
+    decoder = FixedLengthFrameDecoder(8, start_byte=0x03, address_offset=2)
+    buffer.write(b'\xff\xfe\x03\x55\x05\x00')
+    assert decoder.decode(buffer) is None
+    buffer.write(b'\x00\x00\x00\x53')
+    frame = decoder.decode(buffer)
+    assert frame == b'\x03\x55\x05\x00\x00\x00\x00\x53'
+    assert decoder.correlates and decoder.address_of(frame) == 5
+    assert not buffer
+
+
+def test_any_bytes_decoder_limits_frame_size():
+    buffer = ByteRingBuffer(8)
+    decoder = AnyBytesDecoder(max_size=3)
+    assert decoder.decode(buffer) is None
+    buffer.write(b'abcde')
+    assert decoder.decode(buffer) == b'abc'
+    assert decoder.decode(buffer) == b'de'
+    assert not decoder.correlates and decoder.address_of(b'de') is None
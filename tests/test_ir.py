@@ -0,0 +1,102 @@
+"""程序 IR、XML 加载和解释器"""
+import pytest
+
+from conftest import fixture_path
+from program import ir, xml_loader
+from program.interpreter import Interpreter
+
+
+class RecordingPump:
+    """记录调用的注射泵"""
+
+    def __init__(self):
+        self.calls = []
+        self.pump_address = '1'
+
+    def __getattr__(self, name):
+        def call(*args):
+            self.calls.append((name,) + args)
+            return True
+        return call
+
+
+class ConnectedSerial:
+    is_connected = True
+
+
+def test_load_fixture_programs():
+    program = xml_loader.load_program_file(fixture_path('1.xml'))
+    assert len(program.ops) == 1
+    repeat = program.ops[0]
+    assert isinstance(repeat, ir.Repeat) and repeat.times == 2
+    assert [type(op) for op in repeat.body] == [
+        ir.InitPump, ir.SetVolumeRange, ir.SetTotalSteps, ir.SwitchInput, ir.SetSpeed,
+        ir.Aspirate, ir.Delay, ir.StopPump, ir.CloseSerial]
+    assert repeat.body[0].address == '2'
+    assert repeat.body[0].serial_config['baudrate'] == 115200
+
+    valve = xml_loader.load_program_file(fixture_path('3.xml'))
+    assert [type(op) for op in valve.ops] == [ir.InitValve, ir.Rotate]
+    assert valve.ops[0].address == 1 and valve.ops[1].position == 2
+
+
+def test_saved_programs_get_positional_block_ids():
+    program = xml_loader.load_program_file(fixture_path('2.xml'))
+    assert [op.block_id for op in program.walk()] == [f"#{n}" for n in range(1, 10)]
+
+
+def test_unsupported_block_is_rejected():
+    xml_text = '<xml><block type="controls_if" id="a"></block></xml>'
+    with pytest.raises(ValueError):
+        xml_loader.load_program(xml_text)
+
+
+def test_walk_visits_loop_bodies_in_order():
+    program = ir.Program([ir.Delay(seconds=1),
+                          ir.Repeat(times=2, body=(ir.Aspirate(volume=1), ir.Dispense(volume=1))),
+                          ir.StopPump()])
+    assert [type(op) for op in program.walk()] == [
+        ir.Delay, ir.Repeat, ir.Aspirate, ir.Dispense, ir.StopPump]
+
+
+def test_validate_reports_errors():
+    program = ir.Program([ir.Rotate(position=13), ir.Aspirate(volume=-1), ir.SetSpeed(speed=10000)])
+    errors = program.validate()
+    assert len(errors) == 4  # 孔位无效、阀未初始化、体积为负、速度超出范围
+    assert not xml_loader.load_program_file(fixture_path('1.xml')).validate()
+
+
+def test_interpreter_dispatches_ops_and_expands_repeats():
+    pump = RecordingPump()
+    interpreter = Interpreter(ConnectedSerial(), pump=pump)
+    program = ir.Program([
+        ir.SetSpeed(speed=500),
+        ir.Repeat(times=3, body=(ir.Aspirate(volume=1.5), ir.Dispense(volume=1.5))),
+    ])
+    interpreter.run(program)
+    assert pump.calls == [('set_speed', 500)] + [('aspirate', 1.5), ('dispense', 1.5)] * 3
+
+
+def test_interpreter_stops_before_next_op():
+    pump = RecordingPump()
+    interpreter = Interpreter(ConnectedSerial(), pump=pump)
+    interpreter.stop_event.set()
+    with pytest.raises(InterruptedError):
+        interpreter.run(ir.Program([ir.SwitchInput()]))
+    assert pump.calls == []
+
+
+def test_interpreter_passes_drift_free_to_timeline():
+    assert not Interpreter(ConnectedSerial(), pump=RecordingPump()).timeline.drift_free
+    assert Interpreter(ConnectedSerial(), pump=RecordingPump(), drift_free=True).timeline.drift_free
+
+
+def test_interpreter_lends_its_stop_event_to_the_pump():
+    pump = RecordingPump()
+    own_event = pump.stop_event = object()
+    interpreter = Interpreter(ConnectedSerial(), pump=pump)
+    seen = []
+    interpreter._handlers[ir.WaitIdle] = lambda op: seen.append(pump.stop_event)
+    interpreter.run(ir.Program([ir.WaitIdle()]))
+    assert seen == [interpreter.stop_event]
+    assert pump.stop_event is own_event
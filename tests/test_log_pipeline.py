@@ -0,0 +1,71 @@
+"""异步日志管道和延迟格式化"""
+import ast
+import glob
+import logging
+import os
+import threading
+
+from conftest import SRC_DIR
+from devices.hex_bytes import HexBytes
+from log_pipeline import setup_logging, stop_logging
+
+
+class CountingBytes(HexBytes):
+    """记录格式化次数的 HexBytes"""
+
+    formatted = 0
+
+    def __str__(self):
+        type(self).formatted += 1
+        return super().__str__()
+
+
+class ThreadRecorder(logging.Handler):
+    """记录消息和格式化所在线程的输出端"""
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+        self.threads = []
+
+    def emit(self, record):
+        self.threads.append(threading.current_thread())
+        self.messages.append(record.getMessage())
+
+
+def test_hex_bytes_format():
+    assert str(HexBytes(b'\x03\x55\x0a')) == '0x03 0x55 0x0A'
+
+
+def test_disabled_records_are_never_formatted():
+    CountingBytes.formatted = 0
+    logger = logging.getLogger('test.disabled')
+    logger.setLevel(logging.INFO)
+    logger.debug("frame %s", CountingBytes(b'\x01'))
+    assert CountingBytes.formatted == 0
+
+
+def test_records_are_formatted_by_the_listener_thread():
+    recorder = ThreadRecorder()
+    setup_logging(recorder, level=logging.DEBUG)
+    try:
+        logging.getLogger('test.pipeline').info("发送指令: %s", HexBytes(b'\x03\x55'))
+    finally:
+        stop_logging()
+    assert recorder.messages == ['发送指令: 0x03 0x55']
+    assert recorder.threads[0] is not threading.current_thread()
+
+
+def test_device_and_program_code_logs_lazily():
+    """设备和程序执行路径上的日志不在调用处用 f-string 拼接消息"""
+    eager = []
+    for package in ('devices', 'program'):
+        for path in glob.glob(os.path.join(SRC_DIR, package, '*.py')):
+            with open(path, encoding='utf-8') as f:
+                tree = ast.parse(f.read())
+            for node in ast.walk(tree):
+                if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                        and isinstance(node.func.value, ast.Name) and node.func.value.id == 'logger'
+                        and node.args and isinstance(node.args[0], ast.JoinedStr)):
+                    eager.append(f"{os.path.relpath(path, SRC_DIR)}:{node.lineno}")
+    assert eager == []
@@ -0,0 +1,95 @@
+"""日志模型：环形缓冲、合并插入和级别过滤"""
+import logging
+import time
+
+import pytest
+
+from components.log_viewer import LevelRole, LogFilterModel, LogModel
+
+
+class RowRecorder:
+    """记录模型发出的插入和删除信号，并检查信号与行数一致"""
+
+    def __init__(self, model):
+        self.model = model
+        self.rows = model.rowCount()
+        self.inserts = []
+        self.removes = []
+        model.rowsAboutToBeRemoved.connect(self._about_to_remove)
+        model.rowsRemoved.connect(self._removed)
+        model.rowsInserted.connect(self._inserted)
+
+    def _about_to_remove(self, parent, first, last):
+        assert self.model.rowCount() == self.rows
+        assert 0 <= first <= last < self.rows
+
+    def _removed(self, parent, first, last):
+        self.rows -= last - first + 1
+        self.removes.append((first, last))
+        assert self.model.rowCount() == self.rows
+
+    def _inserted(self, parent, first, last):
+        assert first == self.rows
+        self.rows += last - first + 1
+        self.inserts.append((first, last))
+        assert self.model.rowCount() == self.rows
+
+
+def texts(model):
+    return [model.index(row).data().split('] ', 1)[1] for row in range(model.rowCount())]
+
+
+@pytest.fixture
+def model(qapp):
+    return LogModel(capacity=5, flush_interval=33)
+
+
+def test_ring_buffer_drops_oldest_rows(model):
+    recorder = RowRecorder(model)
+    for i in range(3):
+        model.append(f"a{i}")
+    model.flush()
+    for i in range(4):
+        model.append(f"b{i}")
+    model.flush()
+    assert texts(model) == ['a2', 'b0', 'b1', 'b2', 'b3']
+    assert recorder.removes == [(0, 1)]
+    assert recorder.inserts == [(0, 2), (1, 4)]
+    assert recorder.rows == model.rowCount() == 5
+
+
+def test_burst_larger_than_capacity_keeps_newest(model):
+    recorder = RowRecorder(model)
+    model.append("old")
+    model.flush()
+    for i in range(12):
+        model.append(f"m{i}")
+    model.flush()
+    assert texts(model) == [f"m{i}" for i in range(7, 12)]
+    assert recorder.rows == 5
+
+
+def test_burst_within_flush_interval_is_one_insert(qapp, model):
+    recorder = RowRecorder(model)
+    for i in range(4):
+        model.append(f"m{i}")
+    assert model.rowCount() == 0  # 定时器到期前不插入
+    deadline = time.monotonic() + 1.0
+    while not recorder.inserts and time.monotonic() < deadline:
+        qapp.processEvents()
+        time.sleep(0.005)
+    assert recorder.inserts == [(0, 3)]
+
+
+def test_level_filter_hides_lower_severity_rows(model):
+    for level in ("DEBUG", "INFO", "RECV", "WARNING", "ERROR"):
+        model.append(level.lower(), level)
+    model.flush()
+    proxy = LogFilterModel()
+    proxy.setSourceModel(model)
+    assert proxy.rowCount() == 5
+    proxy.set_min_level(logging.WARNING)
+    assert [proxy.index(row, 0).data(LevelRole) for row in range(proxy.rowCount())] == \
+        [logging.WARNING, logging.ERROR]
+    proxy.set_min_level(logging.INFO)
+    assert proxy.rowCount() == 4
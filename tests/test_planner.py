@@ -0,0 +1,92 @@
+"""执行前的耗时和体积估算"""
+import pytest
+
+from conftest import fixture_path
+from program import compiler, ir, xml_loader
+from program.planner import DeviceTiming, Planner
+
+ROUND_TRIP = DeviceTiming().round_trip
+
+
+def plan_fixture(name, **kwargs):
+    with open(fixture_path(name), encoding='utf-8') as f:
+        program = compiler.compile_program(xml_loader.load_program(f.read()))
+    return Planner(**kwargs).plan(program)
+
+
+def test_fixture_1_delay_runs_after_the_commands():
+    # 每次循环：4 条命令后开始吸液（500 Hz，15 ml = 3600 步 = 7.2 秒），延时 3 秒后停止
+    plan = plan_fixture('1.xml')
+    per_iteration = (3 + ROUND_TRIP) / 7.2 * 15
+    assert plan.aspirated == pytest.approx(2 * per_iteration)
+    assert plan.duration == pytest.approx(2 * (5 * ROUND_TRIP + 3))
+    assert plan.commands == 10
+
+
+def test_fixture_2_uses_default_speed():
+    # 默认 1000 Hz：15 ml = 3.6 秒；吸液后还有设置速度、延时 1 秒和停止
+    plan = plan_fixture('2.xml')
+    assert plan.aspirated == pytest.approx((1 + 2 * ROUND_TRIP) / 3.6 * 15)
+    assert any('1000 Hz' in warning for warning in plan.warnings)
+
+
+def test_await_completion_waits_for_each_motion():
+    plan = plan_fixture('1.xml', await_completion=True)
+    assert plan.aspirated == pytest.approx(30)
+    assert plan.duration > 2 * (5.0 + 7.2 + 3)
+
+
+@pytest.mark.parametrize('name', ['1.xml', '2.xml', '3.xml'])
+@pytest.mark.parametrize('await_completion', [False, True])
+def test_critical_path_adds_up_to_duration(name, await_completion):
+    plan = plan_fixture(name, await_completion=await_completion)
+    assert sum(step.seconds for step in plan.steps.values()) == pytest.approx(plan.duration)
+
+
+def test_commands_do_not_wait_for_the_pump():
+    program = ir.Program([ir.SetSpeed(speed=1000), ir.Aspirate(volume=25),
+                          ir.SwitchOutput(), ir.Delay(seconds=1)])
+    plan = Planner().plan(program)
+    # 程序在 1 秒多后结束，泵还要运动到 6 秒，总耗时包括泵剩余的动作
+    assert plan.duration == pytest.approx(2 * ROUND_TRIP + 6.0)
+    assert plan.steps['Delay'].seconds == pytest.approx(1.0)
+
+
+def test_wait_idle_waits_for_the_pump():
+    program = ir.Program([ir.SetSpeed(speed=1000), ir.Aspirate(volume=25), ir.WaitIdle()])
+    plan = Planner().plan(program)
+    assert plan.duration >= 2 * ROUND_TRIP + 6.0
+    assert plan.steps['Aspirate'].seconds == pytest.approx(ROUND_TRIP + 6.0)
+
+
+def test_rotate_takes_shortest_direction():
+    program = ir.Program([ir.Rotate(position=1), ir.Rotate(position=12)])
+    timing = DeviceTiming(valve_step=1.0, round_trip=0.0)
+    plan = Planner(timing).plan(program)
+    assert plan.duration == pytest.approx(6 + 1)
+
+
+def test_aspirate_is_an_absolute_move():
+    # A15 两次：第二次柱塞已在 15 ml，不再移动，也不超过量程
+    program = ir.Program([ir.SetSpeed(speed=1000), ir.Aspirate(volume=15), ir.WaitIdle(),
+                          ir.Aspirate(volume=15), ir.WaitIdle()])
+    plan = Planner().plan(program)
+    assert plan.aspirated == pytest.approx(15)
+    assert not any('超过量程' in warning for warning in plan.warnings)
+
+
+def test_aspirate_below_current_volume_moves_down():
+    program = ir.Program([ir.Aspirate(volume=20), ir.WaitIdle(), ir.Aspirate(volume=5)])
+    plan = Planner().plan(program)
+    assert plan.aspirated == pytest.approx(20)
+    assert plan.dispensed == pytest.approx(15)
+
+
+def test_firmware_loop_volumes_follow_absolute_moves():
+    body = (ir.Aspirate(volume=10), ir.Dispense(volume=4))
+    program = ir.Program([ir.PumpLoop(times=3, body=body)])
+    plan = Planner().plan(program)
+    # 第一次从 0 吸到 10，之后每次从 6 吸到 10
+    assert plan.aspirated == pytest.approx(10 + 4 + 4)
+    assert plan.dispensed == pytest.approx(12)
+    assert not any('超过量程' in warning for warning in plan.warnings)
@@ -0,0 +1,99 @@
+"""串口发现服务"""
+import threading
+import time
+
+import pytest
+
+from devices import port_discovery
+from devices.port_discovery import PortDiscovery
+
+
+def process_events_until(qapp, condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        qapp.processEvents()
+        time.sleep(0.005)
+    return condition()
+
+
+class EnumerationLog(list):
+    """每次枚举所在的线程；available 为下次枚举返回的串口"""
+    available: list
+
+
+@pytest.fixture
+def enumerations(qapp, monkeypatch):
+    """替换串口枚举，记录每次枚举所在的线程"""
+    calls = EnumerationLog()
+    available = ['/dev/ttyUSB0']
+
+    def enumerate_ports():
+        calls.append(threading.current_thread())
+        return list(available)
+    calls.available = available
+    monkeypatch.setattr(port_discovery, 'enumerate_ports', enumerate_ports)
+    monkeypatch.setattr(PortDiscovery, '_instance', None)
+    return calls
+
+
+def test_refresh_async_enumerates_off_the_calling_thread(qapp, enumerations):
+    discovery = PortDiscovery()
+    received = []
+    discovery.ports_changed.connect(received.append)
+    discovery.refresh_async().join(2.0)
+    assert process_events_until(qapp, lambda: received)
+    assert received == [['/dev/ttyUSB0']]
+    assert enumerations and enumerations[0] is not threading.current_thread()
+    assert discovery.cached_ports() == ['/dev/ttyUSB0']
+
+
+def test_first_refresh_is_reported_even_without_ports(qapp, monkeypatch):
+    monkeypatch.setattr(port_discovery, 'enumerate_ports', lambda: [])
+    discovery = PortDiscovery()
+    received = []
+    discovery.ports_changed.connect(received.append)
+    discovery.refresh()
+    discovery.refresh()
+    assert received == [[]]
+
+
+def test_cached_ports_does_not_enumerate(qapp, enumerations):
+    assert PortDiscovery().cached_ports() == []
+    assert enumerations == []
+
+
+def test_ttl_fallback_enumerates_again_only_after_ttl(qapp, enumerations, monkeypatch, tmp_path):
+    monkeypatch.setattr(PortDiscovery, 'DEV_DIR', str(tmp_path / 'missing'))
+    now = [100.0]
+    monkeypatch.setattr(port_discovery.time, 'monotonic', lambda: now[0])
+    discovery = PortDiscovery(ttl=2.0)
+    assert not discovery.is_watching
+    assert discovery.ports() == ['/dev/ttyUSB0']
+    now[0] += 1.9
+    discovery.ports()
+    assert len(enumerations) == 1
+    enumerations.available.append('/dev/ttyUSB1')
+    now[0] += 0.2
+    assert discovery.ports() == ['/dev/ttyUSB0', '/dev/ttyUSB1']
+    assert len(enumerations) == 2
+
+
+def test_dev_change_invalidates_cache_and_reports_ports(qapp, enumerations, monkeypatch, tmp_path):
+    monkeypatch.setattr(PortDiscovery, 'DEV_DIR', str(tmp_path))
+    monkeypatch.setattr(PortDiscovery, 'DEBOUNCE_MS', 10)
+    discovery = PortDiscovery(ttl=0.0)
+    if not discovery.is_watching:
+        pytest.skip('当前平台不能监视目录')
+    received = []
+    discovery.ports_changed.connect(received.append)
+    assert discovery.ports() == ['/dev/ttyUSB0']
+    time.sleep(0.01)
+    discovery.ports()  # 监视目录时缓存不过期
+    assert len(enumerations) == 1
+
+    enumerations.available.append('/dev/ttyUSB1')
+    (tmp_path / 'ttyUSB1').touch()  # 模拟插入设备
+    assert process_events_until(qapp, lambda: len(received) == 2)
+    assert received[-1] == ['/dev/ttyUSB0', '/dev/ttyUSB1']
+    assert discovery.cached_ports() == ['/dev/ttyUSB0', '/dev/ttyUSB1']
+    assert len(enumerations) == 2
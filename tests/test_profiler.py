@@ -0,0 +1,96 @@
+"""按块统计执行耗时"""
+import csv
+
+import pytest
+
+from conftest import replay_controller
+from devices.pump_controller import PumpController
+from devices.replay import Exchange
+from devices.retry_policy import RetryPolicy
+from devices.serial_controller import IOStats
+from program import profiler as profiler_module
+from program.block_trace import BlockTracer
+from program.profiler import CSV_FIELDS, BlockProfiler
+
+
+class FakeController:
+    def __init__(self):
+        self.stats = IOStats()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(profiler_module.time, 'perf_counter', lambda: now[0])
+    return now
+
+
+def test_time_is_attributed_to_the_block_being_executed(clock):
+    controller = FakeController()
+    tracer = BlockTracer()
+    profiler = BlockProfiler(lambda: [controller], labels={'body': 'Aspirate'})
+    profiler.attach(tracer)
+    # 循环块本身只包含开始循环的时间，循环体中的块各自计时
+    for block_id, seconds, requests in (('loop', 0.1, 0), ('body', 1.0, 2), ('body', 1.5, 1),
+                                        ('end', 0.2, 0)):
+        tracer.enter(block_id)
+        clock[0] += seconds
+        controller.stats.requests += requests
+    profiler.detach(tracer)
+    assert {b: (s.count, s.wall, s.requests) for b, s in profiler.blocks.items()} == {
+        'loop': (1, pytest.approx(0.1), 0),
+        'body': (2, pytest.approx(2.5), 3),
+        'end': (1, pytest.approx(0.2), 0),
+    }
+    assert profiler.blocks['body'].label == 'Aspirate'
+    assert profiler.total_wall == pytest.approx(2.8)
+    assert [s.block_id for s in profiler.ranked()] == ['body', 'end', 'loop']
+
+
+def test_shared_controller_is_counted_once(clock):
+    controller = FakeController()
+    tracer = BlockTracer()
+    profiler = BlockProfiler(lambda: [controller, controller, None])
+    profiler.attach(tracer)
+    tracer.enter('a')
+    controller.stats.bytes_sent += 10
+    profiler.detach(tracer)
+    assert profiler.blocks['a'].bytes_sent == 10
+
+
+def test_csv_output(clock, tmp_path):
+    controller = FakeController()
+    tracer = BlockTracer()
+    profiler = BlockProfiler(lambda: [controller])
+    profiler.attach(tracer)
+    tracer.enter('slow')
+    clock[0] += 3.0
+    controller.stats.timeouts += 1
+    controller.stats.retries += 1
+    tracer.enter('fast')
+    clock[0] += 1.0
+    profiler.detach(tracer)
+    path = tmp_path / 'profile.csv'
+    profiler.write_csv(str(path))
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert tuple(rows[0]) == CSV_FIELDS
+    assert [row['block_id'] for row in rows] == ['slow', 'fast']
+    assert rows[0]['share'] == '0.7500' and rows[0]['wall_s'] == '3.000000'
+    assert (rows[0]['timeouts'], rows[0]['retries']) == ('1', '1')
+    assert (rows[1]['timeouts'], rows[1]['retries']) == ('0', '0')
+
+
+def test_device_retries_are_counted_per_block(qapp):
+    frame = b'/1A2400R\r'
+    controller = replay_controller([Exchange(frame, ()), Exchange(frame, ((0.0, b'/0`\x03\r\n'),))])
+    pump = PumpController(controller)
+    pump.retry_policy = RetryPolicy(initial_rto=0.05, min_rto=0.05, deadline=1.0)
+    tracer = BlockTracer()
+    profiler = BlockProfiler(lambda: [controller])
+    profiler.attach(tracer)
+    tracer.enter('aspirate')
+    assert pump.aspirate(10)
+    profiler.detach(tracer)
+    stats = profiler.blocks['aspirate']
+    assert (stats.requests, stats.timeouts, stats.retries) == (1, 1, 1)
@@ -0,0 +1,157 @@
+"""注射泵命令帧、批处理和状态轮询"""
+import threading
+import time
+
+import pytest
+
+from conftest import replay_controller
+from devices.pump_controller import PumpController
+from devices.replay import Exchange
+from devices.retry_policy import RetryPolicy
+
+READY = b'/0`\x03\r\n'  # 状态字节 0x60：空闲、无错误
+BUSY = b'/0@\x03\r\n'  # 状态字节 0x40：忙
+
+
+def reply(data, delay=0.0):
+    return ((delay, data),)
+
+
+@pytest.fixture
+def pump(qapp):
+    def make(*exchanges):
+        controller = replay_controller(exchanges)
+        return PumpController(controller), controller.serial
+    return make
+
+
+def test_commands_and_queries_share_framing():
+    assert PumpController.command_frame('1', 'Z') == '/1ZR\r'
+    assert PumpController.command_frame('2', 'Q', execute=False) == '/2Q\r'
+
+
+def test_send_command_uses_command_frame(pump):
+    controller, port = pump(Exchange(b'/1A2400R\r', reply(READY)))
+    assert controller.aspirate(10)
+    assert port.summary()['matched'] == 1 and port.summary()['unexpected'] == 0
+
+
+def test_query_status(pump):
+    controller, _ = pump(Exchange(b'/1Q\r', reply(BUSY)))
+    assert controller.query_status() == 0x40
+
+
+def test_wait_until_idle_polls_until_ready(pump):
+    controller, port = pump(Exchange(b'/1Q\r', reply(BUSY)), Exchange(b'/1Q\r', reply(READY)))
+    assert controller.wait_until_idle(timeout=1.0, poll_interval=0.01)
+    assert port.summary()['matched'] == 2
+
+
+def test_wait_until_idle_passes_poll_interval_to_status_timeout(pump, monkeypatch):
+    controller, _ = pump()
+    timeouts = []
+
+    def query_status(timeout=None):
+        timeouts.append(timeout)
+        return 0x60
+    monkeypatch.setattr(controller, 'query_status', query_status)
+    controller.poll_interval = 0.05
+    assert controller.wait_until_idle(poll_interval=0.2)
+    assert timeouts == [PumpController.status_timeout(0.2)] == [2.0]
+
+
+def test_wait_until_idle_reports_device_error(pump):
+    controller, _ = pump(Exchange(b'/1Q\r', reply(b'/0b\x03\r\n')))  # 错误码 2：无效指令
+    assert not controller.wait_until_idle(timeout=1.0, poll_interval=0.01)
+
+
+def test_wait_until_idle_returns_promptly_on_stop(pump, monkeypatch):
+    controller, _ = pump()
+    monkeypatch.setattr(controller, 'query_status', lambda timeout=None: 0x40)  # 一直忙
+    timer = threading.Timer(0.05, controller.stop_event.set)
+    timer.start()
+    started = time.monotonic()
+    with pytest.raises(InterruptedError):
+        controller.wait_until_idle(timeout=30.0, poll_interval=5.0)
+    assert time.monotonic() - started < 1.0
+    timer.join()
+
+
+def test_batch_merges_commands_into_one_frame(pump):
+    controller, port = pump(Exchange(b'/1IV0500A2400OP2400R\r', reply(READY)))
+    with controller.batch() as batch:
+        batch.switch_to_input().set_speed(500).aspirate(10).switch_to_output().dispense(10)
+    assert batch.result
+    assert port.summary()['matched'] == 1
+
+
+def test_batch_loop_and_device_delay_commands(pump):
+    controller, _ = pump()
+    batch = controller.batch().aspirate(1).delay(45)
+    assert batch.command(times=3) == 'gA240M30000M15000G3'
+    assert batch.frame_length(times=3) == len('/1gA240M30000M15000G3R\r')
+    with pytest.raises(ValueError):
+        batch.command(times=PumpController.MAX_LOOP_COUNT + 1)
+
+
+def test_batch_rejects_commands_longer_than_device_buffer(pump):
+    controller, _ = pump()
+    batch = controller.batch()
+    with pytest.raises(ValueError):
+        for _ in range(100):
+            batch.aspirate(1)
+    assert batch.frame_length() <= PumpController.MAX_COMMAND_LENGTH
+
+
+def test_batch_zero_delay_adds_no_command(pump):
+    controller, port = pump()
+    batch = controller.batch().delay(0)
+    assert len(batch) == 0 and batch.commands == []
+    assert batch.execute()
+    assert port.writes == 0
+
+
+def test_batch_is_cleared_when_execute_fails(pump, monkeypatch):
+    controller, _ = pump()
+
+    def send_command(command):
+        raise InterruptedError("程序已停止")  # 例如等待空闲时被停止
+    monkeypatch.setattr(controller, 'send_command', send_command)
+    batch = controller.batch().switch_to_input().aspirate(1)
+    with pytest.raises(InterruptedError):
+        batch.execute()
+    assert len(batch) == 0
+
+
+def fast_policy():
+    return RetryPolicy(initial_rto=0.05, min_rto=0.05, max_rto=0.2, deadline=1.0)
+
+
+def test_lost_reply_is_resent_for_absolute_commands(pump):
+    controller, port = pump(Exchange(b'/1A2400R\r', ()), Exchange(b'/1A2400R\r', reply(READY)))
+    controller.retry_policy = fast_policy()
+    assert controller.aspirate(10)
+    assert port.summary()['matched'] == 2
+
+
+def test_relative_commands_are_not_resent(pump):
+    controller, port = pump(Exchange(b'/1P2400R\r', ()), Exchange(b'/1P2400R\r', reply(READY)))
+    controller.retry_policy = fast_policy()
+    assert not controller.dispense(10)
+    assert port.summary()['matched'] == 1
+
+
+def test_dead_pump_fails_fast_once_rtt_is_known(pump):
+    controller, _ = pump(Exchange(b'/1ZR\r', reply(READY)),
+                         *[Exchange(b'/1A2400R\r', ())] * 3)
+    assert controller.initialize()
+    assert controller.retry_policy.srtt is not None
+    started = time.monotonic()
+    assert not controller.aspirate(10)
+    assert time.monotonic() - started < 1.5  # 0.1 + 0.2 + 0.4 秒，而不是固定的 3 秒
+
+
+def test_resend_safe():
+    assert PumpController.resend_safe('IV0500A2400')
+    assert not PumpController.resend_safe('P2400')
+    assert not PumpController.resend_safe('gA0A2400G3')
@@ -0,0 +1,76 @@
+"""抓包文件和会话回放"""
+import time
+
+import pytest
+
+from conftest import replay_controller
+from devices import capture
+from devices.capture import RX, TX, CaptureReader, CaptureWriter
+from devices.replay import Exchange, ReplayMismatch, load_sessions
+
+READY = b'/0`\x03\r\n'
+
+
+@pytest.fixture
+def capture_file(tmp_path):
+    path = str(tmp_path / 'run.cap')
+    with CaptureWriter(path) as writer:
+        writer.record(RX, 'COM1', None, b'hello\r\n')  # 第一次请求之前的主动上报
+        writer.record(TX, 'COM1', None, b'/1ZR\r')
+        writer.record(RX, 'COM1', None, READY)
+        writer.record(TX, 'COM2', 1, b'\x03\x55\x01')
+        writer.record(TX, 'COM1', None, b'/1ZR\r')
+        writer.record(TX, 'COM1', None, b'/1ZR\r')  # 没有应答，重发
+        writer.record(RX, 'COM2', 1, b'\x03\x55\x01\x00')
+    return path
+
+
+def test_capture_round_trip(capture_file):
+    with CaptureReader(capture_file) as reader:
+        frames = [(f.direction, f.port, f.address, bytes(f.data)) for f in reader]
+        assert len(capture.latencies(reader)) == 2
+        assert capture.retries(reader) == 1
+    assert frames[0] == (RX, 'COM1', None, b'hello\r\n')
+    assert frames[3] == (TX, 'COM2', 1, b'\x03\x55\x01')
+
+
+def test_percentiles_nearest_rank():
+    assert capture.percentiles([0.3, 0.1, 0.2, 0.4], (50, 99)) == {50: 0.2, 99: 0.4}
+    assert capture.percentiles([]) == {}
+
+
+def test_load_sessions_groups_replies_by_port(capture_file):
+    sessions = load_sessions(capture_file)
+    com1 = sessions['COM1']
+    assert [exchange.request for exchange in com1] == [None] + [b'/1ZR\r'] * 3
+    assert [data for _, data in com1[1].replies] == [READY]
+    assert com1[2].replies == ()
+    assert [data for _, data in sessions['COM2'][0].replies] == [b'\x03\x55\x01\x00']
+
+
+def test_replay_answers_recorded_requests(qapp):
+    controller = replay_controller([Exchange(b'/1ZR\r', ((0.0, READY),))])
+    assert controller.request(b'/1ZR\r', terminator=b'\n') == READY
+    assert controller.serial.summary()['matched'] == 1
+
+
+def test_unrecorded_request_fails_at_once(qapp):
+    controller = replay_controller([Exchange(b'/1ZR\r', ((0.0, READY),))])
+    mismatches = []
+    controller.mismatched.connect(mismatches.append)
+    started = time.monotonic()
+    with pytest.raises(ReplayMismatch):
+        controller.request(b'/2ZR\r', terminator=b'\n', timeout=3.0)
+    assert time.monotonic() - started < 0.5
+    assert mismatches == [b'/2ZR\r']
+    summary = controller.serial.summary()
+    assert summary['unexpected'] == 1 and summary['first_mismatch'] == b'/2ZR\r'
+    # 之后录制中的请求仍然可以回放
+    assert controller.request(b'/1ZR\r', terminator=b'\n') == READY
+
+
+def test_skipped_requests_are_counted(qapp):
+    controller = replay_controller([Exchange(b'A', ((0.0, b'a\n'),)), Exchange(b'B', ((0.0, b'b\n'),))])
+    assert controller.request(b'B', terminator=b'\n') == b'b\n'
+    summary = controller.serial.summary()
+    assert summary['skipped'] == 1 and summary['remaining'] == 0
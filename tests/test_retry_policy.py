@@ -0,0 +1,74 @@
+"""按往返时间自适应的超时与重试策略"""
+import pytest
+
+from devices.retry_policy import RetryPolicy
+from devices.valve_controller import ValveController
+
+
+def test_initial_rto_before_samples():
+    assert RetryPolicy(initial_rto=2.0).rto == 2.0
+
+
+def test_first_sample_sets_srtt_and_rttvar():
+    policy = RetryPolicy(min_rto=0.0)
+    policy.observe(0.1)
+    assert policy.srtt == pytest.approx(0.1)
+    assert policy.rttvar == pytest.approx(0.05)
+    assert policy.rto == pytest.approx(0.1 + 4 * 0.05)
+
+
+def test_later_samples_are_smoothed():
+    policy = RetryPolicy(min_rto=0.0)
+    policy.observe(0.1)
+    policy.observe(0.2)
+    assert policy.rttvar == pytest.approx(0.75 * 0.05 + 0.25 * 0.1)
+    assert policy.srtt == pytest.approx(0.875 * 0.1 + 0.125 * 0.2)
+
+
+def test_rto_is_clamped():
+    policy = RetryPolicy(min_rto=0.1, max_rto=1.0)
+    policy.observe(0.001)
+    assert policy.rto == 0.1
+    policy.observe(10.0)
+    assert policy.rto == 1.0
+
+
+def test_timeout_backs_off_up_to_max():
+    policy = RetryPolicy(initial_rto=0.5, max_rto=1.5)
+    policy.on_timeout()
+    assert policy.rto == 1.0
+    policy.on_timeout()
+    assert policy.rto == 1.5
+
+
+def test_timeouts_follow_backoff():
+    policy = RetryPolicy(initial_rto=0.1, deadline=10.0)
+    timeouts = []
+    for timeout in policy.timeouts(3):
+        timeouts.append(timeout)
+        policy.on_timeout()
+    assert timeouts == pytest.approx([0.1, 0.2, 0.4])
+
+
+def test_timeouts_stop_at_deadline(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr('devices.retry_policy.time.monotonic', lambda: now[0])
+    policy = RetryPolicy(initial_rto=2.0, max_rto=4.0, deadline=5.0)
+    timeouts = []
+    for timeout in policy.timeouts(5):
+        timeouts.append(timeout)
+        now[0] += timeout
+        policy.on_timeout()
+    assert timeouts == [2.0, 3.0]
+
+
+def test_short_rotations_do_not_shrink_rotate_timeout():
+    valve = ValveController(serial_controller=None)
+    rotate = valve._retry_policy(ValveController.ROTATE_CMD)
+    status = valve._retry_policy(ValveController.STATUS_CMD)
+    for _ in range(20):
+        rotate.observe(0.05)  # 相邻孔位的旋转很快返回
+        status.observe(0.01)
+    assert rotate.rto > ValveController.MAX_ROTATION_TIME
+    assert status.rto < 0.2  # 查询仍按往返时间自适应
+    assert valve._retry_policy(ValveController.ROTATE_CMD) is rotate
@@ -0,0 +1,121 @@
+"""串口控制器"""
+import time
+
+import pytest
+from PyQt5.QtCore import QThread
+
+from conftest import SERIAL_SETTINGS, replay_controller
+from devices import port_discovery
+from devices.framing import FixedLengthFrameDecoder
+from devices.port_discovery import PortDiscovery
+from devices.replay import Exchange, ReplaySerialController
+from devices.serial_controller import SerialController
+from devices.valve_controller import ValveController
+
+READY = b'/0`\x03\r\n'
+BUSY = b'/0@\x03\r\n'
+VALVE_DECODER = FixedLengthFrameDecoder(8, ValveController.START_BYTE, ValveController.ADDRESS_OFFSET)
+
+
+def valve_reply(address):
+    return bytes([0x03, 0x55, address, 0, 0, 0, 0, 0])
+
+
+def test_construction_does_not_enumerate_ports(qapp, monkeypatch):
+    calls = []
+    monkeypatch.setattr(port_discovery, 'enumerate_ports', lambda: calls.append(1) or [])
+    monkeypatch.setattr(PortDiscovery, '_instance', None)
+    SerialController()
+    assert calls == []
+
+
+def process_events_for(qapp, seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        qapp.processEvents()
+        time.sleep(0.005)
+
+
+def test_reply_split_across_chunks_is_reassembled(qapp):
+    controller = replay_controller(
+        [Exchange(b'/1QR\r', ((0.0, b'/0'), (0.02, b'`\x03'), (0.04, b'\r\n')))], realtime=True)
+    chunks = []
+    controller.serial.readyRead.connect(lambda: chunks.append(1))
+    assert controller.request(b'/1QR\r', terminator=b'\n', timeout=1) == READY
+    assert len(chunks) == 3
+    assert controller.stats.requests == 1 and controller.stats.timeouts == 0
+
+
+def test_timeout_resolves_future_with_error(qapp):
+    controller = replay_controller([Exchange(b'/1QR\r', ())])
+    future = controller.submit(b'/1QR\r', terminator=b'\n', timeout=0.05)
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        controller.wait(future)
+    assert time.monotonic() - started < 0.5
+    assert future.done() and controller.stats.timeouts == 1
+    assert not controller._bus
+
+
+def test_late_reply_is_not_matched_to_next_request(qapp):
+    controller = replay_controller([
+        Exchange(b'/1QR\r', ((0.06, BUSY),)),
+        Exchange(b'/1QR\r', ((0.0, READY),)),
+    ], realtime=True)
+    lines = []
+    controller.data_received.connect(lines.append)
+    with pytest.raises(TimeoutError):
+        controller.request(b'/1QR\r', terminator=b'\n', timeout=0.02)
+    process_events_for(qapp, 0.1)  # 迟到的应答在总线空闲时到达
+    assert controller.request(b'/1QR\r', terminator=b'\n', timeout=1) == READY
+    assert lines[0] == BUSY.decode().strip()
+
+
+def test_late_addressed_reply_during_next_request_is_dropped(qapp):
+    frames = {address: ValveController.status_frame(address) for address in (1, 2)}
+    controller = replay_controller([
+        Exchange(frames[1], ((0.05, valve_reply(1)),)),
+        Exchange(frames[2], ((0.08, valve_reply(2)),)),
+    ], realtime=True)
+    with pytest.raises(TimeoutError):
+        controller.request(frames[1], decoder=VALVE_DECODER, address=1, timeout=0.02)
+    # 地址 1 的应答在等待地址 2 的应答期间到达
+    reply = controller.request(frames[2], decoder=VALVE_DECODER, address=2, timeout=1)
+    assert reply == valve_reply(2)
+    assert controller.stats.requests == 1 and controller.stats.timeouts == 1
+
+
+@pytest.fixture
+def worker_controller(qapp):
+    """在独立 I/O 线程中收发的串口控制器"""
+    thread = QThread()
+    controller = ReplaySerialController('COM1', [])
+    controller.moveToThread(thread)
+    thread.start()
+    yield controller, thread
+    controller.disconnect()
+    thread.quit()
+    thread.wait()
+
+
+def test_call_in_thread_runs_on_owner_thread(worker_controller):
+    controller, thread = worker_controller
+    assert controller._call_in_thread(QThread.currentThread) is thread
+    assert controller._call_in_thread(lambda a, b: a + b, 2, 3) == 5
+    # 公共接口从其他线程调用时同样转到串口线程
+    assert controller.connect(dict(SERIAL_SETTINGS, port='COM1'))
+    assert controller.is_connected
+
+
+def test_call_in_thread_propagates_exceptions(worker_controller):
+    controller, thread = worker_controller
+    threads = []
+
+    def fail():
+        threads.append(QThread.currentThread())
+        raise ValueError('boom')
+    with pytest.raises(ValueError, match='boom'):
+        controller._call_in_thread(fail)
+    assert threads == [thread]
+    with pytest.raises(ConnectionError):
+        controller.write(b'/1QR\r')  # 未连接
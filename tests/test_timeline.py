@@ -0,0 +1,117 @@
+"""程序时间线：相对延时、无漂移定时和停止"""
+import logging
+import threading
+
+import pytest
+
+from program.timeline import Timeline
+
+
+class FakeClock:
+    """模拟时钟：等待只推进时间"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.stopped = False
+
+    def __call__(self):
+        return self.now
+
+    # 代替 threading.Event
+    def is_set(self):
+        return self.stopped
+
+    def wait(self, timeout):
+        self.now += timeout
+        return self.stopped
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def make_timeline(clock, **kwargs):
+    timeline = Timeline(clock, **kwargs)
+    timeline.clock = clock
+    timeline.start()
+    return timeline
+
+
+def run_loop(timeline, clock, times, command=0.4, delay=1.0):
+    """每次循环执行耗时 command 秒的命令，再延时 delay 秒，返回各次循环开始的时间"""
+    starts = []
+    for _ in timeline.repeat(times):
+        starts.append(clock.now)
+        clock.now += command
+        timeline.sleep(delay)
+    return starts
+
+
+def test_sleep_counts_from_now_by_default(clock):
+    timeline = make_timeline(clock)
+    starts = run_loop(timeline, clock, 3)
+    assert starts == pytest.approx([0.0, 1.4, 2.8])
+
+
+def test_drift_free_loop_keeps_its_period(clock):
+    timeline = make_timeline(clock, drift_free=True)
+    starts = run_loop(timeline, clock, 3)
+    assert starts == pytest.approx([0.0, 1.0, 2.0])
+
+
+def test_sleep_outside_loops_counts_from_now(clock):
+    timeline = make_timeline(clock, drift_free=True)
+    clock.now += 0.4
+    timeline.sleep(1.0)
+    assert clock.now == pytest.approx(1.4)
+
+
+def test_wait_until_is_relative_to_iteration_start(clock):
+    timeline = make_timeline(clock)
+    starts = []
+    for _ in timeline.repeat(2):
+        starts.append(clock.now)
+        clock.now += 0.4
+        timeline.wait_until(2.0)
+    assert starts == pytest.approx([0.0, 2.0])
+    assert clock.now == pytest.approx(4.0)
+
+
+def test_wait_until_is_relative_to_program_start(clock):
+    timeline = make_timeline(clock)
+    clock.now += 0.5
+    timeline.wait_until(2.0)
+    assert clock.now == pytest.approx(2.0)
+
+
+def test_passed_deadline_is_logged_and_not_waited(clock, caplog):
+    timeline = make_timeline(clock, drift_free=True)
+    with caplog.at_level(logging.WARNING, logger='program.timeline'):
+        starts = run_loop(timeline, clock, 3, command=1.5)
+    assert starts == pytest.approx([0.0, 1.5, 3.0])  # 不为追赶而连续执行
+    assert len([r for r in caplog.records if r.levelno == logging.WARNING]) == 3
+
+
+def test_relative_delay_never_warns(clock, caplog):
+    timeline = make_timeline(clock)
+    with caplog.at_level(logging.WARNING, logger='program.timeline'):
+        run_loop(timeline, clock, 3, command=1.5)
+    assert not caplog.records
+
+
+def test_zero_scale_skips_waits_without_warning(clock, caplog):
+    timeline = make_timeline(clock, scale=0, drift_free=True)
+    with caplog.at_level(logging.WARNING, logger='program.timeline'):
+        run_loop(timeline, clock, 3)
+        timeline.wait_until(10.0)
+    assert clock.now == pytest.approx(1.2)
+    assert not caplog.records
+
+
+def test_stop_interrupts_wait():
+    stop_event = threading.Event()
+    timeline = Timeline(stop_event)
+    stop_event.set()
+    with pytest.raises(InterruptedError):
+        timeline.sleep(10.0)